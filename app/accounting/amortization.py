@@ -0,0 +1,121 @@
+from typing import Iterator, Tuple
+
+import numpy as np
+
+from app.accounting.schemas import ProblemaAmortizacion
+from app.shared.enums import SistemaAmortizacion
+from app.shared.rates import factor_descuento, meses_por_periodo, tasa_efectiva_periodica
+
+COLUMNAS_TABLA = ("periodo", "mes", "cuota", "interes", "amortizacion", "saldo")
+
+
+class AmortizationService:
+    """
+    Tablas de amortización (sistemas Francés, Alemán y Americano) en dos modos:
+    - `tabla`: NumPy, construye todas las filas de una vez con fórmulas cerradas.
+    - `iterar_tabla`: generador perezoso, memoria O(1) para plazos muy largos.
+    """
+
+    def _tasa_periodo_pago(self, p: ProblemaAmortizacion) -> float:
+        """Tasa efectiva equivalente al periodo de pago."""
+        return tasa_efectiva_periodica(p.tasa, p.frecuencia_pago, capitalizacion_defecto=p.frecuencia_pago)
+
+    def parametros(self, p: ProblemaAmortizacion) -> Tuple[float, int, float]:
+        """
+        Devuelve (i del periodo, número de cuotas, meses por cuota).
+        Lanza ValueError si el plazo no corresponde a un número entero de cuotas.
+        """
+        meses_por_cuota = meses_por_periodo(p.frecuencia_pago)
+        n_exacto = p.plazo_meses / meses_por_cuota
+        n = round(n_exacto)
+        if n < 1 or abs(n - n_exacto) > 1e-6:
+            raise ValueError(
+                f"El plazo de {p.plazo_meses} meses no equivale a un número entero de cuotas con frecuencia {p.frecuencia_pago.value}."
+            )
+        return self._tasa_periodo_pago(p), n, meses_por_cuota
+
+    def _cuota_francesa(self, C: float, i: float, n: int) -> float:
+        if i == 0:
+            return C / n
+        return C * i / (1 - factor_descuento(i, n))
+
+    # --- MODO VECTORIZADO ---
+    def tabla(self, p: ProblemaAmortizacion) -> dict:
+        """Tabla completa como dict de arreglos (columnas de COLUMNAS_TABLA)."""
+        i, n, meses_por_cuota = self.parametros(p)
+        C = p.capital
+        k = np.arange(1, n + 1, dtype=float)
+
+        if p.sistema == SistemaAmortizacion.FRANCES:
+            cuota_fija = self._cuota_francesa(C, i, n)
+            if i == 0:
+                saldo = C - cuota_fija * k
+            else:
+                acumulado = np.power(1 + i, k)
+                saldo = C * acumulado - cuota_fija * (acumulado - 1) / i
+            saldo_previo = np.concatenate(([C], saldo[:-1]))
+            interes = saldo_previo * i
+            cuota = np.full(n, cuota_fija)
+            amortizacion = cuota - interes
+
+        elif p.sistema == SistemaAmortizacion.ALEMAN:
+            amortizacion = np.full(n, C / n)
+            saldo_previo = C - amortizacion * (k - 1)
+            interes = saldo_previo * i
+            cuota = amortizacion + interes
+            saldo = saldo_previo - amortizacion
+
+        else:  # AMERICANO
+            interes = np.full(n, C * i)
+            amortizacion = np.zeros(n)
+            amortizacion[-1] = C
+            cuota = interes + amortizacion
+            saldo = np.full(n, C)
+            saldo[-1] = 0.0
+
+        # Residuo de punto flotante en la última fila
+        saldo[-1] = 0.0
+        return {
+            "periodo": k.astype(np.int64),
+            "mes": k * meses_por_cuota,
+            "cuota": cuota,
+            "interes": interes,
+            "amortizacion": amortizacion,
+            "saldo": saldo,
+        }
+
+    # --- MODO GENERADOR ---
+    def iterar_tabla(self, p: ProblemaAmortizacion) -> Iterator[dict]:
+        """
+        Produce las filas una a una sin materializar la tabla.
+        Valida los parámetros al crear el generador (antes de la primera fila).
+        """
+        i, n, meses_por_cuota = self.parametros(p)
+        return self._filas(p.sistema, p.capital, i, n, meses_por_cuota)
+
+    def _filas(self, sistema: SistemaAmortizacion, C: float, i: float, n: int, meses_por_cuota: float) -> Iterator[dict]:
+        saldo = C
+        cuota_fija = self._cuota_francesa(C, i, n)
+        amortizacion_fija = C / n
+
+        for k in range(1, n + 1):
+            interes = saldo * i
+            if k == n:
+                amortizacion = saldo  # la última cuota liquida el saldo exacto
+            elif sistema == SistemaAmortizacion.FRANCES:
+                amortizacion = cuota_fija - interes
+            elif sistema == SistemaAmortizacion.ALEMAN:
+                amortizacion = amortizacion_fija
+            else:
+                amortizacion = 0.0
+            saldo -= amortizacion
+            yield {
+                "periodo": k,
+                "mes": k * meses_por_cuota,
+                "cuota": interes + amortizacion,
+                "interes": interes,
+                "amortizacion": amortizacion,
+                "saldo": 0.0 if k == n else saldo
+            }
+
+amortization_service = AmortizationService()
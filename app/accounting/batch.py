@@ -0,0 +1,371 @@
+"""
+Motor columnar (NumPy) para resolver muchas operaciones de interés simple, compuesto y
+descuento bancario en una sola pasada por incógnita. Entrada: DataFrame o dict de columnas; salida: dict
+de arreglos con C, M, I, i, n y una máscara de errores por fila (sin excepciones).
+"""
+import numpy as np
+from app.shared.enums import ModalidadDescuento, ProblemType, VariableObjetivo
+from app.shared.rates import FRECUENCIA_ANUAL
+
+# Columnas de entrada que reconoce `resolver_lote`
+COLUMNAS_LOTE = (
+    "tipo", "incognita", "capital", "monto_futuro", "interes_ganado", "tiempo_meses",
+    "tasa_valor", "tasa_periodo", "tasa_es_nominal", "tasa_capitalizacion",
+    "capitalizacion", "periodo_tasa_solicitada",
+    "valor_nominal", "valor_recibido", "descuento_importe", "modalidad",
+)
+
+# Códigos de la columna `codigo_error`
+OK = 0
+FALTAN_DATOS = 1
+CALCULO_INVALIDO = 2
+NO_SOPORTADO = 3
+
+ERRORES_LOTE = {
+    OK: "",
+    FALTAN_DATOS: "Faltan datos para calcular la incógnita",
+    CALCULO_INVALIDO: "Resultado no finito (división por cero o dominio inválido)",
+    NO_SOPORTADO: "Tipo de problema o incógnita no soportado en modo lote",
+}
+
+
+def _columna_float(datos, nombre: str, filas: int) -> np.ndarray:
+    if nombre not in datos:
+        return np.full(filas, np.nan)
+    return np.asarray(datos[nombre], dtype=float)
+
+
+def _columna_bool(datos, nombre: str, filas: int) -> np.ndarray:
+    if nombre not in datos:
+        return np.zeros(filas, dtype=bool)
+    arr = np.asarray(datos[nombre])
+    if arr.dtype == bool:
+        return arr
+    texto = np.char.lower(arr.astype(str))
+    return np.isin(texto, ["true", "1", "1.0", "si", "sí"])
+
+
+def _codificar(datos, nombre: str, filas: int, tabla: dict, default):
+    """
+    Traduce una columna categórica (miembros del enum o texto) con `tabla`.
+    Si la columna ya es texto de NumPy se hace una comparación vectorizada por categoría;
+    si son objetos (enums, None, columnas de pandas) se factoriza y solo los valores
+    distintos pasan por el dict.
+    """
+    if nombre not in datos:
+        return np.full(filas, default)
+    columna = datos[nombre]
+    if isinstance(columna, list):
+        columna = np.asarray(columna, dtype=object)
+    elif not hasattr(columna, "dtype"):
+        columna = np.asarray(columna)
+    if columna.dtype.kind == "U":
+        codigos = np.full(filas, default)
+        for clave, valor in tabla.items():
+            codigos[columna == clave] = valor
+        return codigos
+
+    import pandas as pd
+
+    # Los nulos quedan en la posición -1, que apunta al default agregado al final
+    posiciones, distintos = pd.factorize(columna)
+    traducidos = np.array([tabla.get(v, default) for v in distintos] + [default])
+    return traducidos[posiciones]
+
+
+def _tabla_enum(valor_por_miembro: dict) -> dict:
+    """
+    Indexa por el valor en texto ('mensual'). Como los enums heredan de str, un
+    miembro (Frequency.MENSUAL) encuentra la misma entrada al buscarlo en el dict.
+    """
+    return {miembro.value: valor for miembro, valor in valor_por_miembro.items()}
+
+
+_M_POR_TEXTO = _tabla_enum(FRECUENCIA_ANUAL)
+_INCOGNITAS = list(VariableObjetivo)
+_INCOGNITA_POR_TEXTO = _tabla_enum({v: k for k, v in enumerate(_INCOGNITAS)})
+_COD = {v: k for k, v in enumerate(_INCOGNITAS)}
+_TIPO_POR_TEXTO = _tabla_enum({
+    ProblemType.INTERES_SIMPLE: 1, ProblemType.INTERES_COMPUESTO: 2, ProblemType.DESCUENTO_BANCARIO: 3
+})
+_MODALIDAD_POR_TEXTO = _tabla_enum({ModalidadDescuento.COMERCIAL: 0, ModalidadDescuento.RACIONAL: 1})
+
+
+def resolver_lote(datos) -> dict:
+    """
+    Columnas reconocidas (las ausentes se toman como NaN / default):
+    tipo, incognita, capital, monto_futuro, interes_ganado, tiempo_meses,
+    tasa_valor, tasa_periodo, tasa_es_nominal, tasa_capitalizacion,
+    capitalizacion (compuesto), periodo_tasa_solicitada (simple, incógnita TASA) y
+    valor_nominal, valor_recibido, descuento_importe, modalidad (descuento bancario).
+    En descuento bancario la salida usa C = valor recibido, M = valor nominal,
+    I = descuento e i = tasa de descuento.
+    """
+    filas = len(datos["incognita"])
+    tipo = _codificar(datos, "tipo", filas, _TIPO_POR_TEXTO, 0)
+    incognita = _codificar(datos, "incognita", filas, _INCOGNITA_POR_TEXTO, -1)
+
+    C = _columna_float(datos, "capital", filas)
+    M = _columna_float(datos, "monto_futuro", filas)
+    I = _columna_float(datos, "interes_ganado", filas)
+    t_meses = _columna_float(datos, "tiempo_meses", filas)
+    tasa = _columna_float(datos, "tasa_valor", filas)
+
+    salida = {
+        "C": np.full(filas, np.nan),
+        "M": np.full(filas, np.nan),
+        "I": np.full(filas, np.nan),
+        "i": np.full(filas, np.nan),
+        "n": np.full(filas, np.nan),
+        "t_meses": t_meses.copy(),
+        "codigo_error": np.full(filas, NO_SOPORTADO, dtype=np.int8),
+    }
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        simple = tipo == 1
+        if simple.any():
+            _resolver_simple(datos, simple, incognita, C, M, I, t_meses, tasa, salida)
+
+        compuesto = tipo == 2
+        if compuesto.any():
+            _resolver_compuesto(datos, compuesto, incognita, C, M, t_meses, tasa, salida)
+
+        descuento = tipo == 3
+        if descuento.any():
+            _resolver_descuento(datos, descuento, incognita, C, M, I, t_meses, tasa, salida)
+
+    salida["ok"] = salida["codigo_error"] == OK
+    return salida
+
+
+def _marcar(salida: dict, filas: np.ndarray, faltan: np.ndarray, solo_importes=None) -> None:
+    """
+    Asigna el código de error de las filas resueltas según datos faltantes y finitud.
+    En las filas de `solo_importes` (alineado con `faltan`) i y n pueden quedar sin valor.
+    """
+    finitos = np.ones(int(filas.sum()), dtype=bool)
+    for clave in ("C", "M", "I"):
+        finitos &= np.isfinite(salida[clave][filas])
+    for clave in ("i", "n"):
+        finito = np.isfinite(salida[clave][filas])
+        finitos &= finito if solo_importes is None else finito | solo_importes
+    codigo = np.where(faltan, FALTAN_DATOS, np.where(finitos, OK, CALCULO_INVALIDO))
+    salida["codigo_error"][filas] = codigo
+
+
+def _resolver_simple(datos, mascara, incognita, C, M, I, t_meses, tasa, salida) -> None:
+    filas_totales = len(mascara)
+    m_tasa = _codificar(datos, "tasa_periodo", filas_totales, _M_POR_TEXTO, 1).astype(float)
+    m_solicitada = _codificar(datos, "periodo_tasa_solicitada", filas_totales, _M_POR_TEXTO, 12).astype(float)
+    hay_tasa = ~np.isnan(tasa)
+
+    # Inferencia inicial C-M-I
+    I0 = np.where(np.isnan(I), M - C, I)
+    C0 = np.where(np.isnan(C), M - I0, C)
+    M0 = np.where(np.isnan(M), C0 + I0, M)
+
+    # Preparación dimensional: n en periodos de la tasa (o meses si no hay tasa)
+    n0 = np.where(hay_tasa, t_meses / (12 / m_tasa), t_meses)
+
+    i_res = np.where(hay_tasa, tasa, np.nan)
+    n_res = n0.copy()
+    t_res = t_meses.copy()
+    C_res, M_res, I_res = C0.copy(), M0.copy(), I0.copy()
+    faltan = np.zeros(filas_totales, dtype=bool)
+
+    sel = mascara & (incognita == _COD[VariableObjetivo.TASA])
+    if sel.any():
+        n_calc = t_meses[sel] / (12 / m_solicitada[sel])
+        i_res[sel] = I0[sel] / (C0[sel] * n_calc)
+        n_res[sel] = n_calc
+        faltan[sel] = np.isnan(I0[sel]) | np.isnan(C0[sel]) | np.isnan(t_meses[sel])
+
+    sel = mascara & (incognita == _COD[VariableObjetivo.TIEMPO])
+    if sel.any():
+        n_calc = I0[sel] / (C0[sel] * tasa[sel])
+        n_res[sel] = n_calc
+        t_res[sel] = n_calc * (12 / m_tasa[sel])
+        faltan[sel] = np.isnan(I0[sel]) | np.isnan(C0[sel]) | ~hay_tasa[sel]
+
+    sel = mascara & (incognita == _COD[VariableObjetivo.CAPITAL])
+    if sel.any():
+        i_n = tasa[sel] * n0[sel]
+        # Como en el solver escalar, M puede venir inferido de C + I
+        desde_monto = M0[sel] / (1 + i_n)
+        desde_interes = I0[sel] / i_n
+        C_res[sel] = np.where(~np.isnan(M0[sel]), desde_monto, desde_interes)
+        faltan[sel] = np.isnan(i_n) | (np.isnan(M0[sel]) & np.isnan(I0[sel]))
+
+    sel = mascara & (incognita == _COD[VariableObjetivo.MONTO])
+    if sel.any():
+        M_res[sel] = C0[sel] * (1 + tasa[sel] * n0[sel])
+        faltan[sel] = np.isnan(C0[sel]) | np.isnan(tasa[sel]) | np.isnan(n0[sel])
+
+    sel = mascara & (incognita == _COD[VariableObjetivo.INTERES])
+    if sel.any():
+        I_res[sel] = C0[sel] * tasa[sel] * n0[sel]
+        faltan[sel] = np.isnan(C0[sel]) | np.isnan(tasa[sel]) | np.isnan(n0[sel])
+
+    # Consolidación C-M-I
+    I_res = np.where(np.isnan(I_res), M_res - C_res, I_res)
+    M_res = np.where(np.isnan(M_res), C_res + I_res, M_res)
+    C_res = np.where(np.isnan(C_res), M_res - I_res, C_res)
+
+    soportadas = mascara & np.isin(incognita, [
+        _COD[VariableObjetivo.TASA], _COD[VariableObjetivo.TIEMPO], _COD[VariableObjetivo.CAPITAL],
+        _COD[VariableObjetivo.MONTO], _COD[VariableObjetivo.INTERES]
+    ])
+    for clave, valores in (("C", C_res), ("M", M_res), ("I", I_res), ("i", i_res), ("n", n_res), ("t_meses", t_res)):
+        salida[clave][soportadas] = valores[soportadas]
+    _marcar(salida, soportadas, faltan[soportadas])
+
+
+def _resolver_compuesto(datos, mascara, incognita, C, M, t_meses, tasa, salida) -> None:
+    filas_totales = len(mascara)
+    m_cap = _codificar(datos, "capitalizacion", filas_totales, _M_POR_TEXTO, 1).astype(float)
+    m_tasa_cap = _codificar(datos, "tasa_capitalizacion", filas_totales, _M_POR_TEXTO, 0).astype(float)
+    es_nominal = _columna_bool(datos, "tasa_es_nominal", filas_totales)
+
+    n = t_meses / (12 / m_cap)
+    # Tasa efectiva del periodo: j/m si es nominal (cap. de la tasa o, si falta, la del problema)
+    m_nominal = np.where(m_tasa_cap > 0, m_tasa_cap, m_cap)
+    # Sin tasa, i queda en NaN: M y C no se pueden llevar en el tiempo
+    i = np.where(es_nominal, tasa / m_nominal, tasa)
+    sin_tasa = np.isnan(i)
+    # Como en el escalar, se parte de v^n = (1+i)^-n: si desborda, el resultado no es válido
+    v_n = np.power(1 + i, -n)
+    factor = np.where(np.isfinite(v_n), 1 / v_n, np.nan)
+    # Mismo dominio que el solver escalar para los despejes cerrados
+    positivos = (C > 0) & (M > 0)
+
+    C_res = C.copy()
+    M_res = M.copy()
+    faltan = np.zeros(filas_totales, dtype=bool)
+
+    sel = mascara & (incognita == _COD[VariableObjetivo.MONTO])
+    if sel.any():
+        M_res[sel] = C[sel] * factor[sel]
+        faltan[sel] = np.isnan(C[sel]) | np.isnan(n[sel]) | sin_tasa[sel]
+
+    sel = mascara & (incognita == _COD[VariableObjetivo.CAPITAL])
+    if sel.any():
+        C_res[sel] = M[sel] / factor[sel]
+        faltan[sel] = np.isnan(M[sel]) | np.isnan(n[sel]) | sin_tasa[sel]
+
+    # I = M - C; el lado que falte se obtiene con (1 + i)^n
+    sel = mascara & (incognita == _COD[VariableObjetivo.INTERES])
+    solo_importes = sel & ~np.isnan(C) & ~np.isnan(M)
+    if sel.any():
+        C_res[sel] = np.where(np.isnan(C[sel]), M[sel] / factor[sel], C[sel])
+        M_res[sel] = np.where(np.isnan(M[sel]), C[sel] * factor[sel], M[sel])
+        faltan[sel] = ~solo_importes[sel] & (
+            (np.isnan(C[sel]) & np.isnan(M[sel])) | np.isnan(n[sel]) | sin_tasa[sel]
+        )
+
+    # Despejes cerrados de tasa y tiempo: i = (M/C)^(1/n) - 1,  n = ln(M/C) / ln(1+i)
+    sel = mascara & (incognita == _COD[VariableObjetivo.TASA])
+    if sel.any():
+        i_calc = np.power(M[sel] / C[sel], 1 / n[sel]) - 1
+        i[sel] = np.where(positivos[sel] & (n[sel] != 0), i_calc, np.nan)
+        faltan[sel] = np.isnan(M[sel]) | np.isnan(C[sel]) | np.isnan(n[sel])
+
+    sel = mascara & (incognita == _COD[VariableObjetivo.TIEMPO])
+    if sel.any():
+        n_calc = np.log(M[sel] / C[sel]) / np.log1p(i[sel])
+        n_calc = np.where(positivos[sel] & (i[sel] > -1) & (i[sel] != 0), n_calc, np.nan)
+        n[sel] = n_calc
+        salida["t_meses"][sel] = n_calc * (12 / m_cap[sel])
+        faltan[sel] = np.isnan(M[sel]) | np.isnan(C[sel]) | np.isnan(tasa[sel])
+
+    soportadas = mascara & np.isin(incognita, [
+        _COD[VariableObjetivo.MONTO], _COD[VariableObjetivo.CAPITAL], _COD[VariableObjetivo.INTERES],
+        _COD[VariableObjetivo.TASA], _COD[VariableObjetivo.TIEMPO]
+    ])
+    salida["C"][soportadas] = C_res[soportadas]
+    salida["M"][soportadas] = M_res[soportadas]
+    salida["I"][soportadas] = M_res[soportadas] - C_res[soportadas]
+    salida["i"][soportadas] = i[soportadas]
+    salida["n"][soportadas] = n[soportadas]
+    _marcar(salida, soportadas, faltan[soportadas], solo_importes[soportadas])
+
+
+def _resolver_descuento(datos, mascara, incognita, C, M, I, t_meses, tasa, salida) -> None:
+    """Comercial: D = Vn*d*n (Vr = Vn*(1 - d*n)); racional: D = Vr*d*n (Vr = Vn/(1 + d*n))."""
+    filas_totales = len(mascara)
+    m_tasa = _codificar(datos, "tasa_periodo", filas_totales, _M_POR_TEXTO, 1).astype(float)
+    racional = _codificar(datos, "modalidad", filas_totales, _MODALIDAD_POR_TEXTO, 0) == 1
+
+    # Columnas propias del descuento, o las genéricas C/M/I si no vienen
+    Vn = _columna_float(datos, "valor_nominal", filas_totales)
+    Vr = _columna_float(datos, "valor_recibido", filas_totales)
+    D = _columna_float(datos, "descuento_importe", filas_totales)
+    Vn = np.where(np.isnan(Vn), M, Vn)
+    Vr = np.where(np.isnan(Vr), C, Vr)
+    D = np.where(np.isnan(D), I, D)
+
+    # Inferencia inicial Vn-Vr-D
+    D0 = np.where(np.isnan(D), Vn - Vr, D)
+    Vr0 = np.where(np.isnan(Vr), Vn - D0, Vr)
+    Vn0 = np.where(np.isnan(Vn), Vr0 + D0, Vn)
+
+    n = t_meses / (12 / m_tasa)
+    dn = tasa * n
+    base = np.where(racional, Vr0, Vn0)
+
+    Vn_res, Vr_res, D_res = Vn0.copy(), Vr0.copy(), D0.copy()
+    d_res = tasa.copy()
+    n_res = n.copy()
+    t_res = t_meses.copy()
+    faltan = np.zeros(filas_totales, dtype=bool)
+
+    sel = mascara & (incognita == _COD[VariableObjetivo.DESCUENTO])
+    if sel.any():
+        Vn_com = np.where(np.isnan(Vn0), Vr0 / (1 - dn), Vn0)
+        Vr_rac = np.where(np.isnan(Vr0), Vn0 / (1 + dn), Vr0)
+        Vn_res[sel] = np.where(racional, Vn0, Vn_com)[sel]
+        Vr_res[sel] = np.where(racional, Vr_rac, Vr0)[sel]
+        D_res[sel] = np.where(racional, Vr_rac * dn, Vn_com * dn)[sel]
+        faltan[sel] = np.isnan(dn[sel]) | (np.isnan(Vn0[sel]) & np.isnan(Vr0[sel]))
+
+    sel = mascara & np.isin(incognita, [_COD[VariableObjetivo.VALOR_NOMINAL], _COD[VariableObjetivo.MONTO]])
+    if sel.any():
+        hay_vr = ~np.isnan(Vr0)
+        comercial = np.where(hay_vr, Vr0 / (1 - dn), D0 / dn)
+        rac = np.where(hay_vr, Vr0 * (1 + dn), D0 * (1 + dn) / dn)
+        Vn_res[sel] = np.where(racional, rac, comercial)[sel]
+        faltan[sel] = np.isnan(dn[sel]) | (np.isnan(Vr0[sel]) & np.isnan(D0[sel]))
+
+    sel = mascara & (incognita == _COD[VariableObjetivo.CAPITAL])
+    if sel.any():
+        hay_vn = ~np.isnan(Vn0)
+        comercial = np.where(hay_vn, Vn0 * (1 - dn), D0 / dn - D0)
+        rac = np.where(hay_vn, Vn0 / (1 + dn), D0 / dn)
+        Vr_res[sel] = np.where(racional, rac, comercial)[sel]
+        faltan[sel] = np.isnan(dn[sel]) | (np.isnan(Vn0[sel]) & np.isnan(D0[sel]))
+
+    sel = mascara & (incognita == _COD[VariableObjetivo.TASA])
+    if sel.any():
+        d_res[sel] = D0[sel] / (base[sel] * n[sel])
+        faltan[sel] = np.isnan(D0[sel]) | np.isnan(base[sel]) | np.isnan(n[sel])
+
+    sel = mascara & (incognita == _COD[VariableObjetivo.TIEMPO])
+    if sel.any():
+        n_calc = D0[sel] / (base[sel] * tasa[sel])
+        n_res[sel] = n_calc
+        t_res[sel] = n_calc * (12 / m_tasa[sel])
+        faltan[sel] = np.isnan(D0[sel]) | np.isnan(base[sel]) | np.isnan(tasa[sel])
+
+    # Consolidación Vn-Vr-D
+    D_res = np.where(np.isnan(D_res), Vn_res - Vr_res, D_res)
+    Vr_res = np.where(np.isnan(Vr_res), Vn_res - D_res, Vr_res)
+    Vn_res = np.where(np.isnan(Vn_res), Vr_res + D_res, Vn_res)
+    # Un descuento que agota el valor nominal (d*n >= 1) no es un resultado válido
+    Vr_res = np.where(Vr_res > 0, Vr_res, np.nan)
+
+    soportadas = mascara & np.isin(incognita, [
+        _COD[VariableObjetivo.DESCUENTO], _COD[VariableObjetivo.VALOR_NOMINAL], _COD[VariableObjetivo.MONTO],
+        _COD[VariableObjetivo.CAPITAL], _COD[VariableObjetivo.TASA], _COD[VariableObjetivo.TIEMPO]
+    ])
+    for clave, valores in (("C", Vr_res), ("M", Vn_res), ("I", D_res), ("i", d_res), ("n", n_res), ("t_meses", t_res)):
+        salida[clave][soportadas] = valores[soportadas]
+    _marcar(salida, soportadas, faltan[soportadas])
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from typing import Optional, Literal
-from app.shared.enums import ProblemType, VariableObjetivo, Frequency
+from app.shared.enums import ProblemType, VariableObjetivo, Frequency, SistemaAmortizacion, ModalidadDescuento
 from app.shared.schemas import TasaInteres
 
 class ProblemaInteresSimple(BaseModel):
@@ -20,6 +20,7 @@ class ProblemaDescuentoBancario(BaseModel):
     descuento_importe: Optional[float] = Field(None, description="Monto del descuento (D)")
     tasa_descuento: Optional[TasaInteres] = None
     tiempo_meses: Optional[float] = None
+    modalidad: ModalidadDescuento = Field(default=ModalidadDescuento.COMERCIAL, description="Comercial (sobre el valor nominal) o racional (sobre el valor recibido)")
     incognita: VariableObjetivo
 
 class ProblemaInteresCompuesto(BaseModel):
@@ -30,3 +31,11 @@ class ProblemaInteresCompuesto(BaseModel):
     tiempo_meses: Optional[float] = None
     capitalizacion: Frequency = Field(..., description="Frecuencia de conversión/capitalización")
     incognita: VariableObjetivo
+
+class ProblemaAmortizacion(BaseModel):
+    tipo: Literal[ProblemType.AMORTIZACION] = ProblemType.AMORTIZACION
+    capital: float = Field(..., gt=0, description="Importe del préstamo")
+    tasa: TasaInteres
+    plazo_meses: float = Field(..., gt=0, description="Plazo total del préstamo en meses")
+    frecuencia_pago: Frequency = Field(default=Frequency.MENSUAL, description="Cada cuánto se paga una cuota")
+    sistema: SistemaAmortizacion = Field(default=SistemaAmortizacion.FRANCES, description="Francés (cuota fija), Alemán (amortización fija) o Americano (bullet)")
@@ -1,5 +1,7 @@
 import math
-from app.shared.enums import VariableObjetivo, Frequency
+from app.shared.enums import VariableObjetivo, Frequency, ModalidadDescuento
+from app.shared.rates import frecuencia_anual, meses_por_periodo, factor_descuento
+from app.executor import solver_executor
 from app.accounting.schemas import (
     ProblemaInteresSimple,
     ProblemaInteresCompuesto,
@@ -8,29 +10,16 @@ from app.accounting.schemas import (
 
 class AccountingService:
     
-    def _get_frecuencia_anual(self, freq: Frequency) -> int:
-        """Retorna cuántos periodos caben en un año (m)"""
-        mapa = {
-            Frequency.ANUAL: 1, Frequency.SEMESTRAL: 2, Frequency.CUATRIMESTRAL: 3,
-            Frequency.TRIMESTRAL: 4, Frequency.BIMESTRAL: 6, Frequency.MENSUAL: 12,
-            Frequency.QUINCENAL: 24, Frequency.SEMANAL: 52, Frequency.DIARIO: 360
-        }
-        return mapa.get(freq, 1)
-
     def _normalizar_tasa(self, tasa_obj, frecuencia_capitalizacion: Frequency = None) -> float:
         """Convierte tasa a efectiva del periodo."""
         if not tasa_obj: return 0.0
         i = tasa_obj.valor
         if tasa_obj.es_nominal:
             cap = tasa_obj.capitalizacion or frecuencia_capitalizacion
-            m = self._get_frecuencia_anual(cap)
+            m = frecuencia_anual(cap)
             return i / m
         return i
 
-    def _get_meses_por_periodo(self, freq: Frequency) -> float:
-        freq_anual = self._get_frecuencia_anual(freq)
-        return 12 / freq_anual
-    
     def _formatear_tiempo_humano(self, total_meses: float) -> str:
         """
         Convierte una cantidad de meses (ej. 22.2) a texto legible:
@@ -39,16 +28,17 @@ class AccountingService:
         """
         if total_meses < 0: return "Tiempo negativo (?)"
         
+        # Se redondea a días primero para que 11.9999 meses no se muestre como "11 meses, 30 días"
+        total_dias = round(total_meses * 30)
+
         # 1. Calcular Años
-        anios = int(total_meses // 12)
-        resto_meses = total_meses % 12
+        anios = total_dias // 360
         
         # 2. Calcular Meses
-        meses = int(resto_meses)
-        fraccion_mes = resto_meses - meses
+        meses = (total_dias % 360) // 30
         
         # 3. Calcular Días (Comercial: 30 días por mes)
-        dias = round(fraccion_mes * 30)
+        dias = total_dias % 30
         
         partes = []
         if anios > 0: partes.append(f"{anios} año(s)")
@@ -80,7 +70,7 @@ class AccountingService:
             freq_tasa = p.tasa.periodo or Frequency.ANUAL
             unidad_tiempo = freq_tasa.value.title()
             if t_meses is not None:
-                duracion_periodo = self._get_meses_por_periodo(freq_tasa)
+                duracion_periodo = meses_por_periodo(freq_tasa)
                 n_periodos = t_meses / duracion_periodo
         elif t_meses is not None:
              n_periodos = t_meses
@@ -96,7 +86,7 @@ class AccountingService:
                     if p.periodo_tasa_solicitada:
                         freq_obj = p.periodo_tasa_solicitada
                         nombre_per = freq_obj.value.title()
-                        duracion = self._get_meses_por_periodo(freq_obj)
+                        duracion = meses_por_periodo(freq_obj)
                         n_calc = t_meses / duracion
                     else:
                         freq_obj = Frequency.MENSUAL
@@ -108,7 +98,7 @@ class AccountingService:
                     resultados["tasa_calculada"] = {
                         "valor": i_calc,
                         "etiqueta": f"{round(i_calc*100, 4)}% {nombre_per}",
-                        "anual": i_calc * self._get_frecuencia_anual(freq_obj)
+                        "anual": i_calc * frecuencia_anual(freq_obj)
                     }
                     resultados["formula"] = "i = I / (C * n)"
                     i_tasa = i_calc 
@@ -116,7 +106,7 @@ class AccountingService:
             elif target == VariableObjetivo.TIEMPO:
                 if I is not None and C is not None and i_tasa is not None:
                     n_calc = I / (C * i_tasa)
-                    duracion_periodo = self._get_meses_por_periodo(p.tasa.periodo or Frequency.ANUAL)
+                    duracion_periodo = meses_por_periodo(p.tasa.periodo or Frequency.ANUAL)
                     t_meses_calc = n_calc * duracion_periodo
                     
                     resultados["tiempo_calculado"] = {
@@ -173,7 +163,7 @@ class AccountingService:
                 freq_obj = Frequency.MENSUAL # Default
             
             nombre_periodo = freq_obj.value.title()
-            m = self._get_frecuencia_anual(freq_obj) # Frecuencia anual
+            m = frecuencia_anual(freq_obj) # Frecuencia anual
 
             # 2. Obtener i (Tasa del Periodo) y r (Tasa Nominal Anual)
             val_i = i_tasa if i_tasa is not None else 0.0
@@ -213,32 +203,219 @@ class AccountingService:
 
         return resultados
 
-    # --- SOLUCIONADOR INTERÉS COMPUESTO (Mantenemos el anterior) ---
+    # --- SOLUCIONADOR INTERÉS COMPUESTO ---
     def resolver_interes_compuesto(self, p: ProblemaInteresCompuesto) -> dict:
         resultados = {}
         C = p.capital
         M = p.monto_futuro
         t_meses = p.tiempo_meses
-        m_anual = self._get_frecuencia_anual(p.capitalizacion)
+        m_anual = frecuencia_anual(p.capitalizacion)
         
         # n = total periodos
         n = None
         if t_meses is not None:
-            meses_por_periodo = 12 / m_anual
-            n = t_meses / meses_por_periodo
+            n = t_meses / (12 / m_anual)
 
         # i = tasa efectiva periodo
         i = self._normalizar_tasa(p.tasa, p.capitalizacion)
 
-        if p.incognita == VariableObjetivo.MONTO:
-            res = C * math.pow(1 + i, n)
-            resultados["formula"] = "M = C * (1 + i)^n"
-            resultados["resultado"] = round(res, 2)
-            
-        elif p.incognita == VariableObjetivo.CAPITAL:
-            res = M / math.pow(1 + i, n)
-            resultados["formula"] = "C = M / (1 + i)^n"
-            resultados["resultado"] = round(res, 2)
+        try:
+            if p.incognita == VariableObjetivo.MONTO:
+                if C is None or n is None or p.tasa is None:
+                    return {"error": "Faltan datos para calcular Monto"}
+                res = C / factor_descuento(i, n)
+                resultados["formula"] = "M = C * (1 + i)^n"
+                resultados["resultado"] = round(res, 2)
+
+            elif p.incognita == VariableObjetivo.CAPITAL:
+                if M is None or n is None or p.tasa is None:
+                    return {"error": "Faltan datos para calcular Capital"}
+                res = M * factor_descuento(i, n)
+                resultados["formula"] = "C = M / (1 + i)^n"
+                resultados["resultado"] = round(res, 2)
+
+            elif p.incognita == VariableObjetivo.INTERES:
+                # I = M - C; el lado que falte se obtiene con (1 + i)^n
+                if C is None and M is None:
+                    return {"error": "Faltan datos para calcular Interés"}
+                if C is None or M is None:
+                    if n is None or p.tasa is None:
+                        return {"error": "Faltan datos para calcular Interés"}
+                    if C is None:
+                        C = M * factor_descuento(i, n)
+                    else:
+                        M = C / factor_descuento(i, n)
+                resultados["formula"] = "I = M - C = C * ((1 + i)^n - 1)"
+                resultados["resultado"] = round(M - C, 2)
+
+            elif p.incognita == VariableObjetivo.TASA:
+                if C is None or M is None or n is None:
+                    return {"error": "Faltan datos para calcular Tasa"}
+                if C <= 0 or M <= 0 or n == 0:
+                    return {"error": "Error matemático: se requiere C > 0, M > 0 y n != 0"}
+                # Despeje cerrado: i = (M/C)^(1/n) - 1 (tasa efectiva del periodo de capitalización)
+                i_calc = math.pow(M / C, 1 / n) - 1
+                nombre_per = p.capitalizacion.value.title()
+                resultados["formula"] = "i = (M / C)^(1/n) - 1"
+                resultados["resultado"] = round(i_calc, 6)
+                resultados["tasa_calculada"] = {
+                    "valor": i_calc,
+                    "etiqueta": f"{round(i_calc*100, 4)}% {nombre_per}",
+                    "nominal_anual": i_calc * m_anual,
+                    "efectiva_anual": math.pow(1 + i_calc, m_anual) - 1
+                }
+
+            elif p.incognita == VariableObjetivo.TIEMPO:
+                if C is None or M is None or p.tasa is None:
+                    return {"error": "Faltan datos para calcular Tiempo"}
+                if C <= 0 or M <= 0 or i <= -1 or i == 0:
+                    return {"error": "Error matemático: se requiere C > 0, M > 0 e i != 0"}
+                # Despeje cerrado: n = ln(M/C) / ln(1 + i)
+                n_calc = math.log(M / C) / math.log1p(i)
+                t_meses_calc = n_calc * (12 / m_anual)
+                resultados["formula"] = "n = ln(M / C) / ln(1 + i)"
+                resultados["resultado"] = round(n_calc, 4)
+                resultados["tiempo_calculado"] = {
+                    "n": round(n_calc, 4),
+                    "unidad": p.capitalizacion.value.title(),
+                    "texto_humano": self._formatear_tiempo_humano(t_meses_calc)
+                }
+
+            else:
+                return {"error": f"Incógnita '{p.incognita.value}' no soportada en interés compuesto"}
+
+            # (1+i)^n puede desbordar sin excepción (C / v^n con v^n subnormal da inf)
+            if not math.isfinite(resultados["resultado"]):
+                return {"error": "Error matemático: el resultado desborda (tasa o plazo extremos)"}
+
+        except (ArithmeticError, ValueError) as e:
+            return {"error": f"Error matemático: {str(e)}"}
+
+        return resultados
+
+    # --- SOLUCIONADOR DESCUENTO BANCARIO ---
+    def resolver_descuento_bancario(self, p: ProblemaDescuentoBancario) -> dict:
+        """
+        Comercial: D = Vn * d * n  ->  Vr = Vn * (1 - d*n)
+        Racional:  D = Vr * d * n  ->  Vr = Vn / (1 + d*n)
+        d es la tasa de descuento por periodo de `tasa_descuento.periodo` y n el plazo en esos periodos.
+        """
+        resultados = {}
+        Vn = p.valor_nominal
+        Vr = p.valor_recibido
+        D = p.descuento_importe
+        t_meses = p.tiempo_meses
+        comercial = p.modalidad == ModalidadDescuento.COMERCIAL
+
+        # Inferencia inicial Vn-Vr-D
+        if D is None and Vn is not None and Vr is not None: D = Vn - Vr
+        if Vr is None and Vn is not None and D is not None: Vr = Vn - D
+        if Vn is None and Vr is not None and D is not None: Vn = Vr + D
+
+        freq_tasa = p.tasa_descuento.periodo if p.tasa_descuento else Frequency.ANUAL
+        d = p.tasa_descuento.valor if p.tasa_descuento else None
+        n = t_meses / meses_por_periodo(freq_tasa) if t_meses is not None else None
+
+        try:
+            target = p.incognita
+
+            if target == VariableObjetivo.DESCUENTO:
+                if d is None or n is None or (Vn is None and Vr is None):
+                    return {"error": "Faltan datos para calcular Descuento"}
+                if comercial:
+                    if Vn is None: Vn = Vr / (1 - d * n)
+                    D = Vn * d * n
+                    resultados["formula"] = "D = Vn * d * n"
+                else:
+                    if Vr is None: Vr = Vn / (1 + d * n)
+                    D = Vr * d * n
+                    resultados["formula"] = "D = Vr * d * n"
+                resultados["resultado"] = round(D, 2)
+
+            elif target in (VariableObjetivo.VALOR_NOMINAL, VariableObjetivo.MONTO):
+                if d is None or n is None or (Vr is None and D is None):
+                    return {"error": "Faltan datos para calcular Valor Nominal"}
+                if comercial:
+                    Vn = Vr / (1 - d * n) if Vr is not None else D / (d * n)
+                    resultados["formula"] = "Vn = Vr / (1 - d*n)" if Vr is not None else "Vn = D / (d*n)"
+                else:
+                    Vn = Vr * (1 + d * n) if Vr is not None else D * (1 + d * n) / (d * n)
+                    resultados["formula"] = "Vn = Vr * (1 + d*n)" if Vr is not None else "Vn = D * (1 + d*n) / (d*n)"
+                resultados["resultado"] = round(Vn, 2)
+
+            elif target == VariableObjetivo.CAPITAL:
+                if d is None or n is None or (Vn is None and D is None):
+                    return {"error": "Faltan datos para calcular Valor Recibido"}
+                if comercial:
+                    Vr = Vn * (1 - d * n) if Vn is not None else D / (d * n) - D
+                    resultados["formula"] = "Vr = Vn * (1 - d*n)" if Vn is not None else "Vr = D / (d*n) - D"
+                else:
+                    Vr = Vn / (1 + d * n) if Vn is not None else D / (d * n)
+                    resultados["formula"] = "Vr = Vn / (1 + d*n)" if Vn is not None else "Vr = D / (d*n)"
+                resultados["resultado"] = round(Vr, 2)
+
+            elif target == VariableObjetivo.TASA:
+                base = Vn if comercial else Vr
+                if D is None or base is None or n is None:
+                    return {"error": "Faltan datos para calcular Tasa de Descuento"}
+                d = D / (base * n)
+                resultados["formula"] = "d = D / (Vn * n)" if comercial else "d = D / (Vr * n)"
+                resultados["resultado"] = round(d, 6)
+                resultados["tasa_calculada"] = {
+                    "valor": d,
+                    "etiqueta": f"{round(d*100, 4)}% {freq_tasa.value.title()}",
+                    "anual": d * frecuencia_anual(freq_tasa)
+                }
+
+            elif target == VariableObjetivo.TIEMPO:
+                base = Vn if comercial else Vr
+                if D is None or base is None or d is None:
+                    return {"error": "Faltan datos para calcular Tiempo"}
+                n = D / (base * d)
+                t_meses = n * meses_por_periodo(freq_tasa)
+                resultados["formula"] = "n = D / (Vn * d)" if comercial else "n = D / (Vr * d)"
+                resultados["resultado"] = round(n, 4)
+                resultados["tiempo_calculado"] = {
+                    "n": round(n, 4),
+                    "unidad": freq_tasa.value.title(),
+                    "texto_humano": self._formatear_tiempo_humano(t_meses)
+                }
+
+            else:
+                return {"error": f"Incógnita '{target.value}' no soportada en descuento bancario"}
+
+            # --- BLOQUE DE CONSOLIDACIÓN (Rellenar huecos Vn-Vr-D) ---
+            if D is None and Vn is not None and Vr is not None: D = Vn - Vr
+            if Vr is None and Vn is not None and D is not None: Vr = Vn - D
+            if Vn is None and Vr is not None and D is not None: Vn = Vr + D
+
+            if Vr is not None and Vr <= 0:
+                return {"error": "Error matemático: el descuento agota el valor nominal (d*n >= 1)"}
+
+            # Tasa de interés simple equivalente: la que rinde D sobre lo efectivamente recibido
+            i_equivalente = D / (Vr * n) if None not in (D, Vr, n) and Vr * n != 0 else None
+
+            resultados["resumen"] = {
+                "modalidad": p.modalidad.value,
+                "variables_monetarias": {
+                    "Vn": Vn,
+                    "Vr": Vr,
+                    "D": D
+                },
+                "variables_tasa": {
+                    "d": d,
+                    "i_equivalente": i_equivalente,
+                    "freq": freq_tasa.value.title()
+                },
+                "variables_tiempo": {
+                    "t_legible": self._formatear_tiempo_humano(t_meses) if t_meses is not None else None,
+                    "n": n,
+                    "unidad_n": freq_tasa.value.title()
+                }
+            }
+
+        except Exception as e:
+            return {"error": f"Error matemático: {str(e)}"}
 
         return resultados
 
@@ -249,8 +426,19 @@ class AccountingService:
         elif tipo == "interes_simple":
             return self.resolver_interes_simple(problema_dto)
         elif tipo == "descuento_bancario":
-            return {"error": "Lógica de descuento aún no implementada"}
+            return self.resolver_descuento_bancario(problema_dto)
         else:
             return {"error": "Tipo de problema no soportado"}
 
+    # --- SOLUCIONADOR COLUMNAR (LOTES) ---
+    def solve_batch(self, datos) -> dict:
+        """
+        Resuelve muchas operaciones de interés simple/compuesto y descuento bancario a la vez.
+        `datos` es un DataFrame o un dict de columnas (ver `batch.resolver_lote`).
+        Devuelve arreglos C, M, I, i, n, t_meses más `codigo_error` y `ok` por fila;
+        los mensajes de cada código están en `batch.ERRORES_LOTE`.
+        """
+        # Se reparte en trozos de SOLVER_CHUNK_SIZE filas (NumPy solo se carga en modo lote)
+        return solver_executor.resolver_lote_interes(datos)
+
 accounting_service = AccountingService()
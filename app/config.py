@@ -9,14 +9,64 @@ class Config:
     
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+
+    # Caché de extracciones (memoria LRU + TTL, y opcionalmente SQLite en disco)
+    LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2048"))
+    LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+    LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH") or None
+
+    # Limitador local de cuota (0 = sin límite)
+    LLM_RPM_LIMIT = int(os.getenv("LLM_RPM_LIMIT", "0"))
+    LLM_TPM_LIMIT = int(os.getenv("LLM_TPM_LIMIT", "0"))
+    LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "0"))
+    LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "0"))
+
+    # Reintentos ante 429 (backoff exponencial entre el mínimo y el máximo)
+    LLM_RETRY_ATTEMPTS = int(os.getenv("LLM_RETRY_ATTEMPTS", "4"))
+    LLM_RETRY_MIN_WAIT_SECONDS = float(os.getenv("LLM_RETRY_MIN_WAIT_SECONDS", "30"))
+    LLM_RETRY_MAX_WAIT_SECONDS = float(os.getenv("LLM_RETRY_MAX_WAIT_SECONDS", "120"))
+
+    # Enrutador: schema de un solo tipo y prompt corto cuando el texto lo permite
+    LLM_SCHEMA_ROUTING = os.getenv("LLM_SCHEMA_ROUTING", "true").lower() == "true"
+
+    # Proveedor simulado (LLM_PROVIDER=mock) para pruebas de carga sin red
+    LLM_MOCK_FIXTURES_DIR = os.getenv("LLM_MOCK_FIXTURES_DIR") or None
+    LLM_MOCK_LATENCY_MS = float(os.getenv("LLM_MOCK_LATENCY_MS", "0"))
+    LLM_MOCK_JITTER_MS = float(os.getenv("LLM_MOCK_JITTER_MS", "0"))
+    LLM_MOCK_ERROR_RATE = float(os.getenv("LLM_MOCK_ERROR_RATE", "0"))
+    LLM_MOCK_SEED = int(os.getenv("LLM_MOCK_SEED", "0"))
+    LLM_MOCK_MAX_TEXTS = int(os.getenv("LLM_MOCK_MAX_TEXTS", "10000"))
+
+    # Logging estructurado ("json" o "text")
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+
+    # Endpoint /analyze/batch
+    BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+    BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "10000"))
+
+    # Barridos de sensibilidad: celdas máximas por matriz
+    SWEEP_MAX_CELLS = int(os.getenv("SWEEP_MAX_CELLS", "1000000"))
+
+    # Simulación Monte Carlo de tasas: tope de trayectorias por petición y trayectorias por trozo
+    SIMULATION_MAX_PATHS = int(os.getenv("SIMULATION_MAX_PATHS", "1000000"))
+    SIMULATION_CHUNK_PATHS = int(os.getenv("SIMULATION_CHUNK_PATHS", "10000"))
+
+    # Sesiones de renegociación editables: máximo en memoria y vencimiento por inactividad
+    SESSION_MAX_ACTIVE = int(os.getenv("SESSION_MAX_ACTIVE", "1000"))
+    SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "3600"))
+
+    # Ejecución del motor matemático: "inline", "thread" o "process" (0 workers = núcleos)
+    SOLVER_EXECUTOR = os.getenv("SOLVER_EXECUTOR", "thread").lower()
+    SOLVER_WORKERS = int(os.getenv("SOLVER_WORKERS", "0"))
+    SOLVER_CHUNK_SIZE = int(os.getenv("SOLVER_CHUNK_SIZE", "50000"))
     
     @staticmethod
     def validate():
+        """Se invoca en el arranque de la API o de la CLI; los procesos que solo calculan no la necesitan."""
         if Config.PROVIDER == "openai" and not Config.OPENAI_API_KEY:
             raise ValueError("Error: Configurado 'openai' pero falta OPENAI_API_KEY en .env")
         
         if Config.PROVIDER == "gemini" and not Config.GEMINI_API_KEY:
             raise ValueError("Error: Configurado 'gemini' pero falta GEMINI_API_KEY en .env")
-
-# Validar al importar
-Config.validate()
@@ -1,29 +1,59 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from typing import Any, Dict
+import asyncio
+import itertools
+import json
+import logging
+import os
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from fastapi import Body, FastAPI, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Any, AsyncIterator, Dict, Iterator, List, Literal, Optional
 
 # Importamos nuestros motores
-from app.llm_engine import llm_service
-from app.llm_schema_registry import ExtraccionFinanciera
+from app.config import Config
+from app.entrypoints.api.responses import RespuestaJSON, a_json
+from app.llm_engine import get_llm_service, RateLimitQueueTimeout
+from app.llm_router import Ruta, a_extraccion, enrutar
+from app.llm_schema_registry import ExtraccionFinanciera, ProblemaFinanciero
+from app.accounting.schemas import ProblemaInteresSimple, ProblemaInteresCompuesto, ProblemaDescuentoBancario, ProblemaAmortizacion
+from app.accounting.amortization import amortization_service, COLUMNAS_TABLA
+from app.negotiation.schemas import (
+    Deuda, EdicionDeuda, EdicionPago, EdicionSesion, Pago, ProblemaRenegociacion, SimulacionRenegociacion
+)
+from app.negotiation.session import SesionRenegociacion, sesiones_renegociacion
 from app.accounting.services import accounting_service
 from app.negotiation.services import negotiation_service
+from app.sensitivity.schemas import BarridoInteresCompuesto, BarridoRenegociacion
+from app.sensitivity.services import sensitivity_service
+from app.shared import rates
+from app.executor import solver_executor
+from app.observability import LLM_PROMPT_TOKENS, REQUESTS_TOTAL, STAGE_SECONDS, configurar_logging, medir_etapa, registro
+
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # La configuración del proveedor se valida al arrancar el servidor, no al importar
+    configurar_logging(Config.LOG_LEVEL, Config.LOG_FORMAT)
+    Config.validate()
+    yield
+    solver_executor.shutdown()
 
 app = FastAPI(
     title="Financial AI System",
     description="API para análisis y renegociación financiera.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=RespuestaJSON
 )
 
-class UserRequest(BaseModel):
-    text: str
+# "summary": sin desglose por flujo ni razonamiento del LLM; "full": la Ficha Técnica completa
+Detalle = Literal["summary", "full"]
+QUERY_DETALLE = Query("full", description="'summary' omite el desglose por flujo y el razonamiento del LLM")
 
-@app.post("/analyze")
-async def analyze_financial_problem(request: UserRequest) -> Dict[str, Any]:
-    """
-    Recibe un texto financiero, lo procesa y devuelve la Ficha Técnica estructurada.
-    """
-    try:
-        system_prompt = """
+SYSTEM_PROMPT = """
         Eres un experto actuario. Extrae datos para problemas de:
         1. Interés Simple/Compuesto (Capital, Monto, Tasa, Tiempo).
         2. Renegociación de Deudas (Deudas viejas, Pagos nuevos, Fecha Focal).
@@ -32,50 +62,480 @@ async def analyze_financial_problem(request: UserRequest) -> Dict[str, Any]:
         - Si el usuario pide tasa 'trimestral', 'mensual', etc., ponlo en 'periodo_tasa_solicitada'.
         - Normaliza tiempos a meses.
         """
+
+class UserRequest(BaseModel):
+    text: str
+
+class BatchRequest(BaseModel):
+    texts: List[str] = Field(..., max_length=Config.BATCH_MAX_ITEMS)
+    max_concurrency: Optional[int] = Field(None, ge=1, le=Config.BATCH_MAX_CONCURRENCY)
+
+class SolveRequest(BaseModel):
+    problema: ProblemaFinanciero
+
+def _resolver_problema(problem_data, detalle: Detalle = "full") -> Any:
+    """
+    Envía un problema estructurado al motor matemático que corresponde.
+    Devuelve None si el tipo no está soportado y lanza HTTPException(400) ante un error matemático.
+    En modo "summary" la renegociación no arma el desglose y devuelve un resultado compacto.
+    """
+    problem_type = problem_data.tipo
+
+    if problem_type == "renegociacion_deuda":
+        if detalle == "summary":
+            calc_result = negotiation_service.resolver_resumen(problem_data)
+        else:
+            calc_result = negotiation_service.resolver_ecuacion_valor(problem_data)
         
-        extraccion = llm_service.extract_data(
-            system_prompt=system_prompt,
-            user_text=request.text,
-            schema=ExtraccionFinanciera
-        )
-        
-        problem_data = extraccion.problema
-        problem_type = problem_data.tipo
+    elif problem_type in ["interes_simple", "interes_compuesto", "descuento_bancario"]:
+        calc_result = accounting_service.solve(problem_data)
         
-        calc_result = {}
+    else:
+        return None
 
-        if problem_type == "renegociacion_deuda":
-            calc_result = negotiation_service.resolver_ecuacion_valor(problem_data)
-            
-        elif problem_type in ["interes_simple", "interes_compuesto"]:
-            calc_result = accounting_service.solve(problem_data)
-            
-        else:
-            return {
-                "status": "warning",
-                "message": f"Tipo de problema '{problem_type}' detectado pero no soportado por el motor matemático.",
-                "analysis": extraccion.razonamiento
-            }
+    # Manejo de Errores Matemáticos
+    if isinstance(calc_result, dict) and "error" in calc_result:
+        raise HTTPException(status_code=400, detail=calc_result["error"])
 
-        # Manejo de Errores Matemáticos
-        if "error" in calc_result:
-            raise HTTPException(status_code=400, detail=calc_result["error"])
+    return calc_result
 
-        # RESPUESTA JSON ESTANDARIZADA
+async def _extraer(texto: str) -> tuple:
+    """
+    Extrae con el schema que elige el enrutador: el de un solo tipo si el texto lo deja
+    claro, la unión completa si no. Devuelve la extracción común y la ruta usada.
+    """
+    ruta = enrutar(texto, SYSTEM_PROMPT, compactar=Config.LLM_SCHEMA_ROUTING)
+    LLM_PROMPT_TOKENS.observe(ruta.prompt_tokens, route=ruta.nombre)
+    resultado = await get_llm_service().extract_data_async(
+        system_prompt=ruta.system_prompt,
+        user_text=texto,
+        schema=ruta.schema
+    )
+    return a_extraccion(resultado), ruta
+
+def _resolver_extraccion(extraccion: ExtraccionFinanciera, ruta: Optional[Ruta] = None, detalle: Detalle = "full") -> Dict[str, Any]:
+    """Resuelve el problema extraído por el LLM y arma la respuesta estandarizada."""
+    problem_type = extraccion.problema.tipo
+    calc_result = _resolver_problema(extraccion.problema, detalle)
+
+    if calc_result is None:
+        respuesta = {
+            "status": "warning",
+            "message": f"Tipo de problema '{problem_type}' detectado pero no soportado por el motor matemático."
+        }
+        if detalle == "full":
+            respuesta["analysis"] = extraccion.razonamiento
+        return respuesta
+
+    if detalle == "summary":
         return {
             "status": "success",
-            "metadata": {
-                "type": problem_type,
-                "reasoning": extraccion.razonamiento,
-                "model_used": llm_service.model
-            },
+            "metadata": {"type": problem_type, "model_used": get_llm_service().model},
             "financial_data": calc_result
         }
 
+    # RESPUESTA JSON ESTANDARIZADA
+    return {
+        "status": "success",
+        "metadata": {
+            "type": problem_type,
+            "reasoning": extraccion.razonamiento,
+            "model_used": get_llm_service().model,
+            "schema_route": ruta.nombre if ruta else None,
+            "prompt_tokens_estimate": ruta.prompt_tokens if ruta else None
+        },
+        "financial_data": calc_result
+    }
+
+def _respuesta_solve(problem_data, detalle: Detalle = "full") -> RespuestaJSON:
+    calc_result = _resolver_problema(problem_data, detalle)
+    if calc_result is None:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Tipo de problema '{problem_data.tipo.value}' no soportado por el motor matemático."
+        )
+    return RespuestaJSON({
+        "status": "success",
+        "metadata": {"type": problem_data.tipo},
+        "financial_data": calc_result
+    })
+
+@app.post("/analyze")
+async def analyze_financial_problem(request: UserRequest, detail: Detalle = QUERY_DETALLE) -> RespuestaJSON:
+    """
+    Recibe un texto financiero, lo procesa y devuelve la Ficha Técnica estructurada.
+    Cada etapa (extracción, cálculo, serialización) se registra en /metrics.
+    """
+    inicio = time.perf_counter()
+    estado = 500
+    try:
+        with medir_etapa("/analyze", "extraction"):
+            extraccion, ruta = await _extraer(request.text)
+        with medir_etapa("/analyze", "solver"):
+            # El cálculo corre fuera del event loop para no frenar las demás peticiones
+            resultado = await solver_executor.ejecutar(_resolver_extraccion, extraccion, ruta, detail)
+        with medir_etapa("/analyze", "serialization"):
+            respuesta = RespuestaJSON(resultado)
+        estado = 200
+        return respuesta
+
+    except HTTPException as e:
+        estado = e.status_code
+        raise
+
+    except RateLimitQueueTimeout as e:
+        estado = 503
+        logger.warning("Cola del limitador agotada", extra={"endpoint": "/analyze", "error": str(e)})
+        raise HTTPException(status_code=503, detail=str(e))
+
     except Exception as e:
-        print(f"Server Error: {e}")
+        logger.exception("Error inesperado en /analyze")
         raise HTTPException(status_code=500, detail=str(e))
 
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - inicio, endpoint="/analyze", stage="total")
+        REQUESTS_TOTAL.inc(endpoint="/analyze", status=estado)
+
+async def _analizar_item(indice: int, texto: str, detalle: Detalle) -> Dict[str, Any]:
+    """Procesa un elemento del lote; los errores se reportan en la línea, no abortan el lote."""
+    try:
+        with medir_etapa("/analyze/batch", "extraction"):
+            extraccion, ruta = await _extraer(texto)
+        with medir_etapa("/analyze/batch", "solver"):
+            resultado = {"index": indice, **(await solver_executor.ejecutar(_resolver_extraccion, extraccion, ruta, detalle))}
+        REQUESTS_TOTAL.inc(endpoint="/analyze/batch", status=200)
+        return resultado
+
+    except HTTPException as e:
+        resultado = {"index": indice, "status": "error", "status_code": e.status_code, "detail": e.detail}
+
+    except RateLimitQueueTimeout as e:
+        resultado = {"index": indice, "status": "error", "status_code": 503, "detail": str(e)}
+
+    except Exception as e:
+        logger.exception("Error inesperado en un elemento de /analyze/batch", extra={"index": indice})
+        resultado = {"index": indice, "status": "error", "status_code": 500, "detail": str(e)}
+
+    REQUESTS_TOTAL.inc(endpoint="/analyze/batch", status=resultado["status_code"])
+    return resultado
+
+async def _stream_lote(textos: List[str], concurrencia: int, detalle: Detalle) -> AsyncIterator[bytes]:
+    """
+    Mantiene como máximo `concurrencia` extracciones en vuelo y emite una línea NDJSON
+    por elemento en cuanto termina (en orden de finalización, no de entrada).
+    """
+    pendientes = set()
+    siguientes = iter(enumerate(textos))
+    try:
+        for indice, texto in itertools.islice(siguientes, concurrencia):
+            pendientes.add(asyncio.ensure_future(_analizar_item(indice, texto, detalle)))
+
+        while pendientes:
+            terminadas, pendientes = await asyncio.wait(pendientes, return_when=asyncio.FIRST_COMPLETED)
+            for tarea in terminadas:
+                yield a_json(tarea.result()) + b"\n"
+                for indice, texto in itertools.islice(siguientes, 1):
+                    pendientes.add(asyncio.ensure_future(_analizar_item(indice, texto, detalle)))
+    finally:
+        # Si el cliente se desconecta, no dejamos extracciones huérfanas
+        for tarea in pendientes:
+            tarea.cancel()
+
+@app.post("/analyze/batch")
+async def analyze_batch(request: BatchRequest, detail: Detalle = QUERY_DETALLE) -> StreamingResponse:
+    """
+    Analiza una lista de textos con concurrencia acotada y transmite los resultados
+    como NDJSON (una línea por texto, con su `index` y `status`).
+    """
+    concurrencia = request.max_concurrency or Config.BATCH_MAX_CONCURRENCY
+    return StreamingResponse(
+        _stream_lote(request.texts, concurrencia, detail),
+        media_type="application/x-ndjson"
+    )
+
+# --- SOLUCIÓN DIRECTA (sin LLM) ---
+# Para quien ya tiene los datos estructurados: se valida contra los schemas y se
+# llama al motor matemático directamente, sin pasar por la extracción.
+
+@app.post("/solve")
+async def solve_problem(request: SolveRequest, detail: Detalle = QUERY_DETALLE) -> RespuestaJSON:
+    """Resuelve cualquier problema estructurado; el campo `problema.tipo` decide el motor."""
+    return await solver_executor.ejecutar(_respuesta_solve, request.problema, detail)
+
+@app.post("/solve/interes-simple")
+async def solve_interes_simple(problema: ProblemaInteresSimple, detail: Detalle = QUERY_DETALLE) -> RespuestaJSON:
+    return await solver_executor.ejecutar(_respuesta_solve, problema, detail)
+
+@app.post("/solve/interes-compuesto")
+async def solve_interes_compuesto(problema: ProblemaInteresCompuesto, detail: Detalle = QUERY_DETALLE) -> RespuestaJSON:
+    return await solver_executor.ejecutar(_respuesta_solve, problema, detail)
+
+@app.post("/solve/descuento-bancario")
+async def solve_descuento_bancario(problema: ProblemaDescuentoBancario, detail: Detalle = QUERY_DETALLE) -> RespuestaJSON:
+    return await solver_executor.ejecutar(_respuesta_solve, problema, detail)
+
+@app.post("/solve/renegociacion")
+async def solve_renegociacion(problema: ProblemaRenegociacion, detail: Detalle = QUERY_DETALLE) -> RespuestaJSON:
+    return await solver_executor.ejecutar(_respuesta_solve, problema, detail)
+
+@app.post("/solve/renegociacion/lote")
+async def solve_renegociacion_lote(
+    problemas: List[ProblemaRenegociacion] = Body(..., max_length=Config.BATCH_MAX_ITEMS)
+) -> Dict[str, Any]:
+    """
+    Resuelve muchas renegociaciones con el motor vectorizado. Los lotes grandes se reparten
+    en trozos de `SOLVER_CHUNK_SIZE` entre los workers de `SOLVER_EXECUTOR`.
+    Devuelve una lista por campo (valor_x, valor_presente_deudas, ..., codigo_error).
+    """
+    from app.negotiation.engine import ERRORES_LOTE
+
+    resultado = await solver_executor.ejecutar_lote(negotiation_service.resolver_lote, problemas)
+    codigos = resultado["codigo_error"].tolist()
+    return {
+        "status": "success",
+        "metadata": {"type": "renegociacion_deuda", "count": len(problemas)},
+        "financial_data": {
+            # NaN (problema con error) -> null
+            **{clave: [None if v != v else v for v in valores.tolist()] for clave, valores in resultado.items() if clave != "codigo_error"},
+            "codigo_error": codigos,
+            "error": [ERRORES_LOTE.get(c) for c in codigos]
+        }
+    }
+
+# --- SENSIBILIDAD Y ESCENARIOS (sin LLM) ---
+
+def _respuesta_barrido(resultado: Dict[str, Any], tipo: str) -> Dict[str, Any]:
+    if "error" in resultado:
+        raise HTTPException(status_code=400, detail=resultado["error"])
+    return {"status": "success", "metadata": {"type": tipo}, "sensitivity": resultado}
+
+@app.post("/sensibilidad/renegociacion")
+async def sensibilidad_renegociacion(request: BarridoRenegociacion) -> Dict[str, Any]:
+    """
+    Evalúa X sobre una malla de tasas × desplazamientos de los pagos y los totales en fecha
+    focal sobre tasas × fechas focales, con derivadas analíticas respecto de cada eje.
+    """
+    resultado = await solver_executor.ejecutar_lote(sensitivity_service.barrer_renegociacion, request)
+    return _respuesta_barrido(resultado, request.problema.tipo)
+
+@app.post("/sensibilidad/interes-compuesto")
+async def sensibilidad_interes_compuesto(request: BarridoInteresCompuesto) -> Dict[str, Any]:
+    """Evalúa M (o C) sobre una malla de tasas × plazos, con duración y convexidad analíticas."""
+    resultado = await solver_executor.ejecutar_lote(sensitivity_service.barrer_interes_compuesto, request)
+    return _respuesta_barrido(resultado, request.problema.tipo)
+
+@app.post("/simulacion/renegociacion")
+async def simulacion_renegociacion(request: SimulacionRenegociacion) -> Dict[str, Any]:
+    """
+    Monte Carlo de la tasa (Vasicek, CIR o bootstrap histórico): distribución de X y del
+    valor presente de las deudas. Las trayectorias se generan por trozos de
+    `SIMULATION_CHUNK_PATHS` y nunca se guardan completas.
+    """
+    resultado = await solver_executor.ejecutar_lote(negotiation_service.simular_riesgo, request)
+    if "error" in resultado:
+        raise HTTPException(status_code=400, detail=resultado["error"])
+    return {"status": "success", "metadata": {"type": request.problema.tipo}, "simulation": resultado}
+
+# --- SESIONES DE RENEGOCIACIÓN (edición incremental) ---
+# Las ediciones de un flujo son O(1) y se atienden en el propio event loop; solo crear la
+# sesión y cambiar la tasa recorren todos los flujos.
+
+def _sesion(sesion_id: str) -> SesionRenegociacion:
+    sesion = sesiones_renegociacion.obtener(sesion_id)
+    if sesion is None:
+        raise HTTPException(status_code=404, detail="Sesión no encontrada o vencida.")
+    return sesion
+
+def _editar_sesion(sesion_id: str, edicion, *args, clave: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Aplica una edición y devuelve el estado (más el resultado de la edición en `clave`, si se
+    indica). ValueError -> 400; flujo inexistente -> 404.
+    """
+    sesion = _sesion(sesion_id)
+    try:
+        resultado = edicion(sesion, *args)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Flujo no encontrado en la sesión.")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    respuesta = {"status": "success", "session_id": sesion_id, "estado": sesion.estado()}
+    if clave:
+        respuesta[clave] = resultado
+    return respuesta
+
+@app.post("/sesiones/renegociacion")
+async def crear_sesion(problema: ProblemaRenegociacion) -> Dict[str, Any]:
+    """Abre una sesión editable; los flujos del problema reciben ids en orden (deudas y luego pagos)."""
+    try:
+        sesion_id, sesion = await solver_executor.ejecutar(sesiones_renegociacion.crear, problema)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "success", "session_id": sesion_id, "estado": sesion.estado(), "flujos": sesion.flujos()}
+
+@app.get("/sesiones/renegociacion/{sesion_id}")
+async def leer_sesion(sesion_id: str, flujos: bool = False) -> Dict[str, Any]:
+    sesion = _sesion(sesion_id)
+    respuesta = {"status": "success", "session_id": sesion_id, "estado": sesion.estado()}
+    if flujos:
+        respuesta["flujos"] = sesion.flujos()
+    return respuesta
+
+@app.get("/sesiones/renegociacion/{sesion_id}/problema")
+async def problema_sesion(sesion_id: str) -> ProblemaRenegociacion:
+    """El problema equivalente, para resolverlo completo (con desglose) en /solve/renegociacion."""
+    return _sesion(sesion_id).a_problema()
+
+@app.patch("/sesiones/renegociacion/{sesion_id}")
+async def editar_sesion(sesion_id: str, edicion: EdicionSesion) -> Dict[str, Any]:
+    """Cambia la tasa y/o la fecha focal; los factores solo se recalculan si cambia la tasa mensual."""
+    return _editar_sesion(sesion_id, SesionRenegociacion.editar, edicion, clave="recalculo_factores")
+
+@app.delete("/sesiones/renegociacion/{sesion_id}")
+async def cerrar_sesion(sesion_id: str) -> Dict[str, Any]:
+    if not sesiones_renegociacion.eliminar(sesion_id):
+        raise HTTPException(status_code=404, detail="Sesión no encontrada o vencida.")
+    return {"status": "success", "session_id": sesion_id}
+
+@app.post("/sesiones/renegociacion/{sesion_id}/deudas")
+async def agregar_deuda(sesion_id: str, deuda: Deuda) -> Dict[str, Any]:
+    return _editar_sesion(sesion_id, SesionRenegociacion.agregar_deuda, deuda, clave="flujo_id")
+
+@app.patch("/sesiones/renegociacion/{sesion_id}/deudas/{flujo_id}")
+async def editar_deuda(sesion_id: str, flujo_id: int, edicion: EdicionDeuda) -> Dict[str, Any]:
+    return _editar_sesion(sesion_id, SesionRenegociacion.editar_deuda, flujo_id, edicion)
+
+@app.delete("/sesiones/renegociacion/{sesion_id}/deudas/{flujo_id}")
+async def quitar_deuda(sesion_id: str, flujo_id: int) -> Dict[str, Any]:
+    return _editar_sesion(sesion_id, SesionRenegociacion.quitar_deuda, flujo_id)
+
+@app.post("/sesiones/renegociacion/{sesion_id}/pagos")
+async def agregar_pago(sesion_id: str, pago: Pago) -> Dict[str, Any]:
+    return _editar_sesion(sesion_id, SesionRenegociacion.agregar_pago, pago, clave="flujo_id")
+
+@app.patch("/sesiones/renegociacion/{sesion_id}/pagos/{flujo_id}")
+async def editar_pago(sesion_id: str, flujo_id: int, edicion: EdicionPago) -> Dict[str, Any]:
+    return _editar_sesion(sesion_id, SesionRenegociacion.editar_pago, flujo_id, edicion)
+
+@app.delete("/sesiones/renegociacion/{sesion_id}/pagos/{flujo_id}")
+async def quitar_pago(sesion_id: str, flujo_id: int) -> Dict[str, Any]:
+    return _editar_sesion(sesion_id, SesionRenegociacion.quitar_pago, flujo_id)
+
+# --- TABLAS DE AMORTIZACIÓN (streaming) ---
+
+def _stream_tabla(filas: Iterator[dict], formato: str, filas_por_bloque: int = 512) -> Iterator[bytes]:
+    """Serializa las filas del generador por bloques; la tabla nunca se materializa completa."""
+    if formato == "csv":
+        yield (",".join(COLUMNAS_TABLA) + "\n").encode("utf-8")
+
+    bloque = []
+    for fila in filas:
+        if formato == "csv":
+            bloque.append(
+                f"{fila['periodo']},{fila['mes']:.4f},{fila['cuota']:.2f},{fila['interes']:.2f},"
+                f"{fila['amortizacion']:.2f},{fila['saldo']:.2f}\n"
+            )
+        else:
+            bloque.append(json.dumps({
+                "periodo": fila["periodo"],
+                "mes": round(fila["mes"], 4),
+                "cuota": round(fila["cuota"], 2),
+                "interes": round(fila["interes"], 2),
+                "amortizacion": round(fila["amortizacion"], 2),
+                "saldo": round(fila["saldo"], 2)
+            }) + "\n")
+        if len(bloque) >= filas_por_bloque:
+            yield "".join(bloque).encode("utf-8")
+            bloque.clear()
+    if bloque:
+        yield "".join(bloque).encode("utf-8")
+
+@app.post("/amortizacion")
+def amortizacion(problema: ProblemaAmortizacion, formato: Literal["ndjson", "csv"] = "ndjson") -> StreamingResponse:
+    """
+    Genera la tabla de amortización (Francés, Alemán o Americano) y la transmite
+    fila por fila como NDJSON o CSV.
+    """
+    try:
+        filas = amortization_service.iterar_tabla(problema)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    media_type = "text/csv" if formato == "csv" else "application/x-ndjson"
+    return StreamingResponse(_stream_tabla(filas, formato), media_type=media_type)
+
+# --- INGESTA DE CARTERAS (CSV/Parquet, sin LLM) ---
+
+def _stream_ingesta(ruta: str, bloques) -> Iterator[bytes]:
+    from app.ingestion import pipeline
+
+    try:
+        yield from pipeline.a_csv(bloques)
+    finally:
+        os.unlink(ruta)
+
+@app.post("/ingest")
+async def ingest(
+    request: Request,
+    tipo: Literal["interes", "renegociacion"],
+    formato: Literal["csv", "parquet"] = "csv",
+    chunk_size: int = Query(100_000, ge=1, le=5_000_000)
+) -> StreamingResponse:
+    """
+    Recibe el archivo como cuerpo crudo (`Content-Type: text/csv` o Parquet), lo resuelve
+    por bloques con los motores vectorizados y devuelve los resultados como CSV en streaming.
+    El cuerpo se vuelca a un archivo temporal para no retenerlo en memoria.
+    """
+    # pandas solo se importa si se usa la ingesta
+    from app.ingestion import pipeline
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix=f".{formato}") as archivo:
+        ruta = archivo.name
+    # Hasta entregarlo a _stream_ingesta (que lo borra al terminar), el archivo se borra aquí
+    # ante cualquier error: cliente desconectado, pyarrow, codificación, etc.
+    entregado = False
+    resultados = None
+    try:
+        with open(ruta, "wb") as archivo:
+            async for parte in request.stream():
+                archivo.write(parte)
+
+        resultados = pipeline.procesar(pipeline.leer_bloques(ruta, formato, chunk_size), tipo)
+        # El primer bloque se procesa aquí para responder 400 si faltan columnas
+        try:
+            primero = await asyncio.to_thread(next, resultados, None)
+        except (ValueError, RuntimeError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if primero is None:
+            raise HTTPException(status_code=400, detail="El archivo no contiene filas.")
+
+        respuesta = StreamingResponse(_stream_ingesta(ruta, itertools.chain([primero], resultados)), media_type="text/csv")
+        entregado = True
+        return respuesta
+    finally:
+        if not entregado:
+            if resultados is not None:
+                resultados.close()
+            os.unlink(ruta)
+
+@app.get("/stats")
+def stats() -> Dict[str, Any]:
+    """Contadores de las cachés (extracciones y tasas), la deduplicación en vuelo, el limitador de cuota y las sesiones."""
+    llm_service = get_llm_service()
+    return {
+        "extraction_cache": llm_service.cache.stats() if llm_service.cache else None,
+        "single_flight": llm_service.single_flight.stats(),
+        "rate_limiter": llm_service.rate_limiter.stats(),
+        "rate_tables": rates.stats(),
+        "mock_provider": llm_service.client.stats() if llm_service.provider == "mock" else None,
+        "solver_executor": solver_executor.stats(),
+        "renegotiation_sessions": sesiones_renegociacion.stats()
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> PlainTextResponse:
+    """Histogramas y contadores en formato de texto de Prometheus."""
+    return PlainTextResponse(registro.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get("/")
 def home():
     return {"msg": "Financial System API is Running 🚀"}
@@ -0,0 +1,28 @@
+"""
+Serialización JSON con orjson. Las rutas calientes devuelven `RespuestaJSON` ya armada
+para no pasar por `jsonable_encoder`, que recorre y copia cada dict anidado.
+"""
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+# Arreglos y escalares de NumPy van directo (NaN -> null); claves no str (p. ej. enums) se convierten
+OPCIONES = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _por_defecto(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    raise TypeError(f"Tipo no serializable: {type(obj).__name__}")
+
+
+def a_json(contenido: Any) -> bytes:
+    """dict, listas, dataclasses, enums, modelos Pydantic y NumPy -> JSON en UTF-8."""
+    return orjson.dumps(contenido, default=_por_defecto, option=OPCIONES)
+
+
+class RespuestaJSON(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return a_json(content)
@@ -0,0 +1,40 @@
+"""
+Ingesta de carteras desde la línea de comandos (sin LLM ni API Key):
+
+    python -m app.entrypoints.cli.ingest cartera.csv resultados.parquet --tipo interes
+    python -m app.entrypoints.cli.ingest flujos.parquet resultados.csv --tipo renegociacion --chunk-size 200000
+"""
+import argparse
+import sys
+import time
+
+from app.ingestion import pipeline
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.entrypoints.cli.ingest", description="Resuelve carteras CSV/Parquet por bloques.")
+    parser.add_argument("entrada", help="Archivo CSV o Parquet de entrada.")
+    parser.add_argument("salida", help="Archivo de resultados (.csv o .parquet).")
+    parser.add_argument("--tipo", choices=pipeline.TIPOS, required=True, help="Tipo de cartera.")
+    parser.add_argument("--chunk-size", type=int, default=pipeline.TAMANO_BLOQUE, help="Filas por bloque.")
+    parser.add_argument("--formato-entrada", choices=pipeline.FORMATOS, help="Por defecto se deduce de la extensión.")
+    parser.add_argument("--formato-salida", choices=pipeline.FORMATOS, help="Por defecto se deduce de la extensión.")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    try:
+        resumen = pipeline.ingerir(
+            args.entrada, args.salida, args.tipo, args.chunk_size,
+            formato_entrada=args.formato_entrada, formato_salida=args.formato_salida
+        )
+    except (ValueError, RuntimeError, FileNotFoundError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+
+    segundos = time.perf_counter() - inicio
+    print(f"✅ {resumen['filas']:,} filas escritas en {args.salida} ({resumen['errores']:,} con error) en {segundos:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
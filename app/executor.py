@@ -0,0 +1,164 @@
+"""
+Capa de ejecución para los lotes del motor matemático.
+
+Los lotes grandes se parten en trozos y cada trozo se resuelve en un pool (hilos o
+procesos, según `SOLVER_EXECUTOR`). Entre procesos solo viajan arreglos NumPy: columnas
+para interés simple/compuesto y `LoteFlujos` (flujos concatenados + offsets) para
+renegociación; nunca modelos Pydantic. Las funciones de los trabajadores son las del
+motor (`batch.resolver_lote`, `engine.resolver_lote_flujos`), importables por nombre.
+
+Los cálculos individuales de los endpoints async se mandan a un pool de hilos propio
+para que no bloqueen el event loop que atiende /analyze. Los endpoints de lotes,
+barridos y simulaciones usan otro pool (`ejecutar_lote`): sus hilos esperan a los
+trozos y, si compartieran pool, dejarían a /analyze en cola detrás de ellos.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from app.config import Config
+
+MODOS = ("inline", "thread", "process")
+
+
+def _unir(resultados: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Concatena, clave por clave, los dicts de arreglos devueltos por cada trozo."""
+    import numpy as np
+
+    if len(resultados) == 1:
+        return resultados[0]
+    return {clave: np.concatenate([r[clave] for r in resultados]) for clave in resultados[0]}
+
+
+class SolverExecutor:
+    def __init__(self, modo: str = "thread", workers: int = 0, tamano_trozo: int = 50_000):
+        if modo not in MODOS:
+            raise ValueError(f"SOLVER_EXECUTOR debe ser uno de {MODOS}, no '{modo}'")
+        self.modo = modo
+        self.workers = workers or os.cpu_count() or 1
+        self.tamano_trozo = max(int(tamano_trozo), 1)
+
+        self._lock = threading.Lock()
+        self._pool_lotes: Optional[Executor] = None
+        self._pool_hilos: Optional[ThreadPoolExecutor] = None
+        self._pool_pesados: Optional[ThreadPoolExecutor] = None
+
+        self.tareas = 0
+        self.tareas_lote = 0
+        self.trozos = 0
+
+    # --- POOLS (se crean en el primer uso) ---
+    def _get_pool_lotes(self) -> Executor:
+        if self._pool_lotes is None:
+            with self._lock:
+                if self._pool_lotes is None:
+                    if self.modo == "process":
+                        # spawn: los trabajadores no heredan hilos ni locks del servidor
+                        self._pool_lotes = ProcessPoolExecutor(
+                            max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                        )
+                    else:
+                        self._pool_lotes = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="solver-lote")
+        return self._pool_lotes
+
+    def _get_pool_hilos(self) -> ThreadPoolExecutor:
+        if self._pool_hilos is None:
+            with self._lock:
+                if self._pool_hilos is None:
+                    self._pool_hilos = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="solver")
+        return self._pool_hilos
+
+    def _get_pool_pesados(self) -> ThreadPoolExecutor:
+        if self._pool_pesados is None:
+            with self._lock:
+                if self._pool_pesados is None:
+                    self._pool_pesados = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="solver-pesado")
+        return self._pool_pesados
+
+    def shutdown(self) -> None:
+        with self._lock:
+            for pool in (self._pool_lotes, self._pool_hilos, self._pool_pesados):
+                if pool is not None:
+                    pool.shutdown(wait=False, cancel_futures=True)
+            self._pool_lotes = self._pool_hilos = self._pool_pesados = None
+
+    # --- CÁLCULOS DESDE ENDPOINTS ASYNC ---
+    async def _en_pool(self, pool_de: Callable, fn: Callable, args: tuple, kwargs: dict) -> Any:
+        if self.modo == "inline":
+            return fn(*args, **kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(pool_de(), lambda: fn(*args, **kwargs))
+
+    async def ejecutar(self, fn: Callable, *args, **kwargs) -> Any:
+        """Corre `fn` (un cálculo individual) en el pool de hilos del motor sin bloquear el event loop."""
+        with self._lock:
+            self.tareas += 1
+        return await self._en_pool(self._get_pool_hilos, fn, args, kwargs)
+
+    async def ejecutar_lote(self, fn: Callable, *args, **kwargs) -> Any:
+        """Como `ejecutar`, para lotes, barridos y simulaciones: van a su propio pool de hilos."""
+        with self._lock:
+            self.tareas_lote += 1
+        return await self._en_pool(self._get_pool_pesados, fn, args, kwargs)
+
+    # --- LOTES POR TROZOS ---
+    def _rangos(self, total: int) -> List[tuple]:
+        return [(inicio, min(inicio + self.tamano_trozo, total)) for inicio in range(0, total, self.tamano_trozo)]
+
+    def mapear(self, fn: Callable, trozos: list) -> List[Any]:
+        """Aplica `fn` a cada trozo en el pool de lotes (en orden); un solo trozo corre en línea."""
+        with self._lock:
+            self.trozos += len(trozos)
+        if self.modo == "inline" or len(trozos) <= 1:
+            return [fn(trozo) for trozo in trozos]
+        return list(self._get_pool_lotes().map(fn, trozos))
+
+    def _por_trozos(self, fn: Callable, completo, total: int, rebanar: Callable) -> Dict[str, Any]:
+        rangos = self._rangos(total)
+        if not rangos:
+            # Lote vacío: el trabajador devuelve arreglos vacíos con sus claves, sin pasar por el pool
+            return fn(completo)
+        return _unir(self.mapear(fn, [rebanar(inicio, fin) for inicio, fin in rangos]))
+
+    def resolver_lote_interes(self, datos) -> Dict[str, Any]:
+        """Como `batch.resolver_lote`, repartido en trozos de `tamano_trozo` filas."""
+        from app.accounting import batch
+
+        columnas = {c: datos[c] for c in batch.COLUMNAS_LOTE if c in datos}
+        # Series de pandas -> arreglos: es lo único que cruza la frontera entre procesos
+        columnas = {c: getattr(v, "to_numpy", lambda v=v: v)() for c, v in columnas.items()}
+        return self._por_trozos(
+            batch.resolver_lote, columnas, len(columnas["incognita"]),
+            lambda inicio, fin: {c: v[inicio:fin] for c, v in columnas.items()}
+        )
+
+    def resolver_lote_flujos(self, lote) -> Dict[str, Any]:
+        """Como `engine.resolver_lote_flujos`, repartido en trozos de `tamano_trozo` problemas."""
+        from app.negotiation import engine
+
+        return self._por_trozos(engine.resolver_lote_flujos, lote, lote.n_problemas, lote.rebanar)
+
+    def tasas_implicitas_lote(self, lote) -> Dict[str, Any]:
+        from app.negotiation import engine
+
+        return self._por_trozos(engine.tasas_implicitas_lote, lote, lote.n_problemas, lote.rebanar)
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.modo,
+            "workers": self.workers,
+            "chunk_size": self.tamano_trozo,
+            "tasks": self.tareas,
+            "batch_tasks": self.tareas_lote,
+            "chunks": self.trozos
+        }
+
+
+solver_executor = SolverExecutor(
+    modo=Config.SOLVER_EXECUTOR,
+    workers=Config.SOLVER_WORKERS,
+    tamano_trozo=Config.SOLVER_CHUNK_SIZE
+)
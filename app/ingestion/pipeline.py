@@ -0,0 +1,259 @@
+"""
+Ingesta masiva de carteras en CSV/Parquet con pandas, por bloques y sin LLM.
+
+- Cartera de interés (`tipo="interes"`): una fila por operación, con las columnas de
+  `batch.resolver_lote` (tipo, incognita, capital, monto_futuro, tasa_valor, ...).
+  Incluye descuento bancario (pagarés, facturas): valor_nominal, valor_recibido,
+  descuento_importe y modalidad ("comercial" | "racional").
+- Cartera de renegociación (`tipo="renegociacion"`): formato largo, una fila por flujo:
+  problema_id, lado ("deuda" | "pago"), monto (vacío = incógnita), mes,
+  proporcion_incognita (por defecto 1.0 si el monto está vacío), incognita (opcional)
+  y, por problema, tasa_valor, tasa_es_nominal, tasa_capitalizacion, tasa_periodo y
+  fecha_focal_mes (se toma la primera fila). Las filas de un mismo problema deben ser
+  contiguas; un problema partido entre dos bloques se completa con el bloque siguiente.
+
+Las columnas se validan una vez por bloque (nombres y tipos), nunca con un objeto
+Pydantic por fila; los valores inválidos terminan como `codigo_error` en la salida.
+"""
+from pathlib import Path
+from typing import Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.accounting import batch
+from app.executor import solver_executor
+from app.negotiation import engine
+from app.shared.rates import FRECUENCIA_ANUAL
+
+TIPOS = ("interes", "renegociacion")
+FORMATOS = ("csv", "parquet")
+TAMANO_BLOQUE = 100_000
+
+COLUMNAS_REQUERIDAS = {
+    "interes": {"tipo", "incognita"},
+    "renegociacion": {"problema_id", "lado", "mes", "tasa_valor"},
+}
+_NUMERICAS = {
+    "interes": (
+        "capital", "monto_futuro", "interes_ganado", "tiempo_meses", "tasa_valor",
+        "valor_nominal", "valor_recibido", "descuento_importe",
+    ),
+    "renegociacion": ("monto", "mes", "proporcion_incognita", "tasa_valor", "fecha_focal_mes"),
+}
+_M_POR_TEXTO = {frecuencia.value: m for frecuencia, m in FRECUENCIA_ANUAL.items()}
+
+
+def detectar_formato(ruta: str) -> str:
+    return "parquet" if Path(ruta).suffix.lower() in (".parquet", ".pq") else "csv"
+
+
+def _pyarrow_parquet():
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("Leer o escribir Parquet requiere `pyarrow` (pip install pyarrow).") from e
+    return pq
+
+
+# --- LECTURA ---
+
+def leer_bloques(origen, formato: str, tamano_bloque: int = TAMANO_BLOQUE) -> Iterator[pd.DataFrame]:
+    """`origen` es una ruta o un archivo binario abierto; nunca se carga completo en memoria."""
+    if formato == "parquet":
+        archivo = _pyarrow_parquet().ParquetFile(origen)
+        for lote in archivo.iter_batches(batch_size=tamano_bloque):
+            yield lote.to_pandas()
+        return
+    yield from pd.read_csv(origen, chunksize=tamano_bloque)
+
+
+def validar_columnas(df: pd.DataFrame, tipo: str) -> pd.DataFrame:
+    """Comprueba columnas requeridas y convierte las numéricas (lo no numérico queda NaN)."""
+    faltantes = COLUMNAS_REQUERIDAS[tipo] - set(df.columns)
+    if faltantes:
+        raise ValueError(f"Faltan columnas para una cartera de {tipo}: {', '.join(sorted(faltantes))}")
+    for columna in _NUMERICAS[tipo]:
+        if columna in df.columns and not pd.api.types.is_float_dtype(df[columna]):
+            df[columna] = pd.to_numeric(df[columna], errors="coerce").astype(float)
+    return df
+
+
+# --- PROCESAMIENTO ---
+
+def resolver_bloque_interes(df: pd.DataFrame) -> pd.DataFrame:
+    """Columnas de entrada + C, M, I, i, n, t_meses, codigo_error, error y ok."""
+    resultado = solver_executor.resolver_lote_interes(df)
+    salida = df.copy()
+    for clave in ("C", "M", "I", "i", "n", "t_meses", "codigo_error", "ok"):
+        salida[clave] = resultado[clave]
+    salida["error"] = pd.Series(resultado["codigo_error"], index=df.index).map(batch.ERRORES_LOTE)
+    return salida
+
+
+def _tasa_mensual(primeras: pd.DataFrame) -> np.ndarray:
+    """Tasa mensual efectiva por problema, vectorizada (misma regla que `rates.convertir_tasa`)."""
+    valor = primeras["tasa_valor"].to_numpy(dtype=float)
+    nominal = (
+        primeras["tasa_es_nominal"].astype(str).str.strip().str.lower().isin(["true", "1", "1.0", "si", "sí"]).to_numpy()
+        if "tasa_es_nominal" in primeras.columns else np.zeros(len(primeras), dtype=bool)
+    )
+    m_cap = primeras.get("tasa_capitalizacion", pd.Series(index=primeras.index, dtype=object)).map(_M_POR_TEXTO)
+    k_tasa = primeras.get("tasa_periodo", pd.Series(index=primeras.index, dtype=object)).map(_M_POR_TEXTO)
+    m_cap = m_cap.fillna(1).to_numpy(dtype=float)
+    k_tasa = k_tasa.fillna(1).to_numpy(dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(
+            nominal,
+            np.power(1 + valor / m_cap, m_cap / 12) - 1,
+            np.power(1 + valor, k_tasa / 12) - 1
+        )
+
+
+def _conteos_por_grupo(grupos: np.ndarray, P: int) -> np.ndarray:
+    return np.concatenate(([0], np.cumsum(np.bincount(grupos, minlength=P)))).astype(np.int64)
+
+
+def lote_desde_flujos(df: pd.DataFrame) -> tuple:
+    """Codifica un bloque de flujos (problemas completos y contiguos) como `LoteFlujos`."""
+    ids = df["problema_id"].to_numpy()
+    nuevo = np.ones(len(ids), dtype=bool)
+    nuevo[1:] = ids[1:] != ids[:-1]
+    grupo = np.cumsum(nuevo) - 1
+    P = int(grupo[-1]) + 1 if len(grupo) else 0
+    primeras = df[nuevo]
+
+    lado = df["lado"].astype(str).str.strip().str.lower().to_numpy()
+    monto = df["monto"].to_numpy(dtype=float) if "monto" in df.columns else np.full(len(df), np.nan)
+    mes = df["mes"].to_numpy(dtype=float)
+    proporcion = (
+        df["proporcion_incognita"].to_numpy(dtype=float) if "proporcion_incognita" in df.columns
+        else np.full(len(df), np.nan)
+    )
+
+    es_deuda = lado == "deuda"
+    es_pago = lado == "pago"
+    desconocido = es_pago & np.isnan(monto)
+    proporcion = np.where(desconocido, np.where(np.isnan(proporcion), 1.0, proporcion), 0.0)
+
+    varias = np.zeros(P, dtype=bool)
+    if "incognita" in df.columns and desconocido.any():
+        nombres = pd.DataFrame({"grupo": grupo[desconocido], "nombre": df["incognita"].to_numpy()[desconocido]})
+        distintas = nombres.groupby("grupo")["nombre"].nunique()
+        varias[distintas.index.to_numpy()[distintas.to_numpy() > 1]] = True
+
+    fecha_focal = (
+        primeras["fecha_focal_mes"].fillna(0.0).to_numpy(dtype=float) if "fecha_focal_mes" in df.columns
+        else np.zeros(P)
+    )
+    lote = engine.LoteFlujos(
+        tasa_mensual=_tasa_mensual(primeras),
+        fecha_focal=fecha_focal,
+        deuda_montos=monto[es_deuda],
+        deuda_meses=mes[es_deuda],
+        deuda_offsets=_conteos_por_grupo(grupo[es_deuda], P),
+        pago_montos=monto[es_pago],
+        pago_meses=mes[es_pago],
+        pago_proporciones=proporcion[es_pago],
+        pago_offsets=_conteos_por_grupo(grupo[es_pago], P),
+        varias_incognitas=varias
+    )
+    return primeras["problema_id"].to_numpy(), lote
+
+
+def resolver_bloque_renegociacion(df: pd.DataFrame) -> pd.DataFrame:
+    """Una fila por problema: valor_x, valor presente, totales en fecha focal y error."""
+    ids, lote = lote_desde_flujos(df)
+    resultado = solver_executor.resolver_lote_flujos(lote)
+    salida = pd.DataFrame({"problema_id": ids, **resultado})
+    salida["error"] = salida["codigo_error"].map(engine.ERRORES_LOTE)
+    salida["ok"] = salida["codigo_error"] == engine.OK
+    return salida
+
+
+def _problemas_completos(bloques: Iterator[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+    """Reagrupa los bloques para que ningún problema quede partido entre dos."""
+    resto: Optional[pd.DataFrame] = None
+    for df in bloques:
+        if resto is not None:
+            df = pd.concat([resto, df], ignore_index=True)
+        if df.empty:
+            continue
+        ultimo = df["problema_id"].iloc[-1]
+        completo = df["problema_id"].to_numpy() != ultimo
+        # El último problema puede continuar en el siguiente bloque
+        inicio_resto = len(df) - int(np.argmax(completo[::-1])) if completo.any() else 0
+        resto = df.iloc[inicio_resto:]
+        if inicio_resto:
+            yield df.iloc[:inicio_resto]
+    if resto is not None and not resto.empty:
+        yield resto
+
+
+def procesar(bloques: Iterator[pd.DataFrame], tipo: str) -> Iterator[pd.DataFrame]:
+    """Valida y resuelve bloque a bloque; memoria acotada por el tamaño de bloque."""
+    if tipo not in TIPOS:
+        raise ValueError(f"Tipo de cartera desconocido: {tipo}")
+    validados = (validar_columnas(df, tipo) for df in bloques)
+    if tipo == "interes":
+        for df in validados:
+            yield resolver_bloque_interes(df)
+    else:
+        for df in _problemas_completos(validados):
+            yield resolver_bloque_renegociacion(df)
+
+
+# --- ESCRITURA ---
+
+def a_csv(bloques: Iterator[pd.DataFrame]) -> Iterator[bytes]:
+    """Serializa los bloques como un único CSV (encabezado solo en el primero)."""
+    encabezado = True
+    for df in bloques:
+        yield df.to_csv(index=False, header=encabezado).encode("utf-8")
+        encabezado = False
+
+
+def escribir(bloques: Iterator[pd.DataFrame], destino: str, formato: str) -> dict:
+    """Escribe los resultados de forma incremental y devuelve un resumen (filas y errores)."""
+    filas = errores = 0
+
+    def contar(iterable):
+        nonlocal filas, errores
+        for df in iterable:
+            filas += len(df)
+            errores += int((~df["ok"]).sum())
+            yield df
+
+    if formato == "parquet":
+        pq = _pyarrow_parquet()
+        import pyarrow as pa
+
+        escritor = None
+        try:
+            for df in contar(bloques):
+                tabla = pa.Table.from_pandas(df, preserve_index=False)
+                if escritor is None:
+                    escritor = pq.ParquetWriter(destino, tabla.schema)
+                escritor.write_table(tabla.cast(escritor.schema))
+        finally:
+            if escritor is not None:
+                escritor.close()
+    else:
+        with open(destino, "wb") as f:
+            for parte in a_csv(contar(bloques)):
+                f.write(parte)
+
+    return {"filas": filas, "errores": errores}
+
+
+def ingerir(
+    entrada: str,
+    salida: str,
+    tipo: str,
+    tamano_bloque: int = TAMANO_BLOQUE,
+    formato_entrada: Optional[str] = None,
+    formato_salida: Optional[str] = None
+) -> dict:
+    """Lee `entrada` por bloques, resuelve con los motores vectorizados y escribe `salida`."""
+    bloques = leer_bloques(entrada, formato_entrada or detectar_formato(entrada), tamano_bloque)
+    return escribir(procesar(bloques, tipo), salida, formato_salida or detectar_formato(salida))
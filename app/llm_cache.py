@@ -0,0 +1,161 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional, Type, TypeVar
+
+from pydantic import BaseModel
+
+T = TypeVar("T", bound=BaseModel)
+
+
+@lru_cache(maxsize=None)
+def _version_schema(schema: Type[BaseModel]) -> str:
+    """Huella del JSON Schema: si cambia el modelo, cambian las claves de la caché."""
+    contenido = json.dumps(schema.model_json_schema(), sort_keys=True)
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()[:16]
+
+
+def normalizar_texto(texto: str) -> str:
+    """Normaliza Unicode y colapsa espacios para que variaciones triviales compartan clave."""
+    return " ".join(unicodedata.normalize("NFKC", texto).split())
+
+
+class ExtractionCache:
+    """
+    Caché de extracciones validadas, direccionada por contenido.
+    Nivel 1: LRU en memoria con TTL (devuelve el mismo objeto Pydantic).
+    Nivel 2 (opcional): SQLite en disco, sobrevive reinicios; se re-valida con el schema al leer.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl_seconds: float = 86400, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._memoria: "OrderedDict[str, tuple[float, BaseModel]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # La conexión SQLite se comparte entre hilos: sus accesos se serializan aparte
+        self._lock_db = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS extracciones ("
+                "clave TEXT PRIMARY KEY, schema TEXT NOT NULL, payload TEXT NOT NULL, expira REAL NOT NULL)"
+            )
+            self._db.execute("DELETE FROM extracciones WHERE expira < ?", (time.time(),))
+            self._db.commit()
+
+    @staticmethod
+    def make_key(provider: str, model: str, system_prompt: str, user_text: str, schema: Type[BaseModel]) -> str:
+        partes = [
+            provider,
+            model,
+            normalizar_texto(system_prompt),
+            normalizar_texto(user_text),
+            schema.__name__,
+            _version_schema(schema),
+        ]
+        return hashlib.sha256("\x1f".join(partes).encode("utf-8")).hexdigest()
+
+    @property
+    def persistente(self) -> bool:
+        return self._db is not None
+
+    def get(self, clave: str, schema: Type[T]) -> Optional[T]:
+        """Memoria y, si falla, disco. Desde código async conviene `get_memoria` + `get_disco` en un hilo."""
+        valor = self.get_memoria(clave)
+        if valor is None and self._db is not None:
+            return self.get_disco(clave, schema)
+        return valor
+
+    def get_memoria(self, clave: str) -> Optional[BaseModel]:
+        """Solo el nivel 1; O(1) bajo el lock. Sin disco, un fallo aquí ya cuenta como miss."""
+        ahora = time.time()
+        with self._lock:
+            entrada = self._memoria.get(clave)
+            if entrada is not None:
+                expira, valor = entrada
+                if expira >= ahora:
+                    self._memoria.move_to_end(clave)
+                    self.hits += 1
+                    return valor
+                del self._memoria[clave]
+                self.expirations += 1
+            if self._db is None:
+                self.misses += 1
+            return None
+
+    def get_disco(self, clave: str, schema: Type[T]) -> Optional[T]:
+        """
+        Nivel 2: la lectura de SQLite usa su propio lock y la validación con el schema corre sin
+        lock, así que no frena las consultas en memoria de otros hilos.
+        """
+        with self._lock_db:
+            fila = self._db.execute(
+                "SELECT payload, expira FROM extracciones WHERE clave = ? AND schema = ?",
+                (clave, schema.__name__)
+            ).fetchone()
+        if fila is None or fila[1] < time.time():
+            with self._lock:
+                self.misses += 1
+            return None
+        valor = schema.model_validate_json(fila[0])
+        with self._lock:
+            self._guardar_en_memoria(clave, fila[1], valor)
+            self.disk_hits += 1
+        return valor
+
+    def set(self, clave: str, valor: BaseModel) -> None:
+        expira = time.time() + self.ttl_seconds
+        with self._lock:
+            self._guardar_en_memoria(clave, expira, valor)
+        if self._db is not None:
+            payload = valor.model_dump_json()
+            with self._lock_db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO extracciones (clave, schema, payload, expira) VALUES (?, ?, ?, ?)",
+                    (clave, type(valor).__name__, payload, expira)
+                )
+                self._db.commit()
+
+    def _guardar_en_memoria(self, clave: str, expira: float, valor: BaseModel) -> None:
+        self._memoria[clave] = (expira, valor)
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.max_entries:
+            self._memoria.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memoria.clear()
+        if self._db is not None:
+            with self._lock_db:
+                self._db.execute("DELETE FROM extracciones")
+                self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            consultas = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._memoria),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "persistent": self._db is not None,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_ratio": round((self.hits + self.disk_hits) / consultas, 4) if consultas else 0.0
+            }
@@ -1,74 +1,540 @@
-import openai
-import instructor
-from google import genai
-from google.genai import types
-from google.genai.errors import ClientError
+import asyncio
+import json
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from functools import lru_cache
 from pydantic import BaseModel
-from typing import Type, TypeVar
+from typing import Optional, Type, TypeVar
 from app.config import Config
+from app.llm_cache import ExtractionCache
+from app.llm_singleflight import SingleFlight
+from app.observability import (
+    LLM_BACKOFF_SECONDS_TOTAL,
+    LLM_CACHE_TOTAL,
+    LLM_CALL_SECONDS,
+    LLM_EXTRACTION_SECONDS,
+    LLM_QUEUE_SECONDS,
+    LLM_RATE_LIMITED_TOTAL,
+    LLM_RETRIES_TOTAL,
+    registrar_tokens
+)
 
 from tenacity import (
     retry,
     stop_after_attempt,
     wait_exponential,
-    retry_if_exception_type,
-    before_sleep_log
+    retry_if_exception
 )
 import logging
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 T = TypeVar("T", bound=BaseModel)
 
+def _es_error_de_cliente(error: BaseException) -> bool:
+    """
+    ClientError de google-genai (429 y demás 4xx) o el 429 del proveedor simulado.
+    Los módulos se importan de forma perezosa: si aún no están en `sys.modules`,
+    ninguna excepción puede ser instancia de sus clases.
+    """
+    errores = sys.modules.get("google.genai.errors")
+    if errores is not None and isinstance(error, errores.ClientError):
+        return True
+    mock = sys.modules.get("app.llm_mock")
+    return mock is not None and isinstance(error, mock.SimulatedRateLimitError)
+
+def _es_429(error: BaseException) -> bool:
+    return getattr(error, "code", None) == 429
+
+
+def _antes_de_reintentar(retry_state) -> None:
+    motor = retry_state.args[0]
+    error = retry_state.outcome.exception()
+    espera = retry_state.next_action.sleep
+    LLM_RETRIES_TOTAL.inc(provider=motor.provider, model=motor.model)
+    LLM_BACKOFF_SECONDS_TOTAL.inc(espera, provider=motor.provider, model=motor.model)
+    logger.warning(
+        "Error del proveedor; reintentando tras backoff",
+        extra={
+            "provider": motor.provider,
+            "model": motor.model,
+            "attempt": retry_state.attempt_number,
+            "sleep_seconds": espera,
+            "status_code": getattr(error, "code", None),
+            "error": str(error)
+        }
+    )
+
+# Política de reintentos compartida por la ruta síncrona y la asíncrona.
+# Sobre una corrutina, tenacity espera con asyncio.sleep y no bloquea el event loop.
+_POLITICA_REINTENTOS = dict(
+    retry=retry_if_exception(_es_error_de_cliente),
+    stop=stop_after_attempt(Config.LLM_RETRY_ATTEMPTS),
+
+    wait=wait_exponential(multiplier=2, min=Config.LLM_RETRY_MIN_WAIT_SECONDS, max=Config.LLM_RETRY_MAX_WAIT_SECONDS),
+
+    before_sleep=_antes_de_reintentar
+)
+
+class RateLimitQueueTimeout(Exception):
+    """La petición esperó en la cola local del limitador más de lo permitido."""
+
+
+class _TokenBucket:
+    """
+    Cubeta de tokens con reserva anticipada: cada petición descuenta su costo aunque
+    deje el saldo en negativo y recibe cuánto debe esperar. Las reservas se hacen en
+    orden de llegada bajo un lock, así que la cola resultante es FIFO.
+    """
+
+    def __init__(self, capacidad_por_minuto: int):
+        self.capacidad = float(capacidad_por_minuto)
+        self.recarga_por_segundo = self.capacidad / 60.0
+        self.saldo = self.capacidad
+        self.ultimo = time.monotonic()
+
+    def reservar(self, costo: float, ahora: float) -> float:
+        self.saldo = min(self.capacidad, self.saldo + (ahora - self.ultimo) * self.recarga_por_segundo)
+        self.ultimo = ahora
+        self.saldo -= min(costo, self.capacidad)
+        return 0.0 if self.saldo >= 0 else -self.saldo / self.recarga_por_segundo
+
+    def devolver(self, costo: float) -> None:
+        self.saldo = min(self.capacidad, self.saldo + min(costo, self.capacidad))
+
+
+class _GobernadorConcurrencia:
+    """
+    Semáforo FIFO que sirve a la vez a hilos (threading.Event) y a corrutinas
+    (asyncio.Future), para que la ruta síncrona y la asíncrona compartan el cupo.
+    """
+
+    def __init__(self, maximo: int):
+        self.maximo = maximo
+        self.en_vuelo = 0
+        self._lock = threading.Lock()
+        self._cola: deque = deque()
+
+    def _entrar_o_encolar(self, espera) -> bool:
+        with self._lock:
+            if self.en_vuelo < self.maximo and not self._cola:
+                self.en_vuelo += 1
+                return True
+            self._cola.append(espera)
+            return False
+
+    def _retirar_de_cola(self, espera) -> bool:
+        with self._lock:
+            if espera in self._cola:
+                self._cola.remove(espera)
+                return True
+            return False
+
+    def acquire(self, timeout: Optional[float]) -> None:
+        evento = threading.Event()
+        if self._entrar_o_encolar(evento):
+            return
+        if not evento.wait(timeout) and self._retirar_de_cola(evento):
+            raise RateLimitQueueTimeout("Tiempo de espera agotado en la cola de concurrencia del LLM")
+
+    async def acquire_async(self, timeout: Optional[float]) -> None:
+        loop = asyncio.get_running_loop()
+        futuro = loop.create_future()
+        espera = (loop, futuro)
+        if self._entrar_o_encolar(espera):
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(futuro), timeout)
+        except asyncio.TimeoutError:
+            if self._retirar_de_cola(espera):
+                raise RateLimitQueueTimeout("Tiempo de espera agotado en la cola de concurrencia del LLM")
+        except asyncio.CancelledError:
+            # Si el cupo ya nos fue asignado, lo devolvemos antes de propagar la cancelación
+            if not self._retirar_de_cola(espera):
+                self.release()
+            raise
+
+    def release(self) -> None:
+        with self._lock:
+            if not self._cola:
+                self.en_vuelo -= 1
+                return
+            # El cupo pasa directo al siguiente en la cola (en_vuelo no cambia)
+            espera = self._cola.popleft()
+        if isinstance(espera, threading.Event):
+            espera.set()
+        else:
+            loop, futuro = espera
+            loop.call_soon_threadsafe(lambda: futuro.done() or futuro.set_result(None))
+
+
+class LLMRateLimiter:
+    """
+    Limitador local de peticiones/minuto y tokens/minuto más un máximo de llamadas
+    en vuelo. Lo comparten `extract_data` y `extract_data_async`, y se consulta en
+    cada intento (incluidos los reintentos) antes de tocar la API del proveedor.
+    """
+
+    def __init__(self, rpm: int = 0, tpm: int = 0, max_in_flight: int = 0, queue_timeout: float = 0):
+        self._lock = threading.Lock()
+        self._rpm = _TokenBucket(rpm) if rpm > 0 else None
+        self._tpm = _TokenBucket(tpm) if tpm > 0 else None
+        self._gobernador = _GobernadorConcurrencia(max_in_flight) if max_in_flight > 0 else None
+        self.queue_timeout = queue_timeout if queue_timeout > 0 else None
+
+        self.admitted = 0
+        self.rejected = 0
+        self.total_wait_seconds = 0.0
+
+    def _reservar(self, tokens: int) -> float:
+        with self._lock:
+            ahora = time.monotonic()
+            espera = 0.0
+            if self._rpm is not None:
+                espera = max(espera, self._rpm.reservar(1, ahora))
+            if self._tpm is not None:
+                espera = max(espera, self._tpm.reservar(tokens, ahora))
+
+            if self.queue_timeout is not None and espera > self.queue_timeout:
+                if self._rpm is not None:
+                    self._rpm.devolver(1)
+                if self._tpm is not None:
+                    self._tpm.devolver(tokens)
+                self.rejected += 1
+                raise RateLimitQueueTimeout(
+                    f"La cuota local del LLM exige esperar {espera:.1f}s (máximo {self.queue_timeout}s)"
+                )
+            self.admitted += 1
+            self.total_wait_seconds += espera
+            return espera
+
+    def _contar_rechazo(self) -> None:
+        # Mismo lock que admitted/rejected en _reservar: los timeouts concurrentes no pierden cuentas
+        with self._lock:
+            self.rejected += 1
+
+    def _restante(self, inicio: float) -> Optional[float]:
+        if self.queue_timeout is None:
+            return None
+        return max(0.0, self.queue_timeout - (time.monotonic() - inicio))
+
+    @contextmanager
+    def slot(self, tokens: int):
+        inicio = time.monotonic()
+        espera = self._reservar(tokens)
+        if espera > 0:
+            time.sleep(espera)
+        if self._gobernador is not None:
+            try:
+                self._gobernador.acquire(self._restante(inicio))
+            except RateLimitQueueTimeout:
+                self._contar_rechazo()
+                raise
+        try:
+            yield
+        finally:
+            if self._gobernador is not None:
+                self._gobernador.release()
+
+    @asynccontextmanager
+    async def slot_async(self, tokens: int):
+        inicio = time.monotonic()
+        espera = self._reservar(tokens)
+        if espera > 0:
+            await asyncio.sleep(espera)
+        if self._gobernador is not None:
+            try:
+                await self._gobernador.acquire_async(self._restante(inicio))
+            except RateLimitQueueTimeout:
+                self._contar_rechazo()
+                raise
+        try:
+            yield
+        finally:
+            if self._gobernador is not None:
+                self._gobernador.release()
+
+    def stats(self) -> dict:
+        return {
+            "rpm_limit": int(self._rpm.capacidad) if self._rpm else None,
+            "tpm_limit": int(self._tpm.capacidad) if self._tpm else None,
+            "max_in_flight": self._gobernador.maximo if self._gobernador else None,
+            "in_flight": self._gobernador.en_vuelo if self._gobernador else None,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "total_wait_seconds": round(self.total_wait_seconds, 3)
+        }
+
+
+@lru_cache(maxsize=None)
+def _caracteres_schema(schema: Type[BaseModel]) -> int:
+    return len(json.dumps(schema.model_json_schema()))
+
+
+def estimar_tokens_prompt(system_prompt: str, user_text: str, schema: Type[BaseModel]) -> int:
+    """Tokens de entrada estimados (~4 caracteres por token): prompt + texto + schema."""
+    return (len(system_prompt) + len(user_text) + _caracteres_schema(schema)) // 4
+
+
+def estimar_tokens(system_prompt: str, user_text: str, schema: Type[BaseModel]) -> int:
+    """Estimación barata de entrada + una holgura fija para la salida."""
+    return estimar_tokens_prompt(system_prompt, user_text, schema) + 512
+
+
 class LLMEngine:
     def __init__(self):
         self.provider = Config.PROVIDER
         self.model = Config.MODEL_NAME
-        
+        self.cache = ExtractionCache(
+            max_entries=Config.LLM_CACHE_MAX_ENTRIES,
+            ttl_seconds=Config.LLM_CACHE_TTL_SECONDS,
+            path=Config.LLM_CACHE_PATH
+        ) if Config.LLM_CACHE_ENABLED else None
+        self.single_flight = SingleFlight()
+        self.rate_limiter = LLMRateLimiter(
+            rpm=Config.LLM_RPM_LIMIT,
+            tpm=Config.LLM_TPM_LIMIT,
+            max_in_flight=Config.LLM_MAX_IN_FLIGHT,
+            queue_timeout=Config.LLM_QUEUE_TIMEOUT_SECONDS
+        )
+
+        # Los SDK de los proveedores se importan y sus clientes se construyen en el primer uso
+        self._lock_clientes = threading.Lock()
+        self._clientes = None
+
+    def _construir_clientes(self) -> tuple:
         if self.provider == "gemini":
-            self.client = genai.Client(api_key=Config.GEMINI_API_KEY)
+            from google import genai
+
+            client = genai.Client(api_key=Config.GEMINI_API_KEY)
+            # El cliente de Gemini expone su variante asíncrona en `.aio`
+            return client, client.aio
         elif self.provider == "openai":
-            self.client = instructor.from_openai(
-                openai.OpenAI(api_key=Config.OPENAI_API_KEY)
+            import instructor
+            import openai
+
+            return (
+                instructor.from_openai(openai.OpenAI(api_key=Config.OPENAI_API_KEY)),
+                instructor.from_openai(openai.AsyncOpenAI(api_key=Config.OPENAI_API_KEY))
             )
+        elif self.provider == "mock":
+            from app.llm_mock import MockLLMClient
+
+            client = MockLLMClient(
+                fixtures_dir=Config.LLM_MOCK_FIXTURES_DIR,
+                latencia_ms=Config.LLM_MOCK_LATENCY_MS,
+                jitter_ms=Config.LLM_MOCK_JITTER_MS,
+                tasa_error_429=Config.LLM_MOCK_ERROR_RATE,
+                semilla=Config.LLM_MOCK_SEED,
+                max_textos=Config.LLM_MOCK_MAX_TEXTS
+            )
+            return client, client
+        return None, None
+
+    def _get_clientes(self) -> tuple:
+        if self._clientes is None:
+            with self._lock_clientes:
+                if self._clientes is None:
+                    self._clientes = self._construir_clientes()
+        return self._clientes
+
+    @property
+    def client(self):
+        return self._get_clientes()[0]
+
+    @property
+    def async_client(self):
+        return self._get_clientes()[1]
+
+    def _gemini_config(self, system_prompt: str, schema: Type[T]):
+        from google.genai import types
+
+        return types.GenerateContentConfig(
+            system_instruction=system_prompt,
+            response_mime_type='application/json',
+            response_schema=schema
+        )
+
+    def _openai_messages(self, system_prompt: str, user_text: str) -> list:
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_text}
+        ]
+
+    def _clave_cache(self, system_prompt: str, user_text: str, schema: Type[T]) -> str:
+        return ExtractionCache.make_key(self.provider, self.model, system_prompt, user_text, schema)
+
+    # --- INSTRUMENTACIÓN ---
+    def _observar_extraccion(self, origen: str, inicio: float) -> None:
+        LLM_EXTRACTION_SECONDS.observe(time.perf_counter() - inicio, provider=self.provider, model=self.model, source=origen)
+
+    def _contar_consulta_cache(self, resultado, inicio: float) -> None:
+        LLM_CACHE_TOTAL.inc(result="hit" if resultado is not None else "miss")
+        if resultado is not None:
+            self._observar_extraccion("cache", inicio)
+
+    def _consultar_cache(self, clave: str, schema: Type[T], inicio: float) -> Optional[T]:
+        if self.cache is None:
+            return None
+        resultado = self.cache.get(clave, schema)
+        self._contar_consulta_cache(resultado, inicio)
+        return resultado
+
+    async def _consultar_cache_async(self, clave: str, schema: Type[T], inicio: float) -> Optional[T]:
+        """La memoria se consulta en el event loop; SQLite y la validación, en un hilo."""
+        if self.cache is None:
+            return None
+        resultado = self.cache.get_memoria(clave)
+        if resultado is None and self.cache.persistente:
+            resultado = await asyncio.to_thread(self.cache.get_disco, clave, schema)
+        self._contar_consulta_cache(resultado, inicio)
+        return resultado
+
+    @contextmanager
+    def _medir_llamada(self, inicio_cola: float):
+        """Mide la espera en el limitador (desde `inicio_cola`) y la duración del intento."""
+        inicio = time.perf_counter()
+        LLM_QUEUE_SECONDS.observe(inicio - inicio_cola, provider=self.provider, model=self.model)
+        resultado = "error"
+        try:
+            yield
+            resultado = "ok"
+        except Exception as e:
+            if _es_429(e):
+                resultado = "rate_limited"
+                LLM_RATE_LIMITED_TOTAL.inc(provider=self.provider, model=self.model)
+            raise
+        finally:
+            LLM_CALL_SECONDS.observe(time.perf_counter() - inicio, provider=self.provider, model=self.model, outcome=resultado)
+
+    def _registrar_uso_gemini(self, response) -> None:
+        uso = getattr(response, "usage_metadata", None)
+        if uso is not None:
+            registrar_tokens(self.provider, self.model, uso.prompt_token_count, uso.candidates_token_count)
+
+    def _registrar_uso_openai(self, completion) -> None:
+        uso = getattr(completion, "usage", None)
+        if uso is not None:
+            registrar_tokens(self.provider, self.model, uso.prompt_tokens, uso.completion_tokens)
 
-    @retry(
-        retry=retry_if_exception_type(ClientError),
-        stop=stop_after_attempt(4),
-        
-        wait=wait_exponential(multiplier=2, min=30, max=120),
-        
-        before_sleep=lambda retry_state: print(f"Alerta de Tráfico (429). Esperando {retry_state.next_action.sleep}s para intentar otra vez...")
-    )
     def extract_data(self, system_prompt: str, user_text: str, schema: Type[T]) -> T:
         """
         Función agnóstica para extraer datos estructurados con reintentos automáticos.
+        Si el mismo problema ya se extrajo, se sirve desde la caché sin llamar al proveedor;
+        si se está extrayendo en este momento, se espera a esa misma llamada.
         """
-        if self.provider == "gemini":
-            try:
+        inicio = time.perf_counter()
+        clave = self._clave_cache(system_prompt, user_text, schema)
+        resultado = self._consultar_cache(clave, schema, inicio)
+        if resultado is not None:
+            return resultado
+
+        def extraer():
+            resultado = self._extract_data_remote(system_prompt, user_text, schema)
+            if self.cache is not None and resultado is not None:
+                self.cache.set(clave, resultado)
+            return resultado
+
+        try:
+            return self.single_flight.do(clave, extraer)
+        finally:
+            self._observar_extraccion("remote", inicio)
+
+    async def extract_data_async(self, system_prompt: str, user_text: str, schema: Type[T]) -> T:
+        """
+        Versión asíncrona de `extract_data` para los endpoints de FastAPI.
+        Usa los clientes asíncronos de cada proveedor y el backoff no bloquea el event loop.
+        """
+        inicio = time.perf_counter()
+        clave = self._clave_cache(system_prompt, user_text, schema)
+        resultado = await self._consultar_cache_async(clave, schema, inicio)
+        if resultado is not None:
+            return resultado
+
+        async def extraer():
+            resultado = await self._extract_data_remote_async(system_prompt, user_text, schema)
+            if self.cache is not None and resultado is not None:
+                if self.cache.persistente:
+                    await asyncio.to_thread(self.cache.set, clave, resultado)
+                else:
+                    self.cache.set(clave, resultado)
+            return resultado
+
+        try:
+            return await self.single_flight.do_async(clave, extraer)
+        finally:
+            self._observar_extraccion("remote", inicio)
+
+    @retry(**_POLITICA_REINTENTOS)
+    def _extract_data_remote(self, system_prompt: str, user_text: str, schema: Type[T]) -> T:
+        inicio_cola = time.perf_counter()
+        with self.rate_limiter.slot(estimar_tokens(system_prompt, user_text, schema)), self._medir_llamada(inicio_cola):
+            if self.provider == "gemini":
                 response = self.client.models.generate_content(
                     model=self.model,
                     contents=user_text,
-                    config=types.GenerateContentConfig(
-                        system_instruction=system_prompt,
-                        response_mime_type='application/json',
-                        response_schema=schema
-                    )
+                    config=self._gemini_config(system_prompt, schema)
                 )
+                self._registrar_uso_gemini(response)
                 return response.parsed
-                
-            except Exception as e:
-                raise e
 
-        elif self.provider == "openai":
-            return self.client.chat.completions.create(
-                model=self.model,
-                response_model=schema,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_text}
-                ]
-            )
+            elif self.provider == "openai":
+                resultado, completion = self.client.chat.completions.create_with_completion(
+                    model=self.model,
+                    response_model=schema,
+                    messages=self._openai_messages(system_prompt, user_text)
+                )
+                self._registrar_uso_openai(completion)
+                return resultado
+
+            elif self.provider == "mock":
+                return self.client.generate(system_prompt, user_text, schema)
+
+    @retry(**_POLITICA_REINTENTOS)
+    async def _extract_data_remote_async(self, system_prompt: str, user_text: str, schema: Type[T]) -> T:
+        inicio_cola = time.perf_counter()
+        async with self.rate_limiter.slot_async(estimar_tokens(system_prompt, user_text, schema)):
+            with self._medir_llamada(inicio_cola):
+                if self.provider == "gemini":
+                    response = await self.async_client.models.generate_content(
+                        model=self.model,
+                        contents=user_text,
+                        config=self._gemini_config(system_prompt, schema)
+                    )
+                    self._registrar_uso_gemini(response)
+                    return response.parsed
+
+                elif self.provider == "openai":
+                    resultado, completion = await self.async_client.chat.completions.create_with_completion(
+                        model=self.model,
+                        response_model=schema,
+                        messages=self._openai_messages(system_prompt, user_text)
+                    )
+                    self._registrar_uso_openai(completion)
+                    return resultado
+
+                elif self.provider == "mock":
+                    return await self.async_client.generate_async(system_prompt, user_text, schema)
+
+_llm_service: Optional[LLMEngine] = None
+_lock_servicio = threading.Lock()
+
+
+def get_llm_service() -> LLMEngine:
+    """Instancia compartida del motor, creada en el primer uso (no al importar el módulo)."""
+    global _llm_service
+    if _llm_service is None:
+        with _lock_servicio:
+            if _llm_service is None:
+                _llm_service = LLMEngine()
+    return _llm_service
+
 
-llm_service = LLMEngine()
+def __getattr__(nombre: str):
+    # Compatibilidad con `from app.llm_engine import llm_service`
+    if nombre == "llm_service":
+        return get_llm_service()
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
@@ -0,0 +1,231 @@
+"""
+Proveedor simulado (`LLM_PROVIDER=mock`) para pruebas de carga y benchmarks sin red.
+Responde desde un directorio de fixtures (un JSON por texto, nombrado con el hash del
+texto normalizado) o, si no hay fixture, con una extracción por reglas de palabras clave.
+La latencia, el jitter y los errores 429 se simulan de forma determinista a partir de
+la semilla, del texto y del número de intento, sin importar el orden de llegada.
+"""
+import asyncio
+import hashlib
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Type, TypeVar
+
+from pydantic import BaseModel
+
+from app.llm_cache import normalizar_texto
+from app.llm_router import candidatos
+from app.llm_schema_registry import ExtraccionFinanciera
+from app.shared.enums import Frequency, ProblemType, VariableObjetivo
+
+T = TypeVar("T", bound=BaseModel)
+
+# Textos distintos cuyo contador de intentos y fixture se recuerdan (LRU); en corridas
+# largas el más antiguo se descarta y, si vuelve, empieza de nuevo en el intento 0
+MAX_TEXTOS = 10_000
+
+
+class SimulatedRateLimitError(Exception):
+    """429 simulado; la política de reintentos del motor lo trata igual que uno real."""
+    code = 429
+
+
+def clave_fixture(texto: str) -> str:
+    """Nombre (sin extensión) del fixture que responde a `texto`."""
+    return hashlib.sha256(normalizar_texto(texto).encode("utf-8")).hexdigest()
+
+
+# --- EXTRACCIÓN POR REGLAS ---
+
+_RE_NUMERO = re.compile(r"(\d[\d,]*(?:\.\d+)?)\s*(%|meses|mes|años|año|anos|ano|días|dias|día|dia)?", re.IGNORECASE)
+_MESES_POR_UNIDAD = {"mes": 1, "meses": 1, "año": 12, "años": 12, "ano": 12, "anos": 12, "día": 1 / 30, "días": 1 / 30, "dia": 1 / 30, "dias": 1 / 30}
+
+
+def _numeros(texto: str) -> tuple:
+    """Separa los números del texto en montos, tasas (decimal) y plazos (meses)."""
+    montos, tasas, plazos = [], [], []
+    for cifra, unidad in _RE_NUMERO.findall(texto):
+        valor = float(cifra.replace(",", ""))
+        unidad = unidad.lower()
+        if unidad == "%":
+            tasas.append(valor / 100)
+        elif unidad:
+            plazos.append(valor * _MESES_POR_UNIDAD[unidad])
+        elif valor >= 100:
+            montos.append(valor)
+    return montos, tasas, plazos
+
+
+def _frecuencia(texto: str) -> Optional[Frequency]:
+    posiciones = [(texto.find(f.value), f) for f in Frequency if f.value in texto]
+    return min(posiciones)[1] if posiciones else None
+
+
+def extraer_por_reglas(texto: str) -> ExtraccionFinanciera:
+    """Extracción aproximada pero siempre válida: basta para ejercitar el pipeline completo."""
+    minusculas = texto.lower()
+    montos, tasas, plazos = _numeros(minusculas)
+    frecuencia = _frecuencia(minusculas)
+    capitaliza = "capitaliz" in minusculas
+    tasa = {
+        "valor": tasas[0] if tasas else 0.1,
+        "es_nominal": capitaliza,
+        "capitalizacion": (frecuencia or Frequency.MENSUAL) if capitaliza else None
+    }
+    tiempo = plazos[0] if plazos else 12.0
+
+    # Mismas reglas que el enrutador: con un solo candidato la respuesta encaja en el schema
+    # compacto; con varios (unión completa) gana el de mayor prioridad
+    tipos = candidatos(texto)
+    tipo = tipos[0] if tipos else ProblemType.INTERES_SIMPLE
+
+    if tipo == ProblemType.RENEGOCIACION_DEUDA:
+        deudas = [
+            {"monto": monto, "vencimiento_meses": plazos[k] if k < len(plazos) else 0.0}
+            for k, monto in enumerate(montos or [1000.0])
+        ]
+        problema = {
+            "tipo": ProblemType.RENEGOCIACION_DEUDA,
+            "deudas_originales": deudas,
+            "pagos_propuestos": [{"monto": None, "mes": max(plazos) if plazos else 12.0, "proporcion_incognita": 1.0}],
+            "tasa_referencia": tasa
+        }
+    elif tipo == ProblemType.DESCUENTO_BANCARIO:
+        problema = {
+            "tipo": ProblemType.DESCUENTO_BANCARIO,
+            "valor_nominal": montos[0] if montos else None,
+            "tasa_descuento": tasa,
+            "tiempo_meses": tiempo,
+            "incognita": VariableObjetivo.DESCUENTO
+        }
+    elif tipo == ProblemType.INTERES_COMPUESTO:
+        problema = {
+            "tipo": ProblemType.INTERES_COMPUESTO,
+            "capital": montos[0] if montos else None,
+            "tasa": tasa,
+            "tiempo_meses": tiempo,
+            "capitalizacion": tasa["capitalizacion"] or Frequency.MENSUAL,
+            "incognita": VariableObjetivo.MONTO
+        }
+    else:
+        problema = {
+            "tipo": ProblemType.INTERES_SIMPLE,
+            "capital": montos[0] if montos else None,
+            "monto_futuro": montos[1] if len(montos) > 1 and not tasas else None,
+            "tasa": tasa if tasas or len(montos) < 2 else None,
+            "tiempo_meses": tiempo,
+            "incognita": VariableObjetivo.TASA if len(montos) > 1 and not tasas else VariableObjetivo.MONTO
+        }
+
+    return ExtraccionFinanciera(
+        razonamiento="Respuesta simulada (proveedor mock): clasificación por palabras clave.",
+        problema=problema
+    )
+
+
+class MockLLMClient:
+    """
+    Cliente con la misma forma de uso que los reales: `generate` y `generate_async`.
+    Cada intento sobre el mismo texto avanza un contador, así que un reintento tras un
+    429 simulado obtiene un sorteo distinto pero reproducible.
+    """
+
+    def __init__(
+        self,
+        fixtures_dir: Optional[str] = None,
+        latencia_ms: float = 0,
+        jitter_ms: float = 0,
+        tasa_error_429: float = 0.0,
+        semilla: int = 0,
+        max_textos: int = MAX_TEXTOS
+    ):
+        self.fixtures_dir = Path(fixtures_dir) if fixtures_dir else None
+        self.latencia_ms = latencia_ms
+        self.jitter_ms = jitter_ms
+        self.tasa_error_429 = tasa_error_429
+        self.semilla = semilla
+        self.max_textos = max(int(max_textos), 1)
+
+        self._lock = threading.Lock()
+        self._intentos: "OrderedDict[str, int]" = OrderedDict()
+        self._fixtures: "OrderedDict[str, Optional[str]]" = OrderedDict()
+
+        self.calls = 0
+        self.errors_429 = 0
+        self.fixture_hits = 0
+        self.rule_based = 0
+
+    def _sorteo(self, clave: str) -> tuple:
+        """(segundos de latencia, ¿falla con 429?) para este intento."""
+        with self._lock:
+            intento = self._intentos.pop(clave, 0)
+            self._intentos[clave] = intento + 1
+            if len(self._intentos) > self.max_textos:
+                self._intentos.popitem(last=False)
+            self.calls += 1
+        rng = random.Random(f"{self.semilla}:{clave}:{intento}")
+        latencia = self.latencia_ms + rng.uniform(-self.jitter_ms, self.jitter_ms)
+        return max(latencia, 0.0) / 1000, rng.random() < self.tasa_error_429
+
+    def _leer_fixture(self, clave: str) -> Optional[str]:
+        if self.fixtures_dir is None:
+            return None
+        with self._lock:
+            if clave in self._fixtures:
+                self._fixtures.move_to_end(clave)
+                return self._fixtures[clave]
+        ruta = self.fixtures_dir / f"{clave}.json"
+        fixture = ruta.read_text(encoding="utf-8") if ruta.exists() else None
+        with self._lock:
+            self._fixtures[clave] = fixture
+            if len(self._fixtures) > self.max_textos:
+                self._fixtures.popitem(last=False)
+        return fixture
+
+    def _responder(self, clave: str, falla: bool, user_text: str, schema: Type[T]) -> T:
+        if falla:
+            with self._lock:
+                self.errors_429 += 1
+            raise SimulatedRateLimitError("429 RESOURCE_EXHAUSTED (simulado)")
+
+        fixture = self._leer_fixture(clave)
+        with self._lock:
+            if fixture is not None:
+                self.fixture_hits += 1
+            else:
+                self.rule_based += 1
+        if fixture is not None:
+            return schema.model_validate_json(fixture)
+
+        extraccion = extraer_por_reglas(user_text)
+        if schema is ExtraccionFinanciera:
+            return extraccion
+        return schema.model_validate(extraccion.model_dump(mode="json"))
+
+    def generate(self, system_prompt: str, user_text: str, schema: Type[T]) -> T:
+        clave = clave_fixture(user_text)
+        espera, falla = self._sorteo(clave)
+        if espera:
+            time.sleep(espera)
+        return self._responder(clave, falla, user_text, schema)
+
+    async def generate_async(self, system_prompt: str, user_text: str, schema: Type[T]) -> T:
+        clave = clave_fixture(user_text)
+        espera, falla = self._sorteo(clave)
+        if espera:
+            await asyncio.sleep(espera)
+        return self._responder(clave, falla, user_text, schema)
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors_429": self.errors_429,
+            "fixture_hits": self.fixture_hits,
+            "rule_based": self.rule_based,
+            "tracked_texts": len(self._intentos),
+            "cached_fixtures": len(self._fixtures)
+        }
@@ -0,0 +1,158 @@
+"""
+Enrutador previo a la extracción: un clasificador por palabras clave decide el tipo de
+problema y al LLM solo se le envía el schema de ese tipo (sin títulos y con descripciones
+recortadas) junto con un prompt corto. Si el texto no da pistas claras, se usa la unión
+completa `ExtraccionFinanciera` con el prompt general.
+
+El resultado de cualquier ruta se convierte de vuelta a `ExtraccionFinanciera`, así que
+el resto del pipeline no cambia.
+"""
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Type
+
+from pydantic import BaseModel, Field
+
+from app.accounting.schemas import ProblemaDescuentoBancario, ProblemaInteresCompuesto, ProblemaInteresSimple
+from app.llm_engine import estimar_tokens_prompt
+from app.llm_schema_registry import ExtraccionFinanciera
+from app.negotiation.schemas import ProblemaRenegociacion
+from app.shared.enums import ProblemType
+
+# --- CLASIFICADOR ---
+
+# En orden de prioridad. Varias deudas con pagos nuevos son una renegociación aunque el
+# texto no use la palabra (y suelen mencionar capitalización), así que esa señal va primero.
+_REGLAS = (
+    (ProblemType.RENEGOCIACION_DEUDA, re.compile(r"deuda.*pago|pago.*deuda", re.DOTALL)),
+    (ProblemType.RENEGOCIACION_DEUDA, re.compile(r"renegoci|reestructur|fecha focal|ecuaci[oó]n de valor")),
+    (ProblemType.DESCUENTO_BANCARIO, re.compile(r"descuent|descontad")),
+    (ProblemType.INTERES_COMPUESTO, re.compile(r"compuest|capitaliz|convertible")),
+    (ProblemType.INTERES_SIMPLE, re.compile(r"inter[eé]s simple|\bsimple\b")),
+)
+
+
+def candidatos(texto: str) -> List[ProblemType]:
+    """Tipos cuyas palabras clave aparecen en el texto, sin repetir y en orden de prioridad."""
+    minusculas = texto.lower()
+    tipos = []
+    for tipo, patron in _REGLAS:
+        if tipo not in tipos and patron.search(minusculas):
+            tipos.append(tipo)
+    return tipos
+
+
+def clasificar(texto: str) -> Optional[ProblemType]:
+    """
+    Tipo de problema si las palabras clave apuntan a uno solo; None si no hay pistas o si
+    apuntan a varios tipos (entonces se usa la unión completa y decide el LLM).
+    """
+    tipos = candidatos(texto)
+    return tipos[0] if len(tipos) == 1 else None
+
+
+# --- SCHEMAS COMPACTOS ---
+
+# Fin de oración: punto y espacio, salvo tras las abreviaturas "ej." y "p. ej."
+_FIN_ORACION = re.compile(r"(?<!\bej)(?<!\bp)\.\s+")
+
+
+def minificar_schema(schema: Any) -> Any:
+    """Quita los `title` y deja solo la primera oración de cada `description`."""
+    if isinstance(schema, list):
+        return [minificar_schema(v) for v in schema]
+    if not isinstance(schema, dict):
+        return schema
+    compacto = {}
+    for clave, valor in schema.items():
+        if clave == "title" and isinstance(valor, str):
+            continue
+        if clave == "description" and isinstance(valor, str):
+            compacto[clave] = _FIN_ORACION.split(valor, maxsplit=1)[0].rstrip(".")
+        elif clave in ("properties", "$defs"):
+            # Aquí las claves son nombres de campos o modelos, no palabras reservadas
+            compacto[clave] = {nombre: minificar_schema(v) for nombre, v in valor.items()}
+        else:
+            compacto[clave] = minificar_schema(valor)
+    return compacto
+
+
+class _ExtraccionCompacta(BaseModel):
+    """Base de las extracciones de un solo tipo; su JSON Schema sale ya minificado."""
+    razonamiento: str = Field(..., description="Breve: qué datos identificaste.")
+
+    @classmethod
+    def model_json_schema(cls, *args, **kwargs) -> Dict[str, Any]:
+        return minificar_schema(super().model_json_schema(*args, **kwargs))
+
+
+class ExtraccionInteresSimple(_ExtraccionCompacta):
+    problema: ProblemaInteresSimple
+
+
+class ExtraccionInteresCompuesto(_ExtraccionCompacta):
+    problema: ProblemaInteresCompuesto
+
+
+class ExtraccionDescuentoBancario(_ExtraccionCompacta):
+    problema: ProblemaDescuentoBancario
+
+
+class ExtraccionRenegociacion(_ExtraccionCompacta):
+    problema: ProblemaRenegociacion
+
+
+_COMUN = " Tiempos en meses y tasas en decimal (15% = 0.15)."
+
+_RUTAS: Dict[ProblemType, tuple] = {
+    ProblemType.INTERES_SIMPLE: (
+        ExtraccionInteresSimple,
+        "Extrae un problema de interés simple (capital, monto, interés, tasa, tiempo) e indica la incógnita."
+        " Si piden la tasa en un periodo concreto, ponlo en periodo_tasa_solicitada." + _COMUN
+    ),
+    ProblemType.INTERES_COMPUESTO: (
+        ExtraccionInteresCompuesto,
+        "Extrae un problema de interés compuesto (capital, monto, tasa, tiempo, capitalización) e indica la incógnita." + _COMUN
+    ),
+    ProblemType.DESCUENTO_BANCARIO: (
+        ExtraccionDescuentoBancario,
+        "Extrae un problema de descuento bancario (valor nominal, valor recibido, descuento, tasa, tiempo) e indica la incógnita."
+        " Modalidad racional solo si el texto lo dice; si no, comercial." + _COMUN
+    ),
+    ProblemType.RENEGOCIACION_DEUDA: (
+        ExtraccionRenegociacion,
+        "Extrae una renegociación de deudas: deudas originales, pagos propuestos (monto null si es la incógnita;"
+        " '2x' -> proporcion_incognita=2) y tasa de referencia. Sin fecha focal explícita, fecha_focal_mes=0." + _COMUN
+    ),
+}
+
+
+# --- RUTA ---
+
+@dataclass(frozen=True)
+class Ruta:
+    tipo: Optional[ProblemType]
+    schema: Type[BaseModel]
+    system_prompt: str
+    prompt_tokens: int
+
+    @property
+    def nombre(self) -> str:
+        return "compact" if self.tipo is not None else "full"
+
+
+def enrutar(texto: str, system_prompt_general: str, compactar: bool = True) -> Ruta:
+    """Elige schema y prompt para `texto`; sin tipo claro (o con `compactar=False`) usa la unión completa."""
+    tipo = clasificar(texto) if compactar else None
+    if tipo is None:
+        schema, prompt = ExtraccionFinanciera, system_prompt_general
+    else:
+        schema, prompt = _RUTAS[tipo]
+    return Ruta(tipo, schema, prompt, estimar_tokens_prompt(prompt, texto, schema))
+
+
+def a_extraccion(resultado: BaseModel) -> ExtraccionFinanciera:
+    """Lleva el resultado de cualquier ruta al modelo común del pipeline."""
+    if isinstance(resultado, ExtraccionFinanciera):
+        return resultado
+    return ExtraccionFinanciera(razonamiento=resultado.razonamiento, problema=resultado.problema)
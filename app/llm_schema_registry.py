@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Union
+from typing import Annotated, Union
 from app.accounting.schemas import (
     ProblemaInteresSimple, 
     ProblemaDescuentoBancario, 
@@ -15,4 +15,14 @@ class ExtraccionFinanciera(BaseModel):
         ProblemaInteresCompuesto, 
         ProblemaRenegociacion
     ] = Field(..., description="El objeto del problema financiero identificado")
-    
\ No newline at end of file
+
+# Problema ya estructurado (sin LLM): Pydantic elige el modelo por el campo `tipo`.
+ProblemaFinanciero = Annotated[
+    Union[
+        ProblemaInteresSimple,
+        ProblemaDescuentoBancario,
+        ProblemaInteresCompuesto,
+        ProblemaRenegociacion
+    ],
+    Field(discriminator="tipo")
+]
@@ -0,0 +1,74 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+
+class SingleFlight:
+    """
+    Deduplica llamadas concurrentes con la misma clave: solo el primer llamador
+    ejecuta la función; el resto espera ese mismo resultado (o la misma excepción).
+    Se mantienen registros separados para hilos (ruta síncrona) y para el event loop.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._en_vuelo_sync: Dict[str, Future] = {}
+        self._en_vuelo_async: Dict[Tuple[int, str], asyncio.Task] = {}
+
+        self.leaders = 0
+        self.shared = 0
+
+    def do(self, clave: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            futuro = self._en_vuelo_sync.get(clave)
+            lider = futuro is None
+            if lider:
+                futuro = Future()
+                self._en_vuelo_sync[clave] = futuro
+                self.leaders += 1
+            else:
+                self.shared += 1
+
+        if not lider:
+            return futuro.result()
+
+        try:
+            resultado = fn()
+        except BaseException as e:
+            futuro.set_exception(e)
+            raise
+        else:
+            futuro.set_result(resultado)
+            return resultado
+        finally:
+            with self._lock:
+                self._en_vuelo_sync.pop(clave, None)
+
+    async def do_async(self, clave: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        # La tarea compartida vive aparte de los llamadores: si el primero se
+        # cancela (cliente desconectado) los demás siguen esperando el resultado.
+        llave = (id(asyncio.get_running_loop()), clave)
+        tarea = self._en_vuelo_async.get(llave)
+        if tarea is None:
+            tarea = asyncio.ensure_future(fn())
+            self._en_vuelo_async[llave] = tarea
+            tarea.add_done_callback(lambda t: self._liberar(llave, t))
+            self.leaders += 1
+        else:
+            self.shared += 1
+        return await asyncio.shield(tarea)
+
+    def _liberar(self, llave: Tuple[int, str], tarea: asyncio.Task) -> None:
+        if self._en_vuelo_async.get(llave) is tarea:
+            del self._en_vuelo_async[llave]
+        # Marca la excepción como consumida aunque todos los llamadores se hayan ido
+        if not tarea.cancelled():
+            tarea.exception()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._en_vuelo_sync) + len(self._en_vuelo_async),
+            "leaders": self.leaders,
+            "shared": self.shared
+        }
@@ -0,0 +1,387 @@
+"""
+Motor vectorizado de Ecuación de Valor. Los flujos de un ProblemaRenegociacion se
+guardan como arreglos contiguos; todos los factores (1+i)^(ff - t) salen de una sola
+operación de NumPy y cada sumatoria es un producto punto.
+"""
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from app.negotiation.schemas import ProblemaRenegociacion
+from app.shared.root_finding import acotar_en_malla, newton_acotado, newton_acotado_vectorizado
+
+# Malla de búsqueda de la tasa mensual implícita (-50% a 100% mensual), más densa cerca de 0
+MALLA_TASA_MENSUAL = np.unique(np.concatenate((
+    np.linspace(-0.5, -0.05, 10),
+    np.linspace(-0.05, 0.1, 31),
+    np.linspace(0.1, 1.0, 19)
+)))
+
+
+@dataclass
+class FlujosRenegociacion:
+    """
+    Flujos de caja en forma columnar (meses desde hoy).
+    En los pagos, `pago_montos` es NaN cuando el pago es incógnita y
+    `pago_proporciones` es 0.0 cuando el pago es conocido. `pago_incognitas` indica
+    a qué nombre de `nombres_incognitas` se refiere cada pago (-1 si es conocido).
+    """
+    deuda_montos: np.ndarray
+    deuda_meses: np.ndarray
+    pago_montos: np.ndarray
+    pago_meses: np.ndarray
+    pago_proporciones: np.ndarray
+    pago_incognitas: np.ndarray
+    nombres_incognitas: list
+
+    @classmethod
+    def from_problema(cls, problema: ProblemaRenegociacion) -> "FlujosRenegociacion":
+        # Un pago sin monto ni proporción no aporta a la ecuación (igual que el motor escalar)
+        pagos = [p for p in problema.pagos_propuestos if p.monto is not None or p.proporcion_incognita is not None]
+        nombres = []
+        indices = []
+        for p in pagos:
+            if p.monto is not None:
+                indices.append(-1)
+                continue
+            nombre = normalizar_incognita(p.incognita)
+            if nombre not in nombres:
+                nombres.append(nombre)
+            indices.append(nombres.index(nombre))
+        return cls(
+            deuda_montos=np.fromiter((d.monto for d in problema.deudas_originales), float),
+            deuda_meses=np.fromiter((d.vencimiento_meses for d in problema.deudas_originales), float),
+            pago_montos=np.fromiter((np.nan if p.monto is None else p.monto for p in pagos), float),
+            pago_meses=np.fromiter((p.mes for p in pagos), float),
+            pago_proporciones=np.fromiter(
+                (0.0 if p.monto is not None else p.proporcion_incognita for p in pagos), float
+            ),
+            pago_incognitas=np.asarray(indices, dtype=np.int64),
+            nombres_incognitas=nombres,
+        )
+
+
+def normalizar_incognita(nombre: str) -> str:
+    return nombre.strip().lower()
+
+
+@dataclass
+class SolucionFlujos:
+    valor_presente_total: float
+    suma_deudas_ff: float
+    suma_pagos_conocidos_ff: float
+    factor_total_x: float
+    # Factores (1+i)^(ff - t) por flujo, para armar el desglose si se pide
+    factores_deudas: np.ndarray
+    factores_pagos: np.ndarray
+
+
+def resolver_flujos(flujos: FlujosRenegociacion, tasa_mensual: float, ff: float) -> SolucionFlujos:
+    n_deudas = len(flujos.deuda_meses)
+    meses = np.concatenate((flujos.deuda_meses, flujos.pago_meses))
+    factores = np.power(1 + tasa_mensual, ff - meses)
+
+    factores_deudas = factores[:n_deudas]
+    factores_pagos = factores[n_deudas:]
+    conocidos = ~np.isnan(flujos.pago_montos)
+
+    suma_deudas_ff = float(flujos.deuda_montos @ factores_deudas)
+    return SolucionFlujos(
+        # VP = valor en ff traído a hoy: (1+i)^(ff - t) / (1+i)^ff = (1+i)^(-t)
+        valor_presente_total=suma_deudas_ff / (1 + tasa_mensual) ** ff,
+        suma_deudas_ff=suma_deudas_ff,
+        suma_pagos_conocidos_ff=float(flujos.pago_montos[conocidos] @ factores_pagos[conocidos]),
+        factor_total_x=float(flujos.pago_proporciones @ factores_pagos),
+        factores_deudas=factores_deudas,
+        factores_pagos=factores_pagos,
+    )
+
+
+def resolver_sistema(flujos: FlujosRenegociacion, solucion: SolucionFlujos, restricciones) -> np.ndarray:
+    """
+    Varias incógnitas: la ecuación de valor aporta una fila (coeficiente en ff de cada
+    incógnita) y cada restricción lineal otra. El sistema cuadrado se resuelve con
+    np.linalg.solve. Lanza ValueError si no está determinado o es singular.
+    """
+    nombres = flujos.nombres_incognitas
+    k = len(nombres)
+    indice = {nombre: j for j, nombre in enumerate(nombres)}
+
+    con_incognita = flujos.pago_incognitas >= 0
+    coeficientes_ff = np.bincount(
+        flujos.pago_incognitas[con_incognita],
+        weights=(flujos.pago_proporciones * solucion.factores_pagos)[con_incognita],
+        minlength=k
+    )
+
+    A = np.zeros((1 + len(restricciones), k))
+    b = np.zeros(1 + len(restricciones))
+    A[0] = coeficientes_ff
+    b[0] = solucion.suma_deudas_ff - solucion.suma_pagos_conocidos_ff
+    for fila, restriccion in enumerate(restricciones, start=1):
+        for termino in restriccion.terminos:
+            nombre = normalizar_incognita(termino.incognita)
+            if nombre not in indice:
+                raise ValueError(f"La incógnita '{termino.incognita}' de una restricción no aparece en ningún pago.")
+            A[fila, indice[nombre]] += termino.coeficiente
+        b[fila] = restriccion.constante
+
+    if A.shape[0] != k:
+        raise ValueError(
+            f"Hay {k} incógnitas y {len(restricciones)} restricciones; se necesitan exactamente {k - 1}."
+        )
+    try:
+        return np.linalg.solve(A, b)
+    except np.linalg.LinAlgError:
+        raise ValueError("El sistema de incógnitas es singular (restricciones dependientes o contradictorias).")
+
+
+def tasa_implicita(flujos: FlujosRenegociacion, tasa_inicial: float = None):
+    """
+    Tasa mensual efectiva que iguala deudas y pagos (TIR). La fecha focal no cambia la
+    raíz, así que se plantea en t=0: f(i) = sum(c_k * (1+i)^(-t_k)) con derivada analítica
+    f'(i) = -sum(t_k * c_k * (1+i)^(-t_k - 1)). Devuelve (tasa, iteraciones).
+    """
+    if (flujos.pago_incognitas >= 0).any():
+        raise ValueError("Para despejar la tasa todos los pagos deben tener monto conocido.")
+    montos = np.concatenate((flujos.deuda_montos, -flujos.pago_montos))
+    meses = np.concatenate((flujos.deuda_meses, flujos.pago_meses))
+
+    def f_df(i: float):
+        v = np.power(1 + i, -meses)
+        return float(montos @ v), float(-(meses * montos) @ (v / (1 + i)))
+
+    with np.errstate(over="ignore", invalid="ignore"):
+        # Con varios cambios de signo en los flujos puede haber más de una TIR:
+        # se toma el tramo de la malla con cambio de signo más cercano a la tasa inicial.
+        # La malla se evalúa con la misma f que Newton: si la raíz cae justo en un nodo
+        # (0%, 1%...), otro orden de suma puede darle a f(nodo) el signo contrario.
+        en_malla = np.array([f_df(x)[0] for x in MALLA_TASA_MENSUAL])
+        x0 = tasa_inicial if tasa_inicial is not None else 0.0
+        lo, hi = acotar_en_malla(en_malla, MALLA_TASA_MENSUAL, x0)
+        if np.isnan(lo[0]):
+            raise ValueError("No existe una tasa entre -50% y 100% mensual que iguale deudas y pagos.")
+        return newton_acotado(f_df, float(lo[0]), float(hi[0]), x0=tasa_inicial)
+
+
+def desglose_deudas(flujos: FlujosRenegociacion, solucion: SolucionFlujos, ff: float, factor_conv_periodos: float) -> list:
+    n_periodos = np.round((ff - flujos.deuda_meses) * factor_conv_periodos, 4).tolist()
+    en_ff = np.round(flujos.deuda_montos * solucion.factores_deudas, 2).tolist()
+    return [
+        {
+            "monto_original": monto,
+            "mes_origen": mes,
+            "n_periodos_capitalizacion": n,
+            "monto_en_ff": valor
+        }
+        for monto, mes, n, valor in zip(flujos.deuda_montos.tolist(), flujos.deuda_meses.tolist(), n_periodos, en_ff)
+    ]
+
+
+def desglose_pagos(flujos: FlujosRenegociacion, solucion: SolucionFlujos, ff: float, factor_conv_periodos: float) -> list:
+    n_periodos = np.round((ff - flujos.pago_meses) * factor_conv_periodos, 4).tolist()
+    valores_ff = np.round(flujos.pago_montos * solucion.factores_pagos, 2).tolist()
+    factores_x = np.round(flujos.pago_proporciones * solucion.factores_pagos, 4).tolist()
+    varias_incognitas = len(flujos.nombres_incognitas) > 1
+
+    detalles = []
+    for k, (monto, mes, proporcion) in enumerate(zip(
+        flujos.pago_montos.tolist(), flujos.pago_meses.tolist(), flujos.pago_proporciones.tolist()
+    )):
+        if monto == monto:  # no es NaN -> pago conocido
+            detalles.append({
+                "tipo": "CONOCIDO",
+                "monto_origen": monto,
+                "mes": mes,
+                "n_periodos": n_periodos[k],
+                "valor_ff": valores_ff[k]
+            })
+        else:
+            detalle = {
+                "tipo": "INCOGNITA",
+                "proporcion": proporcion,
+                "mes": mes,
+                "n_periodos": n_periodos[k],
+                "factor_ff": factores_x[k]
+            }
+            if varias_incognitas:
+                detalle["incognita"] = flujos.nombres_incognitas[flujos.pago_incognitas[k]]
+            detalles.append(detalle)
+    return detalles
+
+
+# --- LOTES: muchos problemas independientes en arreglos planos con offsets ---
+
+OK = 0
+SIN_INCOGNITA = 1
+VARIAS_INCOGNITAS = 2
+SIN_RAIZ = 3
+PAGOS_DESCONOCIDOS = 4
+
+ERRORES_LOTE = {
+    OK: "",
+    SIN_INCOGNITA: "No hay incógnita X que despejar.",
+    VARIAS_INCOGNITAS: "El modo lote solo resuelve una incógnita por problema; usa resolver_ecuacion_valor.",
+    SIN_RAIZ: "No se encontró una tasa que iguale deudas y pagos en el intervalo de búsqueda.",
+    PAGOS_DESCONOCIDOS: "Hay pagos X sin monto; la tasa implícita requiere todos los pagos conocidos.",
+}
+
+
+@dataclass
+class LoteFlujos:
+    """
+    Codificación ragged de muchos problemas: los flujos de todos van concatenados y
+    `*_offsets` (longitud P+1) marca dónde empieza y termina cada problema.
+    `tasa_mensual` y `fecha_focal` tienen un valor por problema; `varias_incognitas`
+    (opcional) marca los problemas con más de una incógnita, que este modo no resuelve.
+    """
+    tasa_mensual: np.ndarray
+    fecha_focal: np.ndarray
+    deuda_montos: np.ndarray
+    deuda_meses: np.ndarray
+    deuda_offsets: np.ndarray
+    pago_montos: np.ndarray
+    pago_meses: np.ndarray
+    pago_proporciones: np.ndarray
+    pago_offsets: np.ndarray
+    varias_incognitas: Optional[np.ndarray] = None
+
+    @property
+    def n_problemas(self) -> int:
+        return len(self.tasa_mensual)
+
+    def rebanar(self, inicio: int, fin: int) -> "LoteFlujos":
+        """Sub-lote con los problemas [inicio, fin); los offsets se re-basan a cero."""
+        d0, d1 = self.deuda_offsets[inicio], self.deuda_offsets[fin]
+        p0, p1 = self.pago_offsets[inicio], self.pago_offsets[fin]
+        return LoteFlujos(
+            tasa_mensual=self.tasa_mensual[inicio:fin],
+            fecha_focal=self.fecha_focal[inicio:fin],
+            deuda_montos=self.deuda_montos[d0:d1],
+            deuda_meses=self.deuda_meses[d0:d1],
+            deuda_offsets=self.deuda_offsets[inicio:fin + 1] - d0,
+            pago_montos=self.pago_montos[p0:p1],
+            pago_meses=self.pago_meses[p0:p1],
+            pago_proporciones=self.pago_proporciones[p0:p1],
+            pago_offsets=self.pago_offsets[inicio:fin + 1] - p0,
+            varias_incognitas=None if self.varias_incognitas is None else self.varias_incognitas[inicio:fin],
+        )
+
+    @classmethod
+    def from_problemas(cls, problemas, tasas_mensuales) -> "LoteFlujos":
+        deudas = [d for p in problemas for d in p.deudas_originales]
+        pagos_por_problema = [
+            [pg for pg in p.pagos_propuestos if pg.monto is not None or pg.proporcion_incognita is not None]
+            for p in problemas
+        ]
+        pagos = [pg for lista in pagos_por_problema for pg in lista]
+        return cls(
+            tasa_mensual=np.asarray(tasas_mensuales, dtype=float),
+            fecha_focal=np.fromiter((p.fecha_focal_mes for p in problemas), float),
+            deuda_montos=np.fromiter((d.monto for d in deudas), float, len(deudas)),
+            deuda_meses=np.fromiter((d.vencimiento_meses for d in deudas), float, len(deudas)),
+            deuda_offsets=_offsets(len(p.deudas_originales) for p in problemas),
+            pago_montos=np.fromiter((np.nan if pg.monto is None else pg.monto for pg in pagos), float, len(pagos)),
+            pago_meses=np.fromiter((pg.mes for pg in pagos), float, len(pagos)),
+            pago_proporciones=np.fromiter(
+                (0.0 if pg.monto is not None else pg.proporcion_incognita for pg in pagos), float, len(pagos)
+            ),
+            pago_offsets=_offsets(len(lista) for lista in pagos_por_problema),
+            varias_incognitas=np.fromiter(
+                (
+                    bool(p.restricciones)
+                    or len({normalizar_incognita(pg.incognita) for pg in lista if pg.monto is None}) > 1
+                    for p, lista in zip(problemas, pagos_por_problema)
+                ),
+                bool, len(problemas)
+            ),
+        )
+
+
+def _offsets(longitudes) -> np.ndarray:
+    return np.concatenate(([0], np.cumsum(np.fromiter(longitudes, np.int64)))).astype(np.int64)
+
+
+def _ids_segmento(offsets: np.ndarray) -> np.ndarray:
+    """Índice del problema al que pertenece cada flujo."""
+    return np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+
+
+def resolver_lote_flujos(lote: LoteFlujos) -> dict:
+    """
+    Resuelve X para cada problema con reducciones segmentadas (np.bincount con pesos).
+    Devuelve arreglos de longitud P sin redondear; `valor_x` es NaN donde no hay incógnita.
+    """
+    P = lote.n_problemas
+    uno_mas_i = 1 + lote.tasa_mensual
+
+    id_d = _ids_segmento(lote.deuda_offsets)
+    id_p = _ids_segmento(lote.pago_offsets)
+
+    factores_d = np.power(uno_mas_i[id_d], lote.fecha_focal[id_d] - lote.deuda_meses)
+    factores_p = np.power(uno_mas_i[id_p], lote.fecha_focal[id_p] - lote.pago_meses)
+    conocidos = ~np.isnan(lote.pago_montos)
+
+    suma_deudas_ff = np.bincount(id_d, weights=lote.deuda_montos * factores_d, minlength=P)
+    suma_pagos_ff = np.bincount(
+        id_p, weights=np.where(conocidos, lote.pago_montos, 0.0) * factores_p, minlength=P
+    )
+    factor_total_x = np.bincount(id_p, weights=lote.pago_proporciones * factores_p, minlength=P)
+
+    sin_incognita = factor_total_x == 0
+    codigo_error = np.where(sin_incognita, SIN_INCOGNITA, OK).astype(np.int8)
+    if lote.varias_incognitas is not None:
+        codigo_error[lote.varias_incognitas] = VARIAS_INCOGNITAS
+    with np.errstate(divide="ignore", invalid="ignore"):
+        valor_x = np.where(codigo_error != OK, np.nan, (suma_deudas_ff - suma_pagos_ff) / factor_total_x)
+
+    return {
+        "valor_x": valor_x,
+        "valor_presente_deudas": suma_deudas_ff / np.power(uno_mas_i, lote.fecha_focal),
+        "total_deudas_ff": suma_deudas_ff,
+        "total_pagos_conocidos_ff": suma_pagos_ff,
+        "factor_total_x": factor_total_x,
+        "codigo_error": codigo_error,
+    }
+
+
+def tasas_implicitas_lote(lote: LoteFlujos) -> dict:
+    """
+    TIR de muchos problemas a la vez: cada iteración de Newton evalúa f y f' de todos
+    los problemas con reducciones segmentadas. `lote.tasa_mensual` se usa como tasa
+    de referencia para elegir la raíz. Los problemas con pagos incógnita se marcan
+    con error (aquí se buscan tasas, no montos).
+    """
+    P = lote.n_problemas
+    id_d = _ids_segmento(lote.deuda_offsets)
+    id_p = _ids_segmento(lote.pago_offsets)
+    ids = np.concatenate((id_d, id_p))
+    montos = np.concatenate((lote.deuda_montos, -lote.pago_montos))
+    meses = np.concatenate((lote.deuda_meses, lote.pago_meses))
+
+    con_incognita = np.bincount(id_p, weights=np.isnan(lote.pago_montos), minlength=P) > 0
+    montos = np.where(np.isnan(montos), 0.0, montos)
+
+    def f_df(i: np.ndarray):
+        base = 1 + i[ids]
+        v = np.power(base, -meses)
+        f = np.bincount(ids, weights=montos * v, minlength=P)
+        df = np.bincount(ids, weights=-meses * montos * v / base, minlength=P)
+        return f, df
+
+    with np.errstate(over="ignore", invalid="ignore"):
+        en_malla = np.column_stack([f_df(np.full(P, x))[0] for x in MALLA_TASA_MENSUAL])
+    # Tramo con cambio de signo más cercano a la tasa de referencia de cada problema
+    lo, hi = acotar_en_malla(en_malla, MALLA_TASA_MENSUAL, lote.tasa_mensual)
+
+    tasas, convergio, iteraciones = newton_acotado_vectorizado(f_df, lo, hi)
+    codigo_error = np.where(convergio, OK, SIN_RAIZ).astype(np.int8)
+    codigo_error[con_incognita] = PAGOS_DESCONOCIDOS
+    tasas[codigo_error != OK] = np.nan
+    return {
+        "tasa_mensual": tasas,
+        "tasa_efectiva_anual": np.power(1 + tasas, 12) - 1,
+        "iteraciones": iteraciones,
+        "codigo_error": codigo_error,
+    }
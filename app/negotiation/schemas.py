@@ -11,6 +11,15 @@ class Pago(BaseModel):
     monto: Optional[float] = Field(None, description="Monto del pago. None si es la incógnita 'x'")
     mes: float = Field(..., description="Momento del pago en meses")
     proporcion_incognita: Optional[float] = Field(None, description="Si el pago es '2x', esto sería 2.0")
+    incognita: str = Field(default="x", description="Nombre de la incógnita del pago (ej. 'x', 'y', 'z'). Solo aplica si monto es None")
+
+class TerminoRestriccion(BaseModel):
+    incognita: str = Field(..., description="Nombre de la incógnita (ej. 'y')")
+    coeficiente: float = Field(..., description="Coeficiente que multiplica a la incógnita")
+
+class RestriccionIncognitas(BaseModel):
+    terminos: List[TerminoRestriccion] = Field(..., description="Suma de coeficiente * incógnita. Ej. 'z = 2y' -> [{z, 1}, {y, -2}]")
+    constante: float = Field(default=0.0, description="Lado derecho de la restricción")
 
 class ProblemaRenegociacion(BaseModel):
     tipo: Literal[ProblemType.RENEGOCIACION_DEUDA]
@@ -18,5 +27,33 @@ class ProblemaRenegociacion(BaseModel):
     pagos_propuestos: List[Pago]
     tasa_referencia: TasaInteres
     fecha_focal_mes: float = Field(default=0.0, description="Fecha donde se igualan deudas y pagos")
-    incognita: Literal["valor_pago_x"] = "valor_pago_x"
-    
\ No newline at end of file
+    restricciones: List[RestriccionIncognitas] = Field(default_factory=list, description="Solo si hay varias incógnitas distintas: relaciones lineales extra entre ellas")
+    incognita: Literal["valor_pago_x", "tasa_implicita"] = Field(default="valor_pago_x", description="'tasa_implicita' si todos los pagos son conocidos y se busca la tasa que iguala deudas y pagos")
+    
+class ModeloTasas(BaseModel):
+    modelo: Literal["vasicek", "cir", "bootstrap"] = Field(default="vasicek", description="Dinámica de la tasa corta anual (capitalización continua)")
+    tasa_inicial: Optional[float] = Field(None, description="r0 anual; por defecto, la equivalente a tasa_referencia")
+    velocidad_reversion: float = Field(default=0.5, ge=0, description="a: velocidad de reversión a la media (Vasicek/CIR)")
+    media_largo_plazo: Optional[float] = Field(None, description="b: nivel de largo plazo; por defecto, r0")
+    volatilidad: float = Field(default=0.01, ge=0, description="sigma anual (Vasicek/CIR)")
+    historico: List[float] = Field(default_factory=list, description="Bootstrap: tasas anuales observadas mes a mes; se remuestrean sus cambios mensuales")
+
+class SimulacionRenegociacion(BaseModel):
+    problema: ProblemaRenegociacion
+    modelo: ModeloTasas = Field(default_factory=ModeloTasas)
+    trayectorias: int = Field(default=100_000, ge=1)
+    semilla: int = Field(default=0, description="Misma semilla (y SIMULATION_CHUNK_PATHS) -> mismos resultados, con o sin paralelismo")
+    paralelo: bool = Field(default=False, description="Repartir los trozos de trayectorias en el pool de SOLVER_EXECUTOR")
+
+class EdicionDeuda(BaseModel):
+    monto: Optional[float] = None
+    vencimiento_meses: Optional[float] = None
+
+class EdicionPago(BaseModel):
+    monto: Optional[float] = Field(None, description="Monto conocido; enviar null (con proporcion_incognita) para volverlo incógnita")
+    mes: Optional[float] = None
+    proporcion_incognita: Optional[float] = Field(None, description="Si se envía sin monto, el pago pasa a ser incógnita")
+
+class EdicionSesion(BaseModel):
+    tasa_referencia: Optional[TasaInteres] = Field(None, description="Solo recalcula los factores si cambia la tasa mensual equivalente")
+    fecha_focal_mes: Optional[float] = None
@@ -1,39 +1,103 @@
 import math
-from app.negotiation.schemas import ProblemaRenegociacion
-from app.shared.enums import Frequency
+from dataclasses import dataclass
+from typing import Dict, Optional, Union
+import numpy as np
+from app.config import Config
+from app.negotiation.schemas import ProblemaRenegociacion, SimulacionRenegociacion
+from app.negotiation import simulation
+from app.negotiation.engine import (
+    FlujosRenegociacion,
+    resolver_flujos,
+    resolver_sistema,
+    LoteFlujos,
+    tasa_implicita,
+    desglose_deudas,
+    desglose_pagos
+)
+from app.shared.rates import frecuencia_anual, tasa_mensual_efectiva
+from app.executor import solver_executor
+
+@dataclass
+class ResumenRenegociacion:
+    """Resultado compacto de la ecuación de valor (modo detail=summary)."""
+    valor_x: float
+    valor_presente_deudas: float
+    total_deudas_ff: float
+    total_propuesta_ff: float
+    diferencia: float
+    valores_incognitas: Optional[Dict[str, float]] = None
+
+@dataclass
+class ResumenTasaImplicita:
+    tasa_mensual_efectiva: float
+    tasa_implicita: float
+    efectiva_anual: float
+    valor_presente_deudas: float
+    diferencia: float
 
 class NegotiationService:
     
-    def _get_frecuencia_anual(self, freq: Frequency) -> int:
-        mapa = {
-            Frequency.ANUAL: 1, Frequency.SEMESTRAL: 2, Frequency.CUATRIMESTRAL: 3,
-            Frequency.TRIMESTRAL: 4, Frequency.BIMESTRAL: 6, Frequency.MENSUAL: 12,
-            Frequency.QUINCENAL: 24, Frequency.SEMANAL: 52, Frequency.DIARIO: 360
+    def _expresar_tasa_mensual(self, tasa_mensual: float, referencia) -> tuple:
+        """Expresa una tasa mensual efectiva en la misma convención que la tasa de referencia."""
+        if referencia.es_nominal:
+            # Sin capitalización el motor usa m = 1 (frecuencia_anual(None)); la etiqueta lo refleja
+            m = frecuencia_anual(referencia.capitalizacion)
+            valor = m * (math.pow(1 + tasa_mensual, 12 / m) - 1)
+            capitalizacion = referencia.capitalizacion.value if referencia.capitalizacion else "anual"
+            return valor, f"{round(valor*100, 4)}% nominal anual capitalizable {capitalizacion}"
+        k = frecuencia_anual(referencia.periodo)
+        valor = math.pow(1 + tasa_mensual, 12 / k) - 1
+        periodo = referencia.periodo.value if referencia.periodo else "anual"
+        return valor, f"{round(valor*100, 4)}% efectiva {periodo}"
+
+    def resolver_tasa_implicita(self, problema: ProblemaRenegociacion) -> dict:
+        """
+        Despeja la tasa (TIR) que iguala deudas y pagos cuando todos los montos son conocidos.
+        Se usa Newton salvaguardado partiendo de la tasa de referencia del problema.
+        """
+        flujos = FlujosRenegociacion.from_problema(problema)
+        try:
+            tasa_inicial = tasa_mensual_efectiva(problema.tasa_referencia)
+            tasa_mensual, iteraciones = tasa_implicita(flujos, tasa_inicial)
+        except ValueError as e:
+            return {"error": str(e)}
+
+        ff = problema.fecha_focal_mes
+        sol = resolver_flujos(flujos, tasa_mensual, ff)
+        valor, etiqueta = self._expresar_tasa_mensual(tasa_mensual, problema.tasa_referencia)
+
+        return {
+            "tasa_mensual_efectiva": round(tasa_mensual, 8),
+            "tasa_implicita": {
+                "valor": valor,
+                "etiqueta": etiqueta,
+                "efectiva_anual": math.pow(1 + tasa_mensual, 12) - 1
+            },
+            "valor_presente_deudas": round(sol.valor_presente_total, 2),
+            "balance_ecuacion": {
+                "total_deudas_ff": round(sol.suma_deudas_ff, 2),
+                "total_propuesta_ff": round(sol.suma_pagos_conocidos_ff, 2),
+                "diferencia": round(sol.suma_deudas_ff - sol.suma_pagos_conocidos_ff, 4)
+            },
+            "analisis_tecnico": {
+                "metodo": "Newton salvaguardado (bisección)",
+                "iteraciones": iteraciones
+            }
         }
-        return mapa.get(freq, 1)
-
-    def _get_tasa_mensual_efectiva(self, tasa_obj) -> float:
-        i_base = tasa_obj.valor
-        if tasa_obj.es_nominal:
-            freq_cap = self._get_frecuencia_anual(tasa_obj.capitalizacion)
-            i_periodo = i_base / freq_cap
-            meses_por_periodo = 12 / freq_cap
-            return math.pow(1 + i_periodo, 1 / meses_por_periodo) - 1
-        else:
-            freq_tasa = self._get_frecuencia_anual(tasa_obj.periodo)
-            meses_duracion = 12 / freq_tasa
-            return math.pow(1 + i_base, 1 / meses_duracion) - 1
 
-    def resolver_ecuacion_valor(self, problema: ProblemaRenegociacion) -> dict:
+    def resolver_ecuacion_valor(self, problema: ProblemaRenegociacion, incluir_desglose: bool = True) -> dict:
+        if problema.incognita == "tasa_implicita":
+            return self.resolver_tasa_implicita(problema)
+
         # 1. MOTOR INTERNO (Estandarizado a Mensual)
-        tasa_mensual = self._get_tasa_mensual_efectiva(problema.tasa_referencia)
+        tasa_mensual = tasa_mensual_efectiva(problema.tasa_referencia)
         ff = problema.fecha_focal_mes 
         
         # --- ANALISIS VISUAL (Tasa nativa para reporte) ---
         datos_visuales = {}
         if problema.tasa_referencia.es_nominal:
             freq_cap_nombre = problema.tasa_referencia.capitalizacion
-            m = self._get_frecuencia_anual(freq_cap_nombre)
+            m = frecuencia_anual(freq_cap_nombre)
             i_periodo = problema.tasa_referencia.valor / m 
             datos_visuales = {
                 "frecuencia_base": freq_cap_nombre,
@@ -49,71 +113,45 @@ class NegotiationService:
                 "mensaje": f"Tasa Efectiva Mensual del {round(tasa_mensual*100, 4)}%"
             }
 
-        # 2. Calcular Valor Presente TOTAL (Deuda Hoy)
-        valor_presente_total = 0.0
-        for d in problema.deudas_originales:
-            vp = d.monto / math.pow(1 + tasa_mensual, d.vencimiento_meses)
-            valor_presente_total += vp
-
-        # 3. Mover Deudas a Fecha Focal (Lado A)
-        suma_deudas_ff = 0.0
-        detalles_deudas = []
-        factor_conv_periodos = datos_visuales["m_anual"] / 12
-
-        for d in problema.deudas_originales:
-            n_meses = ff - d.vencimiento_meses
-            factor = math.pow(1 + tasa_mensual, n_meses)
-            valor_en_ff = d.monto * factor
-            suma_deudas_ff += valor_en_ff
-            
-            n_periodos_cap = n_meses * factor_conv_periodos
-            detalles_deudas.append({
-                "monto_original": d.monto,
-                "mes_origen": d.vencimiento_meses,
-                "n_periodos_capitalizacion": round(n_periodos_cap, 4),
-                "monto_en_ff": round(valor_en_ff, 2)
-            })
-
-        # 4. Mover Pagos a Fecha Focal (Lado B)
-        suma_pagos_conocidos_ff = 0.0
-        factor_total_x = 0.0
-        detalles_pagos = []
-
-        for p in problema.pagos_propuestos:
-            n_meses = ff - p.mes
-            factor_tiempo = math.pow(1 + tasa_mensual, n_meses)
-            n_periodos_cap = n_meses * factor_conv_periodos
-
-            if p.monto is not None:
-                valor_pago = p.monto * factor_tiempo
-                suma_pagos_conocidos_ff += valor_pago
-                detalles_pagos.append({
-                    "tipo": "CONOCIDO",
-                    "monto_origen": p.monto,
-                    "mes": p.mes,
-                    "n_periodos": round(n_periodos_cap, 4),
-                    "valor_ff": round(valor_pago, 2)
-                })
-            
-            elif p.proporcion_incognita is not None:
-                coef_en_ff = p.proporcion_incognita * factor_tiempo
-                factor_total_x += coef_en_ff
-                detalles_pagos.append({
-                    "tipo": "INCOGNITA",
-                    "proporcion": p.proporcion_incognita,
-                    "mes": p.mes,
-                    "n_periodos": round(n_periodos_cap, 4),
-                    "factor_ff": round(coef_en_ff, 4)
-                })
-
-        # 5. Despejar X
-        if factor_total_x == 0:
-            return {"error": "No hay incógnita X que despejar."}
-            
-        valor_x = (suma_deudas_ff - suma_pagos_conocidos_ff) / factor_total_x
-        valor_propuesta_ff = suma_pagos_conocidos_ff + (factor_total_x * valor_x)
+        # 2-4. Mover Deudas (Lado A) y Pagos (Lado B) a Fecha Focal en una sola pasada
+        flujos = FlujosRenegociacion.from_problema(problema)
+        sol = resolver_flujos(flujos, tasa_mensual, ff)
+        valor_presente_total = sol.valor_presente_total
+        suma_deudas_ff = sol.suma_deudas_ff
+        suma_pagos_conocidos_ff = sol.suma_pagos_conocidos_ff
+        factor_total_x = sol.factor_total_x
 
-        return {
+        # 5. Despejar X (o resolver el sistema si hay varias incógnitas)
+        valores_incognitas = None
+        if len(flujos.nombres_incognitas) > 1 or problema.restricciones:
+            try:
+                valores = resolver_sistema(flujos, sol, problema.restricciones)
+            except ValueError as e:
+                return {"error": str(e)}
+            valores_incognitas = dict(zip(flujos.nombres_incognitas, valores.tolist()))
+            valor_x = valores_incognitas.get("x", float(valores[0]))
+            con_incognita = flujos.pago_incognitas >= 0
+            valor_propuesta_ff = suma_pagos_conocidos_ff + float(
+                (flujos.pago_proporciones * sol.factores_pagos)[con_incognita] @ valores[flujos.pago_incognitas[con_incognita]]
+            )
+        else:
+            if factor_total_x == 0:
+                return {"error": "No hay incógnita X que despejar."}
+
+            valor_x = (suma_deudas_ff - suma_pagos_conocidos_ff) / factor_total_x
+            valor_propuesta_ff = suma_pagos_conocidos_ff + (factor_total_x * valor_x)
+
+        analisis_tecnico = {
+            "tasa_base_usada": datos_visuales["i_periodo"],
+            "frecuencia": datos_visuales["frecuencia_base"]
+        }
+        # El desglose por flujo solo se arma si se pide (es lo caro en cronogramas grandes)
+        if incluir_desglose:
+            factor_conv_periodos = datos_visuales["m_anual"] / 12
+            analisis_tecnico["desglose_deudas"] = desglose_deudas(flujos, sol, ff, factor_conv_periodos)
+            analisis_tecnico["desglose_pagos"] = desglose_pagos(flujos, sol, ff, factor_conv_periodos)
+
+        resultado = {
             "valor_presente_deudas": round(valor_presente_total, 2),
             "valor_x": round(valor_x, 2),
             "balance_ecuacion": {
@@ -121,12 +159,120 @@ class NegotiationService:
                 "total_propuesta_ff": round(valor_propuesta_ff, 2),
                 "diferencia": round(suma_deudas_ff - valor_propuesta_ff, 4)
             },
-            "analisis_tecnico": {
-                "tasa_base_usada": datos_visuales["i_periodo"],
-                "frecuencia": datos_visuales["frecuencia_base"],
-                "desglose_deudas": detalles_deudas,
-                "desglose_pagos": detalles_pagos
-            }
+            "analisis_tecnico": analisis_tecnico
+        }
+        if valores_incognitas is not None:
+            resultado["valores_incognitas"] = {k: round(v, 2) for k, v in valores_incognitas.items()}
+        return resultado
+
+    def resolver_resumen(self, problema: ProblemaRenegociacion) -> Union[ResumenRenegociacion, ResumenTasaImplicita, dict]:
+        """Como `resolver_ecuacion_valor` sin desglose, en un objeto plano. Los errores siguen siendo dicts."""
+        res = self.resolver_ecuacion_valor(problema, incluir_desglose=False)
+        if "error" in res:
+            return res
+        balance = res["balance_ecuacion"]
+        if problema.incognita == "tasa_implicita":
+            return ResumenTasaImplicita(
+                tasa_mensual_efectiva=res["tasa_mensual_efectiva"],
+                tasa_implicita=res["tasa_implicita"]["valor"],
+                efectiva_anual=res["tasa_implicita"]["efectiva_anual"],
+                valor_presente_deudas=res["valor_presente_deudas"],
+                diferencia=balance["diferencia"]
+            )
+        return ResumenRenegociacion(
+            valor_x=res["valor_x"],
+            valor_presente_deudas=res["valor_presente_deudas"],
+            total_deudas_ff=balance["total_deudas_ff"],
+            total_propuesta_ff=balance["total_propuesta_ff"],
+            diferencia=balance["diferencia"],
+            valores_incognitas=res.get("valores_incognitas")
+        )
+
+    # --- LOTES (PORTAFOLIO) ---
+    def resolver_lote(self, problemas) -> dict:
+        """
+        Resuelve muchos ProblemaRenegociacion independientes en una sola llamada.
+        Acepta una lista de problemas o un `LoteFlujos` ya codificado (columnar).
+        Devuelve arreglos por problema: valor_x, valor_presente_deudas, total_deudas_ff,
+        total_pagos_conocidos_ff, factor_total_x y codigo_error (ver `engine.ERRORES_LOTE`).
+        """
+        if isinstance(problemas, LoteFlujos):
+            lote = problemas
+        else:
+            tasas = [tasa_mensual_efectiva(p.tasa_referencia) for p in problemas]
+            lote = LoteFlujos.from_problemas(problemas, tasas)
+        # Los lotes mayores que SOLVER_CHUNK_SIZE se reparten entre los workers
+        return solver_executor.resolver_lote_flujos(lote)
+
+    def resolver_tasas_lote(self, problemas) -> dict:
+        """
+        TIR de muchos problemas en una sola llamada (todos sus pagos deben ser conocidos).
+        Devuelve arreglos por problema: tasa_mensual, tasa_efectiva_anual, iteraciones
+        y codigo_error (ver `engine.ERRORES_LOTE`).
+        """
+        if isinstance(problemas, LoteFlujos):
+            lote = problemas
+        else:
+            tasas = [tasa_mensual_efectiva(p.tasa_referencia) for p in problemas]
+            lote = LoteFlujos.from_problemas(problemas, tasas)
+        return solver_executor.tasas_implicitas_lote(lote)
+
+    # --- RIESGO DE TASA (MONTE CARLO) ---
+    def simular_riesgo(self, req: SimulacionRenegociacion) -> dict:
+        """
+        Distribución de X y del valor presente de las deudas cuando la tasa sigue un modelo
+        estocástico (ver `simulation`). Solo problemas con una única incógnita X y sin restricciones.
+        """
+        problema, m = req.problema, req.modelo
+        if problema.incognita != "valor_pago_x":
+            return {"error": "La simulación requiere una incógnita X de pago (no tasa_implicita)."}
+        flujos = FlujosRenegociacion.from_problema(problema)
+        if len(flujos.nombres_incognitas) != 1 or problema.restricciones:
+            return {"error": "La simulación solo admite problemas con una única incógnita X y sin restricciones."}
+        if req.trayectorias > Config.SIMULATION_MAX_PATHS:
+            return {"error": f"Se pidieron {req.trayectorias} trayectorias; el máximo es {Config.SIMULATION_MAX_PATHS} (SIMULATION_MAX_PATHS)."}
+
+        tasa_mensual = tasa_mensual_efectiva(problema.tasa_referencia)
+        sol = resolver_flujos(flujos, tasa_mensual, problema.fecha_focal_mes)
+        if sol.factor_total_x == 0:
+            return {"error": "No hay incógnita X que despejar."}
+        x_base = (sol.suma_deudas_ff - sol.suma_pagos_conocidos_ff) / sol.factor_total_x
+
+        # r0 continua anual equivalente a la tasa de referencia: e^(r0/12) = 1 + i mensual
+        r0 = m.tasa_inicial if m.tasa_inicial is not None else 12 * math.log1p(tasa_mensual)
+        b = m.media_largo_plazo if m.media_largo_plazo is not None else r0
+        cambios = None
+        if m.modelo == "cir" and (r0 < 0 or b <= 0):
+            return {"error": "El modelo CIR requiere tasa inicial no negativa y media de largo plazo positiva."}
+        if m.modelo == "bootstrap":
+            if len(m.historico) < 2:
+                return {"error": "El bootstrap requiere al menos dos tasas en 'historico'."}
+            cambios = np.diff(np.asarray(m.historico, dtype=float))
+
+        trozos = simulation.planificar(
+            flujos, r0, m.modelo, m.velocidad_reversion, b, m.volatilidad, cambios,
+            req.trayectorias, req.semilla, Config.SIMULATION_CHUNK_PATHS,
+            simulation.MAX_MUESTRAS_CUANTILES, x_base, sol.valor_presente_total
+        )
+        if req.paralelo:
+            partes = solver_executor.mapear(simulation.simular_trozo, trozos)
+        else:
+            partes = [simulation.simular_trozo(trozo) for trozo in trozos]
+
+        resumen = simulation.resumir(partes, x_base, sol.valor_presente_total)
+        return {
+            **resumen,
+            "parametros": {
+                "modelo": m.modelo,
+                "tasa_inicial": r0,
+                "media_largo_plazo": b,
+                "velocidad_reversion": m.velocidad_reversion,
+                "volatilidad": m.volatilidad,
+                "trayectorias": req.trayectorias,
+                "trozos": len(trozos),
+                "semilla": req.semilla,
+            },
+            "cuantiles_exactos": req.trayectorias <= simulation.MAX_MUESTRAS_CUANTILES,
         }
 
 negotiation_service = NegotiationService()
@@ -0,0 +1,378 @@
+"""
+Sesiones de renegociación para edición interactiva.
+
+La sesión guarda los flujos en columnas NumPy junto con el factor de descuento
+v^t = (1+i)^(-t) de cada uno, y mantiene tres sumas a valor presente:
+
+    A = Σ D_k v^(t_k)    B = Σ P_j v^(s_j)    C = Σ a_j v^(s_j)    X = (A - B) / C
+
+Agregar, quitar o editar un flujo solo suma o resta su aporte (O(1)). Los totales en
+fecha focal son A, B y C por (1+i)^ff, así que mover la fecha focal también es O(1).
+Solo un cambio de la tasa mensual equivalente recalcula todos los factores, de una vez.
+"""
+import math
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+from app.config import Config
+from app.negotiation.engine import FlujosRenegociacion, normalizar_incognita
+from app.negotiation.schemas import (
+    Deuda, EdicionDeuda, EdicionPago, EdicionSesion, Pago, ProblemaRenegociacion
+)
+from app.shared.enums import ProblemType
+from app.shared.rates import factor_descuento, tasa_mensual_efectiva
+
+# Cada cuántas ediciones incrementales se vuelven a sumar los aportes (acota el error de redondeo)
+RECALCULO_SUMAS_CADA = 10_000
+
+
+class _Columnas:
+    """
+    Flujos de un lado de la ecuación en arreglos con capacidad que se duplica.
+    Los huecos de los flujos quitados se reutilizan; quedan con monto y proporción 0.
+    """
+
+    def __init__(self, montos: np.ndarray, meses: np.ndarray, proporciones: np.ndarray):
+        n = len(montos)
+        capacidad = max(16, 2 * n)
+        self.montos = np.zeros(capacidad)
+        self.meses = np.zeros(capacidad)
+        self.proporciones = np.zeros(capacidad)
+        self.factores = np.zeros(capacidad)
+        self.montos[:n] = montos
+        self.meses[:n] = meses
+        self.proporciones[:n] = proporciones
+        self.n = n
+        self.libres = []
+
+    def agregar(self, monto: float, mes: float, proporcion: float, factor: float) -> int:
+        if self.libres:
+            hueco = self.libres.pop()
+        else:
+            if self.n == len(self.montos):
+                for nombre in ("montos", "meses", "proporciones", "factores"):
+                    arr = getattr(self, nombre)
+                    setattr(self, nombre, np.concatenate((arr, np.zeros(len(arr)))))
+            hueco = self.n
+            self.n += 1
+        self.montos[hueco] = monto
+        self.meses[hueco] = mes
+        self.proporciones[hueco] = proporcion
+        self.factores[hueco] = factor
+        return hueco
+
+    def quitar(self, hueco: int) -> None:
+        self.montos[hueco] = 0.0
+        self.proporciones[hueco] = 0.0
+        self.libres.append(hueco)
+
+
+class SesionRenegociacion:
+    """
+    Estado editable de una renegociación con una única incógnita X y sin restricciones.
+    Los flujos se identifican con enteros que no se reutilizan dentro de la sesión.
+    Los errores de edición se reportan con ValueError (KeyError si el flujo no existe).
+    """
+
+    def __init__(self, problema: ProblemaRenegociacion):
+        if problema.incognita != "valor_pago_x":
+            raise ValueError("La sesión requiere una incógnita X de pago (no tasa_implicita).")
+        flujos = FlujosRenegociacion.from_problema(problema)
+        if len(flujos.nombres_incognitas) > 1 or problema.restricciones:
+            raise ValueError("La sesión solo admite problemas con una única incógnita X y sin restricciones.")
+
+        self.tasa_referencia = problema.tasa_referencia
+        self.tasa_mensual = tasa_mensual_efectiva(problema.tasa_referencia)
+        self.fecha_focal_mes = problema.fecha_focal_mes
+        self.incognita = flujos.nombres_incognitas[0] if flujos.nombres_incognitas else "x"
+
+        self._deudas = _Columnas(flujos.deuda_montos, flujos.deuda_meses, np.zeros(len(flujos.deuda_montos)))
+        self._pagos = _Columnas(
+            np.where(np.isnan(flujos.pago_montos), 0.0, flujos.pago_montos),
+            flujos.pago_meses,
+            flujos.pago_proporciones
+        )
+        # id -> hueco en las columnas; los ids crecen en orden de alta (el dict conserva ese orden)
+        self._ids_deudas = {k: k for k in range(self._deudas.n)}
+        self._ids_pagos = {self._deudas.n + k: k for k in range(self._pagos.n)}
+        self._siguiente_id = self._deudas.n + self._pagos.n
+        # Pagos incógnita vigentes: sin ninguno, C vuelve a ser exactamente 0 (no un residuo de restas)
+        self._pagos_incognita = int(np.count_nonzero(flujos.pago_proporciones))
+
+        self.version = 0
+        self.recalculos_factores = 0
+        self._ediciones = 0
+        self._lock = threading.Lock()
+        self._recalcular_factores()
+
+    # --- RECÁLCULOS COMPLETOS (vectorizados) ---
+
+    def _recalcular_factores(self) -> None:
+        for col in (self._deudas, self._pagos):
+            col.factores[:col.n] = np.power(1 + self.tasa_mensual, -col.meses[:col.n])
+        self.recalculos_factores += 1
+        self._recalcular_sumas()
+
+    def _recalcular_sumas(self) -> None:
+        d, p = self._deudas, self._pagos
+        self._vp_deudas = float(d.montos[:d.n] @ d.factores[:d.n])
+        self._vp_pagos_conocidos = float(p.montos[:p.n] @ p.factores[:p.n])
+        self._vp_factor_x = float(p.proporciones[:p.n] @ p.factores[:p.n])
+        self._ediciones = 0
+
+    def _editado(self) -> None:
+        self.version += 1
+        self._ediciones += 1
+        if self._ediciones >= RECALCULO_SUMAS_CADA:
+            self._recalcular_sumas()
+
+    def _nuevo_id(self) -> int:
+        self._siguiente_id += 1
+        return self._siguiente_id - 1
+
+    # --- DEUDAS ---
+
+    def agregar_deuda(self, deuda: Deuda) -> int:
+        with self._lock:
+            factor = factor_descuento(self.tasa_mensual, deuda.vencimiento_meses)
+            hueco = self._deudas.agregar(deuda.monto, deuda.vencimiento_meses, 0.0, factor)
+            self._vp_deudas += deuda.monto * factor
+            flujo_id = self._nuevo_id()
+            self._ids_deudas[flujo_id] = hueco
+            self._editado()
+            return flujo_id
+
+    def quitar_deuda(self, flujo_id: int) -> None:
+        with self._lock:
+            hueco = self._ids_deudas.pop(flujo_id)
+            col = self._deudas
+            self._vp_deudas -= col.montos[hueco] * col.factores[hueco]
+            col.quitar(hueco)
+            self._editado()
+
+    def editar_deuda(self, flujo_id: int, edicion: EdicionDeuda) -> None:
+        with self._lock:
+            hueco = self._ids_deudas[flujo_id]
+            col = self._deudas
+            monto = col.montos[hueco] if edicion.monto is None else edicion.monto
+            mes = col.meses[hueco] if edicion.vencimiento_meses is None else edicion.vencimiento_meses
+            factor = col.factores[hueco] if mes == col.meses[hueco] else factor_descuento(self.tasa_mensual, mes)
+            self._vp_deudas += monto * factor - col.montos[hueco] * col.factores[hueco]
+            col.montos[hueco], col.meses[hueco], col.factores[hueco] = monto, mes, factor
+            self._editado()
+
+    # --- PAGOS ---
+
+    def _validar_pago(self, pago: Pago) -> None:
+        if pago.monto is None and pago.proporcion_incognita is None:
+            raise ValueError("El pago necesita monto o proporcion_incognita.")
+        if (
+            pago.monto is None and "incognita" in pago.model_fields_set
+            and normalizar_incognita(pago.incognita) != self.incognita
+        ):
+            raise ValueError(f"La sesión solo admite la incógnita '{self.incognita}'.")
+
+    def _aporte_pago(self, hueco: int, signo: int = 1) -> None:
+        """Suma (o resta, con signo -1) a B y C el aporte actual del pago."""
+        col = self._pagos
+        self._vp_pagos_conocidos += signo * col.montos[hueco] * col.factores[hueco]
+        if col.proporciones[hueco] != 0.0:
+            self._vp_factor_x += signo * col.proporciones[hueco] * col.factores[hueco]
+            self._pagos_incognita += signo
+            if self._pagos_incognita == 0:
+                self._vp_factor_x = 0.0
+
+    def agregar_pago(self, pago: Pago) -> int:
+        self._validar_pago(pago)
+        with self._lock:
+            conocido = pago.monto is not None
+            factor = factor_descuento(self.tasa_mensual, pago.mes)
+            hueco = self._pagos.agregar(
+                pago.monto if conocido else 0.0, pago.mes,
+                0.0 if conocido else pago.proporcion_incognita, factor
+            )
+            self._aporte_pago(hueco)
+            flujo_id = self._nuevo_id()
+            self._ids_pagos[flujo_id] = hueco
+            self._editado()
+            return flujo_id
+
+    def quitar_pago(self, flujo_id: int) -> None:
+        with self._lock:
+            hueco = self._ids_pagos.pop(flujo_id)
+            self._aporte_pago(hueco, -1)
+            self._pagos.quitar(hueco)
+            self._editado()
+
+    def editar_pago(self, flujo_id: int, edicion: EdicionPago) -> None:
+        with self._lock:
+            hueco = self._ids_pagos[flujo_id]
+            col = self._pagos
+            actual = self._pago(hueco)
+            cambios = edicion.model_dump(exclude_unset=True)
+            # Mandar solo la proporción vuelve incógnita a un pago conocido
+            if cambios.get("proporcion_incognita") is not None and "monto" not in cambios:
+                cambios["monto"] = None
+            pago = actual.model_copy(update=cambios)
+            self._validar_pago(pago)
+
+            conocido = pago.monto is not None
+            factor = col.factores[hueco] if pago.mes == col.meses[hueco] else factor_descuento(self.tasa_mensual, pago.mes)
+            self._aporte_pago(hueco, -1)
+            col.montos[hueco] = pago.monto if conocido else 0.0
+            col.proporciones[hueco] = 0.0 if conocido else pago.proporcion_incognita
+            col.meses[hueco], col.factores[hueco] = pago.mes, factor
+            self._aporte_pago(hueco)
+            self._editado()
+
+    def _pago(self, hueco: int) -> Pago:
+        col = self._pagos
+        if col.proporciones[hueco] != 0.0:
+            return Pago(monto=None, mes=col.meses[hueco], proporcion_incognita=col.proporciones[hueco], incognita=self.incognita)
+        return Pago(monto=col.montos[hueco], mes=col.meses[hueco])
+
+    # --- TASA Y FECHA FOCAL ---
+
+    def editar(self, edicion: EdicionSesion) -> bool:
+        """Aplica tasa y/o fecha focal; devuelve True si hubo que recalcular los factores."""
+        with self._lock:
+            recalculo = False
+            if edicion.tasa_referencia is not None:
+                tasa_mensual = tasa_mensual_efectiva(edicion.tasa_referencia)
+                self.tasa_referencia = edicion.tasa_referencia
+                # Otra convención con la misma tasa mensual equivalente no mueve ningún factor
+                if tasa_mensual != self.tasa_mensual:
+                    self.tasa_mensual = tasa_mensual
+                    self._recalcular_factores()
+                    recalculo = True
+            if edicion.fecha_focal_mes is not None:
+                self.fecha_focal_mes = edicion.fecha_focal_mes
+            self.version += 1
+            return recalculo
+
+    # --- LECTURA ---
+
+    def estado(self) -> dict:
+        with self._lock:
+            acumulacion = math.pow(1 + self.tasa_mensual, self.fecha_focal_mes)
+            suma_deudas_ff = self._vp_deudas * acumulacion
+            suma_pagos_conocidos_ff = self._vp_pagos_conocidos * acumulacion
+            factor_total_x = self._vp_factor_x * acumulacion
+
+            resultado = {
+                "valor_presente_deudas": round(self._vp_deudas, 2),
+                "valor_x": None,
+                "balance_ecuacion": {
+                    "total_deudas_ff": round(suma_deudas_ff, 2),
+                    "total_propuesta_ff": round(suma_pagos_conocidos_ff, 2),
+                    "diferencia": round(suma_deudas_ff - suma_pagos_conocidos_ff, 4)
+                },
+                "sesion": {
+                    "version": self.version,
+                    "deudas": len(self._ids_deudas),
+                    "pagos": len(self._ids_pagos),
+                    "tasa_mensual_efectiva": round(self.tasa_mensual, 8),
+                    "fecha_focal_mes": self.fecha_focal_mes,
+                    "factor_total_x": factor_total_x,
+                    "recalculos_factores": self.recalculos_factores
+                }
+            }
+            if self._vp_factor_x != 0:
+                valor_x = (self._vp_deudas - self._vp_pagos_conocidos) / self._vp_factor_x
+                total_propuesta_ff = suma_pagos_conocidos_ff + factor_total_x * valor_x
+                resultado["valor_x"] = round(valor_x, 2)
+                resultado["balance_ecuacion"]["total_propuesta_ff"] = round(total_propuesta_ff, 2)
+                resultado["balance_ecuacion"]["diferencia"] = round(suma_deudas_ff - total_propuesta_ff, 4)
+            else:
+                resultado["error"] = "No hay incógnita X que despejar."
+            return resultado
+
+    def flujos(self) -> dict:
+        """Flujos vigentes con sus ids, en orden de alta."""
+        with self._lock:
+            d = self._deudas
+            return {
+                "deudas": [
+                    {"id": flujo_id, "monto": float(d.montos[h]), "vencimiento_meses": float(d.meses[h])}
+                    for flujo_id, h in self._ids_deudas.items()
+                ],
+                "pagos": [
+                    {"id": flujo_id, **self._pago(h).model_dump(include={"monto", "mes", "proporcion_incognita"})}
+                    for flujo_id, h in self._ids_pagos.items()
+                ]
+            }
+
+    def a_problema(self) -> ProblemaRenegociacion:
+        """Problema equivalente al estado actual (para el solucionador completo, con desglose)."""
+        with self._lock:
+            d = self._deudas
+            return ProblemaRenegociacion(
+                tipo=ProblemType.RENEGOCIACION_DEUDA,
+                deudas_originales=[Deuda(monto=d.montos[h], vencimiento_meses=d.meses[h]) for h in self._ids_deudas.values()],
+                pagos_propuestos=[self._pago(h) for h in self._ids_pagos.values()],
+                tasa_referencia=self.tasa_referencia,
+                fecha_focal_mes=self.fecha_focal_mes
+            )
+
+
+class AlmacenSesiones:
+    """Sesiones en memoria con LRU y vencimiento por inactividad (TTL deslizante)."""
+
+    def __init__(self, max_sesiones: int = 1000, ttl_seconds: float = 3600):
+        self.max_sesiones = max_sesiones
+        self.ttl_seconds = ttl_seconds
+        self._sesiones: "OrderedDict[str, tuple[float, SesionRenegociacion]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.creadas = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def crear(self, problema: ProblemaRenegociacion) -> tuple:
+        sesion = SesionRenegociacion(problema)
+        sesion_id = uuid.uuid4().hex
+        with self._lock:
+            self._sesiones[sesion_id] = (time.time() + self.ttl_seconds, sesion)
+            self.creadas += 1
+            while len(self._sesiones) > self.max_sesiones:
+                self._sesiones.popitem(last=False)
+                self.evictions += 1
+        return sesion_id, sesion
+
+    def obtener(self, sesion_id: str) -> Optional[SesionRenegociacion]:
+        ahora = time.time()
+        with self._lock:
+            entrada = self._sesiones.get(sesion_id)
+            if entrada is None:
+                return None
+            expira, sesion = entrada
+            if expira < ahora:
+                del self._sesiones[sesion_id]
+                self.expirations += 1
+                return None
+            self._sesiones[sesion_id] = (ahora + self.ttl_seconds, sesion)
+            self._sesiones.move_to_end(sesion_id)
+            return sesion
+
+    def eliminar(self, sesion_id: str) -> bool:
+        with self._lock:
+            return self._sesiones.pop(sesion_id, None) is not None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "active": len(self._sesiones),
+                "max_sessions": self.max_sesiones,
+                "ttl_seconds": self.ttl_seconds,
+                "created": self.creadas,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
+
+
+sesiones_renegociacion = AlmacenSesiones(Config.SESSION_MAX_ACTIVE, Config.SESSION_TTL_SECONDS)
@@ -0,0 +1,198 @@
+"""
+Simulación Monte Carlo de la tasa para renegociaciones a tasa variable.
+
+Cada trayectoria es una tasa corta anual r(t) (capitalización continua) en una malla
+mensual; el factor de descuento de un flujo en el mes t es exp(-∫₀ᵗ r) (interpolado
+linealmente entre meses; antes de hoy se usa r0). Como en el motor determinista, todos
+los flujos se llevan con el mismo factor, así que X no depende de la fecha focal:
+
+    X = (Σ D_k DF(t_k) - Σ P_j DF(s_j)) / Σ a_j DF(s_j)
+
+Las trayectorias se generan por trozos (cada uno con su propia semilla derivada con
+`SeedSequence.spawn`), de modo que la memoria es O(trozo × meses) y el resultado no
+cambia al repartir los trozos entre procesos. De cada trozo solo se guardan momentos y
+una submuestra proporcional de X y del valor presente, con la que se calculan los cuantiles.
+"""
+import math
+from typing import Optional
+
+import numpy as np
+
+from app.negotiation.engine import FlujosRenegociacion
+
+CUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+DT = 1 / 12
+# Valores que se conservan para los cuantiles; por encima, se estiman sobre una submuestra
+MAX_MUESTRAS_CUANTILES = 200_000
+
+
+# --- MODELOS DE TASA ---
+
+def _vasicek(rng, n: int, pasos: int, r0: float, a: float, b: float, sigma: float) -> np.ndarray:
+    """Discretización exacta: r' = r e^(-a dt) + b (1 - e^(-a dt)) + σ √((1 - e^(-2a dt)) / 2a) Z."""
+    e = math.exp(-a * DT)
+    desv = sigma * math.sqrt((1 - e * e) / (2 * a)) if a > 0 else sigma * math.sqrt(DT)
+    r = np.empty((n, pasos))
+    r[:, 0] = r0
+    for k in range(1, pasos):
+        r[:, k] = r[:, k - 1] * e + b * (1 - e) + desv * rng.standard_normal(n)
+    return r
+
+
+def _cir(rng, n: int, pasos: int, r0: float, a: float, b: float, sigma: float) -> np.ndarray:
+    """Transición exacta del CIR: r' = c · χ'²(d, λ), con c = σ²(1 - e^(-a dt)) / 4a, d = 4ab/σ², λ = r e^(-a dt) / c."""
+    r = np.empty((n, pasos))
+    r[:, 0] = r0
+    if sigma == 0 or a == 0:
+        # Sin ruido (o sin reversión) la trayectoria es determinista
+        e = math.exp(-a * DT)
+        for k in range(1, pasos):
+            r[:, k] = r[:, k - 1] * e + b * (1 - e)
+        return r
+    e = math.exp(-a * DT)
+    c = sigma ** 2 * (1 - e) / (4 * a)
+    grados = 4 * a * b / sigma ** 2
+    for k in range(1, pasos):
+        r[:, k] = c * rng.noncentral_chisquare(grados, r[:, k - 1] * e / c)
+    return r
+
+
+def _bootstrap(rng, n: int, pasos: int, r0: float, cambios: np.ndarray) -> np.ndarray:
+    """Remuestrea con reemplazo los cambios mensuales históricos y los acumula desde r0."""
+    r = np.empty((n, pasos))
+    r[:, 0] = r0
+    if pasos > 1:
+        r[:, 1:] = r0 + np.cumsum(rng.choice(cambios, size=(n, pasos - 1)), axis=1)
+    return r
+
+
+# --- TROZO DE TRAYECTORIAS ---
+
+def _factores(integral: np.ndarray, meses: np.ndarray, r0: float) -> np.ndarray:
+    """DF = exp(-∫₀ᵗ r) en cada mes de flujo (n × flujos); antes de hoy se acumula a r0."""
+    futuros = np.clip(meses, 0, integral.shape[1] - 1)
+    lo = np.minimum(np.floor(futuros).astype(np.int64), integral.shape[1] - 2)
+    w = futuros - lo
+    acumulada = integral[:, lo] * (1 - w) + integral[:, lo + 1] * w
+    acumulada = np.where(meses < 0, r0 * meses * DT, acumulada)
+    return np.exp(-acumulada)
+
+
+def simular_trozo(args: tuple) -> dict:
+    """
+    Trabajador de un trozo (importable por nombre para el pool de procesos).
+    `args` = (flujos como dict de arreglos, parámetros del modelo, n trayectorias,
+    SeedSequence del trozo, tamaño de submuestra). Devuelve momentos y submuestras.
+    """
+    flujos, modelo, n, semilla, muestras = args
+    rng = np.random.default_rng(semilla)
+
+    pasos = modelo["pasos"]
+    if modelo["modelo"] == "vasicek":
+        r = _vasicek(rng, n, pasos, modelo["r0"], modelo["a"], modelo["b"], modelo["sigma"])
+    elif modelo["modelo"] == "cir":
+        r = _cir(rng, n, pasos, modelo["r0"], modelo["a"], modelo["b"], modelo["sigma"])
+    else:
+        r = _bootstrap(rng, n, pasos, modelo["r0"], modelo["cambios"])
+
+    # ∫₀ᵏ r en cada mes k = 0..pasos (regla del punto izquierdo, r constante dentro del mes)
+    integral = np.zeros((n, pasos + 1))
+    np.cumsum(r * DT, axis=1, out=integral[:, 1:])
+    del r
+
+    df_d = _factores(integral, flujos["deuda_meses"], modelo["r0"])
+    df_p = _factores(integral, flujos["pago_meses"], modelo["r0"])
+    del integral
+
+    valor_presente = df_d @ flujos["deuda_montos"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x = (valor_presente - df_p @ flujos["pagos_conocidos"]) / (df_p @ flujos["pago_proporciones"])
+
+    return {
+        "valor_x": _momentos(x, muestras, flujos["x_base"]),
+        "valor_presente_deudas": _momentos(valor_presente, muestras, flujos["vp_base"]),
+    }
+
+
+def _momentos(valores: np.ndarray, muestras: int, base: float) -> dict:
+    return {
+        "n": len(valores),
+        "media": float(valores.mean()),
+        "m2": float(((valores - valores.mean()) ** 2).sum()),
+        "min": float(valores.min()),
+        "max": float(valores.max()),
+        "sobre_base": int((valores > base).sum()),
+        # Las trayectorias son i.i.d.: los primeros `muestras` valores son una submuestra uniforme
+        "muestra": valores[:muestras].copy(),
+    }
+
+
+def _combinar(partes: list, base: float) -> dict:
+    # Media y suma de cuadrados centrada combinadas por pares (Chan et al.), estable en un paso
+    n, media, m2 = 0, 0.0, 0.0
+    for p in partes:
+        total = n + p["n"]
+        delta = p["media"] - media
+        media += delta * p["n"] / total
+        m2 += p["m2"] + delta ** 2 * n * p["n"] / total
+        n = total
+    muestra = np.concatenate([p["muestra"] for p in partes])
+    cuantiles = np.quantile(muestra, CUANTILES)
+    return {
+        "media": media,
+        "desviacion": math.sqrt(m2 / (n - 1)) if n > 1 else 0.0,
+        "min": min(p["min"] for p in partes),
+        "max": max(p["max"] for p in partes),
+        "cuantiles": {f"p{round(q * 100):02d}": float(v) for q, v in zip(CUANTILES, cuantiles)},
+        "determinista": base,
+        "prob_mayor_que_determinista": sum(p["sobre_base"] for p in partes) / n,
+    }
+
+
+# --- ORQUESTACIÓN ---
+
+def planificar(
+    flujos: FlujosRenegociacion,
+    r0: float,
+    modelo: str,
+    a: float,
+    b: float,
+    sigma: float,
+    cambios: Optional[np.ndarray],
+    trayectorias: int,
+    semilla: int,
+    tamano_trozo: int,
+    max_muestras: int,
+    x_base: float,
+    vp_base: float
+) -> list:
+    """Arma los argumentos de `simular_trozo` para cada trozo (solo arreglos y números)."""
+    horizonte = max(float(flujos.deuda_meses.max(initial=0.0)), float(flujos.pago_meses.max(initial=0.0)), 1.0)
+    pasos = int(math.ceil(horizonte))
+    datos = {
+        "deuda_montos": flujos.deuda_montos,
+        "deuda_meses": flujos.deuda_meses,
+        "pago_meses": flujos.pago_meses,
+        "pagos_conocidos": np.where(np.isnan(flujos.pago_montos), 0.0, flujos.pago_montos),
+        "pago_proporciones": flujos.pago_proporciones,
+        "x_base": x_base,
+        "vp_base": vp_base,
+    }
+    parametros = {"modelo": modelo, "pasos": pasos, "r0": r0, "a": a, "b": b, "sigma": sigma, "cambios": cambios}
+
+    # La malla de un trozo ocupa n × (pasos + 1) flotantes; se limita a ~5M por trozo
+    tamano_trozo = max(1, min(tamano_trozo, 5_000_000 // (pasos + 1)))
+    tamanos = [min(tamano_trozo, trayectorias - inicio) for inicio in range(0, trayectorias, tamano_trozo)]
+    semillas = np.random.SeedSequence(semilla).spawn(len(tamanos))
+    fraccion = min(1.0, max_muestras / trayectorias)
+    return [
+        (datos, parametros, n, s, int(math.ceil(n * fraccion)))
+        for n, s in zip(tamanos, semillas)
+    ]
+
+
+def resumir(partes: list, x_base: float, vp_base: float) -> dict:
+    return {
+        "valor_x": _combinar([p["valor_x"] for p in partes], x_base),
+        "valor_presente_deudas": _combinar([p["valor_presente_deudas"] for p in partes], vp_base),
+    }
@@ -0,0 +1,211 @@
+"""
+Métricas en memoria con exposición en formato de texto de Prometheus (`/metrics`) y
+logging estructurado en JSON. Sin dependencias externas: contadores e histogramas
+acumulativos protegidos por un lock, etiquetados por tuplas de valores.
+"""
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+
+# Buckets en segundos: del microsegundo del solucionador al minuto de un backoff
+BUCKETS_LATENCIA = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0
+)
+
+
+def _escapar(valor: str) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _formatear_etiquetas(nombres: Sequence[str], valores: Tuple[str, ...], extra: str = "") -> str:
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+class _Metrica:
+    tipo = ""
+
+    def __init__(self, nombre: str, descripcion: str, etiquetas: Sequence[str] = ()):
+        self.nombre = nombre
+        self.descripcion = descripcion
+        self.etiquetas = tuple(etiquetas)
+        self._lock = threading.Lock()
+
+    def _clave(self, valores: dict) -> Tuple[str, ...]:
+        return tuple(str(valores.get(n, "")) for n in self.etiquetas)
+
+    def encabezado(self) -> list:
+        return [f"# HELP {self.nombre} {self.descripcion}", f"# TYPE {self.nombre} {self.tipo}"]
+
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def __init__(self, nombre: str, descripcion: str, etiquetas: Sequence[str] = ()):
+        super().__init__(nombre, descripcion, etiquetas)
+        self._valores: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, cantidad: float = 1, **etiquetas) -> None:
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0.0) + cantidad
+
+    def valor(self, **etiquetas) -> float:
+        return self._valores.get(self._clave(etiquetas), 0.0)
+
+    def render(self) -> list:
+        with self._lock:
+            valores = list(self._valores.items())
+        lineas = self.encabezado()
+        for clave, total in valores:
+            lineas.append(f"{self.nombre}{_formatear_etiquetas(self.etiquetas, clave)} {total}")
+        return lineas
+
+
+class Histograma(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nombre: str, descripcion: str, etiquetas: Sequence[str] = (), buckets: Sequence[float] = BUCKETS_LATENCIA):
+        super().__init__(nombre, descripcion, etiquetas)
+        self.buckets = tuple(sorted(buckets))
+        # Por combinación de etiquetas: [conteos por bucket (no acumulados)..., suma, total]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, valor: float, **etiquetas) -> None:
+        clave = self._clave(etiquetas)
+        indice = next((k for k, limite in enumerate(self.buckets) if valor <= limite), len(self.buckets))
+        with self._lock:
+            serie = self._series.get(clave)
+            if serie is None:
+                serie = self._series[clave] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            serie[indice] += 1
+            serie[-2] += valor
+            serie[-1] += 1
+
+    def render(self) -> list:
+        with self._lock:
+            series = [(clave, list(serie)) for clave, serie in self._series.items()]
+        lineas = self.encabezado()
+        for clave, serie in series:
+            acumulado = 0
+            for limite, conteo in zip(self.buckets + (float("inf"),), serie[:-2]):
+                acumulado += conteo
+                le = "+Inf" if limite == float("inf") else repr(limite)
+                etiquetas = _formatear_etiquetas(self.etiquetas, clave, f'le="{le}"')
+                lineas.append(f"{self.nombre}_bucket{etiquetas} {acumulado}")
+            lineas.append(f"{self.nombre}_sum{_formatear_etiquetas(self.etiquetas, clave)} {serie[-2]}")
+            lineas.append(f"{self.nombre}_count{_formatear_etiquetas(self.etiquetas, clave)} {serie[-1]}")
+        return lineas
+
+
+class RegistroMetricas:
+    def __init__(self):
+        self._metricas: Dict[str, _Metrica] = {}
+
+    def registrar(self, metrica: _Metrica) -> _Metrica:
+        self._metricas[metrica.nombre] = metrica
+        return metrica
+
+    def render(self) -> str:
+        lineas = []
+        for metrica in self._metricas.values():
+            lineas.extend(metrica.render())
+        return "\n".join(lineas) + "\n"
+
+
+registro = RegistroMetricas()
+
+STAGE_SECONDS = registro.registrar(Histograma(
+    "financial_stage_duration_seconds", "Duración de cada etapa de una petición.", ("endpoint", "stage")
+))
+REQUESTS_TOTAL = registro.registrar(Contador(
+    "financial_requests_total", "Peticiones atendidas por endpoint y código de estado.", ("endpoint", "status")
+))
+LLM_EXTRACTION_SECONDS = registro.registrar(Histograma(
+    "financial_llm_extraction_duration_seconds",
+    "Duración de extract_data por origen del resultado (cache, remote).", ("provider", "model", "source")
+))
+LLM_CALL_SECONDS = registro.registrar(Histograma(
+    "financial_llm_call_duration_seconds", "Duración de cada intento de llamada al proveedor.", ("provider", "model", "outcome")
+))
+LLM_QUEUE_SECONDS = registro.registrar(Histograma(
+    "financial_llm_queue_wait_seconds", "Espera en el limitador local antes de llamar al proveedor.", ("provider", "model")
+))
+LLM_RETRIES_TOTAL = registro.registrar(Contador(
+    "financial_llm_retries_total", "Reintentos programados por tenacity.", ("provider", "model")
+))
+LLM_RATE_LIMITED_TOTAL = registro.registrar(Contador(
+    "financial_llm_rate_limited_total", "Respuestas 429 del proveedor.", ("provider", "model")
+))
+LLM_BACKOFF_SECONDS_TOTAL = registro.registrar(Contador(
+    "financial_llm_backoff_seconds_total", "Tiempo total dormido en backoff entre reintentos.", ("provider", "model")
+))
+LLM_CACHE_TOTAL = registro.registrar(Contador(
+    "financial_llm_cache_requests_total", "Consultas a la caché de extracciones.", ("result",)
+))
+LLM_TOKENS_TOTAL = registro.registrar(Contador(
+    "financial_llm_tokens_total", "Tokens reportados por el proveedor.", ("provider", "model", "kind")
+))
+LLM_PROMPT_TOKENS = registro.registrar(Histograma(
+    "financial_llm_prompt_tokens_estimated",
+    "Tokens de entrada estimados por extracción según la ruta del enrutador (compact, full).", ("route",),
+    buckets=(250, 500, 750, 1000, 1500, 2000, 3000, 5000, 10000)
+))
+
+
+@contextmanager
+def medir_etapa(endpoint: str, etapa: str) -> Iterator[None]:
+    """Observa la duración del bloque en `financial_stage_duration_seconds` (también si falla)."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - inicio, endpoint=endpoint, stage=etapa)
+
+
+def registrar_tokens(provider: str, model: str, prompt: Optional[int], completion: Optional[int]) -> None:
+    if prompt:
+        LLM_TOKENS_TOTAL.inc(prompt, provider=provider, model=model, kind="prompt")
+    if completion:
+        LLM_TOKENS_TOTAL.inc(completion, provider=provider, model=model, kind="completion")
+
+
+# --- LOGGING ESTRUCTURADO ---
+
+_ATRIBUTOS_ESTANDAR = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class FormatoJSON(logging.Formatter):
+    """Una línea JSON por registro; los campos de `extra=` se añaden al objeto."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        evento = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage()
+        }
+        for clave, valor in vars(record).items():
+            if clave not in _ATRIBUTOS_ESTANDAR and not clave.startswith("_"):
+                evento[clave] = valor
+        if record.exc_info:
+            evento["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(evento, ensure_ascii=False, default=str)
+
+
+def configurar_logging(nivel: str = "INFO", formato: str = "json") -> None:
+    """Configura el logger raíz una sola vez (API o CLI); importar `app` no toca el logging."""
+    raiz = logging.getLogger()
+    if any(getattr(h, "_financial", False) for h in raiz.handlers):
+        return
+    handler = logging.StreamHandler()
+    handler._financial = True
+    handler.setFormatter(FormatoJSON() if formato == "json" else logging.Formatter("%(levelname)s %(name)s: %(message)s"))
+    raiz.addHandler(handler)
+    raiz.setLevel(nivel.upper())
@@ -0,0 +1,128 @@
+"""
+Barridos de sensibilidad en una sola pasada: la malla de parámetros se evalúa con
+broadcasting de NumPy y las derivadas salen de sus fórmulas cerradas (sin volver a
+resolver ni usar diferencias finitas).
+
+Ecuación de valor con una incógnita, con r = 1 + i mensual y los pagos corridos Δ meses:
+    A(i) = Σ D_k r^(-t_k)    B(i) = Σ P_j r^(-s_j)    C(i) = Σ a_j r^(-s_j)
+    X(i, Δ) = (A r^Δ - B) / C
+X no depende de la fecha focal (con interés compuesto todos los flujos se mueven con el
+mismo factor r^ff); la fecha focal solo cambia los totales valuados en ella, A r^ff.
+"""
+import numpy as np
+
+from app.negotiation.engine import FlujosRenegociacion
+from app.shared.rates import frecuencia_anual
+
+
+def tasa_mensual_y_derivadas(valores: np.ndarray, tasa_obj) -> tuple:
+    """
+    Tasa mensual efectiva i(v) para cada valor v de la tasa cotizada, con di/dv y d²i/dv²
+    (misma regla que `rates.convertir_tasa` con periodos_destino = 12).
+    """
+    if tasa_obj.es_nominal:
+        m = frecuencia_anual(tasa_obj.capitalizacion)
+        e = m / 12
+        base = 1 + valores / m
+        return np.power(base, e) - 1, e / m * np.power(base, e - 1), e * (e - 1) / m ** 2 * np.power(base, e - 2)
+    e = frecuencia_anual(tasa_obj.periodo) / 12
+    base = 1 + valores
+    return np.power(base, e) - 1, e * np.power(base, e - 1), e * (e - 1) * np.power(base, e - 2)
+
+
+def _sumas(montos: np.ndarray, meses: np.ndarray, r: np.ndarray) -> tuple:
+    """Σ c r^(-t) y sus dos primeras derivadas respecto de i, para cada r de la malla."""
+    v = np.power(r[:, None], -meses[None, :])
+    return (
+        v @ montos,
+        -(v @ (meses * montos)) / r,
+        (v @ (meses * (meses + 1) * montos)) / r ** 2,
+    )
+
+
+def barrido_ecuacion_valor(
+    flujos: FlujosRenegociacion,
+    tasas: np.ndarray,
+    tasa_obj,
+    fechas_focales: np.ndarray,
+    desplazamientos: np.ndarray
+) -> dict:
+    """
+    Matrices (tasas × desplazamientos) de X y sus derivadas respecto de la tasa cotizada y
+    del desplazamiento; matrices (tasas × fechas focales) del total de deudas en ff; y, por
+    tasa, duración y convexidad del valor presente de las deudas.
+    """
+    i, i_v, i_vv = tasa_mensual_y_derivadas(tasas, tasa_obj)
+    r = 1 + i
+    conocidos = ~np.isnan(flujos.pago_montos)
+
+    A, A1, A2 = _sumas(flujos.deuda_montos, flujos.deuda_meses, r)
+    B, B1, B2 = _sumas(np.where(conocidos, flujos.pago_montos, 0.0), flujos.pago_meses, r)
+    C, C1, C2 = _sumas(flujos.pago_proporciones, flujos.pago_meses, r)
+
+    # Ejes: tasas en filas (a, 1); desplazamientos o fechas focales en columnas (1, c)
+    col = lambda arr: arr[:, None]
+    d = desplazamientos[None, :]
+    g = np.power(col(r), d)
+    ln_r = np.log(col(r))
+
+    N = col(A) * g - col(B)
+    N_i = col(A1) * g + col(A) * d * g / col(r) - col(B1)
+    N_ii = col(A2) * g + 2 * col(A1) * d * g / col(r) + col(A) * d * (d - 1) * g / col(r) ** 2 - col(B2)
+
+    # De X·C = N: X_i = (N_i - X C') / C  y  X_ii = (N_ii - 2 X_i C' - X C'') / C
+    X = N / col(C)
+    X_i = (N_i - X * col(C1)) / col(C)
+    X_ii = (N_ii - 2 * X_i * col(C1) - X * col(C2)) / col(C)
+
+    f = fechas_focales[None, :]
+    acumulado = np.power(col(r), f)
+    total_ff = col(A) * acumulado
+
+    return {
+        "valor_x": X,
+        "dx_dtasa": X_i * col(i_v),
+        "d2x_dtasa2": X_ii * col(i_v) ** 2 + X_i * col(i_vv),
+        "dx_ddesplazamiento": col(A) * g * ln_r / col(C),
+        "total_deudas_ff": total_ff,
+        "dtotal_ff_dtasa": (col(A1) * acumulado + total_ff * f / col(r)) * col(i_v),
+        "dtotal_ff_dfecha_focal": total_ff * ln_r,
+        "valor_presente_deudas": A,
+        "duracion_macaulay_meses": -A1 * r / A,
+        "duracion_modificada": -A1 / A * i_v,
+        "convexidad": (A2 * i_v ** 2 + A1 * i_vv) / A,
+        "tasa_mensual": i,
+    }
+
+
+def barrido_compuesto(
+    conocido: float,
+    hacia_futuro: bool,
+    tasas: np.ndarray,
+    m_tasa: float,
+    m_cap: float,
+    plazos_meses: np.ndarray
+) -> dict:
+    """
+    Matrices (tasas × plazos) de M = C (1+i)^n (`hacia_futuro`) o C = M (1+i)^(-n), con
+    i = v / m_tasa (la convención de `resolver_interes_compuesto`) y n = t / (12 / m_cap).
+    Duración modificada y convexidad se expresan por unidad de la tasa cotizada.
+    """
+    i = tasas[:, None] / m_tasa
+    i_v = 1 / m_tasa
+    n = plazos_meses[None, :] / (12 / m_cap)
+    signo = 1 if hacia_futuro else -1
+
+    valor = conocido * np.power(1 + i, signo * n)
+    d_di = signo * n * valor / (1 + i)
+    d2_di2 = n * (n - signo) * valor / (1 + i) ** 2
+
+    return {
+        "valor": valor,
+        "d_dtasa": d_di * i_v,
+        "d2_dtasa2": d2_di2 * i_v ** 2,
+        "d_dplazo_mes": signo * valor * np.log1p(i) * (m_cap / 12),
+        "duracion_modificada": np.broadcast_to(n / (1 + i) * i_v, valor.shape),
+        # (d²V/di²) / V en cada sentido: n(n+1)/(1+i)² al descontar, n(n-1)/(1+i)² al acumular
+        "convexidad": d2_di2 / valor * i_v ** 2,
+    }
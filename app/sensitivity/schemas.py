@@ -0,0 +1,17 @@
+from pydantic import BaseModel, Field
+from typing import List
+from app.accounting.schemas import ProblemaInteresCompuesto
+from app.negotiation.schemas import ProblemaRenegociacion
+
+MAX_PUNTOS_EJE = 10000
+
+class BarridoRenegociacion(BaseModel):
+    problema: ProblemaRenegociacion
+    tasas: List[float] = Field(..., min_length=1, max_length=MAX_PUNTOS_EJE, description="Valores de tasa_referencia.valor, en la misma convención (periodo, nominal/efectiva)")
+    fechas_focales: List[float] = Field(default_factory=list, max_length=MAX_PUNTOS_EJE, description="Fechas focales en meses; vacío = la del problema")
+    desplazamientos_meses: List[float] = Field(default_factory=lambda: [0.0], min_length=1, max_length=MAX_PUNTOS_EJE, description="Meses que se corren todos los pagos propuestos (alarga o acorta el plazo)")
+
+class BarridoInteresCompuesto(BaseModel):
+    problema: ProblemaInteresCompuesto
+    tasas: List[float] = Field(..., min_length=1, max_length=MAX_PUNTOS_EJE, description="Valores de tasa.valor, en la misma convención")
+    plazos_meses: List[float] = Field(default_factory=list, max_length=MAX_PUNTOS_EJE, description="Plazos en meses; vacío = tiempo_meses del problema")
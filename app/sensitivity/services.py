@@ -0,0 +1,113 @@
+import numpy as np
+
+from app.config import Config
+from app.negotiation.engine import FlujosRenegociacion
+from app.sensitivity.engine import barrido_compuesto, barrido_ecuacion_valor
+from app.sensitivity.schemas import BarridoInteresCompuesto, BarridoRenegociacion
+from app.shared.enums import VariableObjetivo
+from app.shared.rates import frecuencia_anual
+
+
+def _lista(arr, decimales: int = 6) -> list:
+    """Arreglo -> listas anidadas listas para JSON (NaN e infinitos como null)."""
+    arr = np.round(np.asarray(arr, dtype=float), decimales)
+    return np.where(np.isfinite(arr), arr, None).tolist()
+
+
+class SensitivityService:
+    """
+    Barridos de escenarios sobre un problema ya estructurado. Cada malla se evalúa de una
+    vez y la respuesta trae los ejes más una matriz por magnitud (filas = tasas), lista
+    para pintar como mapa de calor.
+    """
+
+    def _validar_malla(self, *ejes) -> str:
+        celdas = int(np.prod([len(eje) for eje in ejes]))
+        if celdas > Config.SWEEP_MAX_CELLS:
+            return f"La malla tiene {celdas} celdas; el máximo es {Config.SWEEP_MAX_CELLS} (SWEEP_MAX_CELLS)."
+        return ""
+
+    def barrer_renegociacion(self, req: BarridoRenegociacion) -> dict:
+        problema = req.problema
+        if problema.incognita != "valor_pago_x":
+            return {"error": "El barrido requiere una incógnita X de pago (no tasa_implicita)."}
+
+        flujos = FlujosRenegociacion.from_problema(problema)
+        if len(flujos.nombres_incognitas) != 1 or problema.restricciones:
+            return {"error": "El barrido solo admite problemas con una única incógnita X y sin restricciones."}
+
+        fechas_focales = req.fechas_focales or [problema.fecha_focal_mes]
+        error = self._validar_malla(req.tasas, fechas_focales) or self._validar_malla(req.tasas, req.desplazamientos_meses)
+        if error:
+            return {"error": error}
+
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            res = barrido_ecuacion_valor(
+                flujos,
+                np.asarray(req.tasas, dtype=float),
+                problema.tasa_referencia,
+                np.asarray(fechas_focales, dtype=float),
+                np.asarray(req.desplazamientos_meses, dtype=float)
+            )
+
+        return {
+            "ejes": {
+                "tasas": req.tasas,
+                "desplazamientos_meses": req.desplazamientos_meses,
+                "fechas_focales": fechas_focales
+            },
+            # Filas = tasas; columnas = desplazamientos de los pagos
+            "por_desplazamiento": {
+                clave: _lista(res[clave], 2 if clave == "valor_x" else 6)
+                for clave in ("valor_x", "dx_dtasa", "d2x_dtasa2", "dx_ddesplazamiento")
+            },
+            # Filas = tasas; columnas = fechas focales
+            "por_fecha_focal": {
+                clave: _lista(res[clave], 2 if clave == "total_deudas_ff" else 6)
+                for clave in ("total_deudas_ff", "dtotal_ff_dtasa", "dtotal_ff_dfecha_focal")
+            },
+            # Una entrada por tasa
+            "deudas": {
+                clave: _lista(res[clave], 2 if clave == "valor_presente_deudas" else 6)
+                for clave in ("tasa_mensual", "valor_presente_deudas", "duracion_macaulay_meses", "duracion_modificada", "convexidad")
+            },
+            "nota": "X no depende de la fecha focal con interés compuesto; la fecha focal solo mueve los totales valuados en ella."
+        }
+
+    def barrer_interes_compuesto(self, req: BarridoInteresCompuesto) -> dict:
+        p = req.problema
+        if p.incognita == VariableObjetivo.MONTO:
+            conocido, hacia_futuro, nombre = p.capital, True, "M"
+        elif p.incognita == VariableObjetivo.CAPITAL:
+            conocido, hacia_futuro, nombre = p.monto_futuro, False, "C"
+        else:
+            return {"error": "El barrido de interés compuesto admite las incógnitas monto y capital."}
+        if conocido is None:
+            return {"error": f"Faltan datos para calcular {'Monto' if hacia_futuro else 'Capital'}"}
+
+        plazos = req.plazos_meses or ([p.tiempo_meses] if p.tiempo_meses is not None else [])
+        if not plazos:
+            return {"error": "Indica plazos_meses o el tiempo_meses del problema."}
+        error = self._validar_malla(req.tasas, plazos)
+        if error:
+            return {"error": error}
+
+        # Misma convención que resolver_interes_compuesto: nominal -> j/m; efectiva -> tasa del periodo
+        tasa = p.tasa
+        m_tasa = frecuencia_anual(tasa.capitalizacion or p.capitalizacion) if tasa is not None and tasa.es_nominal else 1
+
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            res = barrido_compuesto(
+                conocido, hacia_futuro,
+                np.asarray(req.tasas, dtype=float), m_tasa, frecuencia_anual(p.capitalizacion),
+                np.asarray(plazos, dtype=float)
+            )
+
+        return {
+            "ejes": {"tasas": req.tasas, "plazos_meses": plazos},
+            "incognita": nombre,
+            # Filas = tasas; columnas = plazos
+            "matrices": {clave: _lista(valores, 2 if clave == "valor" else 6) for clave, valores in res.items()}
+        }
+
+sensitivity_service = SensitivityService()
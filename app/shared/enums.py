@@ -16,6 +16,7 @@ class ProblemType(str, Enum):
     INTERES_COMPUESTO = "interes_compuesto"
     DESCUENTO_BANCARIO = "descuento_bancario"
     RENEGOCIACION_DEUDA = "renegociacion_deuda"
+    AMORTIZACION = "amortizacion"
     DESCONOCIDO = "desconocido"
 
 class VariableObjetivo(str, Enum):
@@ -26,4 +27,12 @@ class VariableObjetivo(str, Enum):
     INTERES = "interes"       # I
     DESCUENTO = "descuento"   # D
     VALOR_NOMINAL = "valor_nominal" # Vn
-    
\ No newline at end of file
+
+class ModalidadDescuento(str, Enum):
+    COMERCIAL = "comercial"   # D = Vn * d * n (sobre el valor nominal)
+    RACIONAL = "racional"     # D = Vn - Vn / (1 + d*n) (sobre el valor recibido)
+
+class SistemaAmortizacion(str, Enum):
+    FRANCES = "frances"       # Cuota constante
+    ALEMAN = "aleman"         # Amortización constante
+    AMERICANO = "americano"   # Solo intereses; capital al final
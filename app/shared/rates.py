@@ -0,0 +1,98 @@
+"""
+Tablas de frecuencias y conversiones de tasas compartidas por todos los servicios.
+Las tablas son inmutables y se construyen una sola vez al importar el módulo; las
+conversiones `math.pow` y los factores de descuento se memorizan en cachés acotados,
+porque en los lotes se repiten las mismas tasas una y otra vez.
+"""
+import math
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Optional
+
+from app.shared.enums import Frequency
+
+# Periodos por año (m)
+FRECUENCIA_ANUAL = MappingProxyType({
+    Frequency.ANUAL: 1, Frequency.SEMESTRAL: 2, Frequency.CUATRIMESTRAL: 3,
+    Frequency.TRIMESTRAL: 4, Frequency.BIMESTRAL: 6, Frequency.MENSUAL: 12,
+    Frequency.QUINCENAL: 24, Frequency.SEMANAL: 52, Frequency.DIARIO: 360
+})
+
+# Duración de cada periodo en meses (12 / m)
+MESES_POR_PERIODO = MappingProxyType({freq: 12 / m for freq, m in FRECUENCIA_ANUAL.items()})
+
+MAX_TASAS_CACHE = 4096
+MAX_FACTORES_CACHE = 16384
+
+
+def frecuencia_anual(freq: Optional[Frequency]) -> int:
+    """Retorna cuántos periodos caben en un año (m); 1 si la frecuencia no se conoce."""
+    return FRECUENCIA_ANUAL.get(freq, 1)
+
+
+def meses_por_periodo(freq: Optional[Frequency]) -> float:
+    return MESES_POR_PERIODO.get(freq, 12.0)
+
+
+@lru_cache(maxsize=MAX_TASAS_CACHE)
+def convertir_tasa(
+    valor: float,
+    es_nominal: bool,
+    capitalizacion: Optional[Frequency],
+    periodo: Optional[Frequency],
+    periodos_destino: int
+) -> float:
+    """
+    Tasa efectiva para un periodo de `periodos_destino` por año.
+    - Nominal: (1 + j/m)^(m/k) - 1, con m la frecuencia de capitalización.
+    - Efectiva: (1 + i)^(k_tasa/k) - 1, con k_tasa la frecuencia de su periodo.
+    """
+    if es_nominal:
+        m = frecuencia_anual(capitalizacion)
+        return math.pow(1 + valor / m, m / periodos_destino) - 1
+    k_tasa = frecuencia_anual(periodo)
+    return math.pow(1 + valor, k_tasa / periodos_destino) - 1
+
+
+def tasa_efectiva_periodica(tasa_obj, frecuencia_destino: Frequency, capitalizacion_defecto: Frequency = None) -> float:
+    """Convierte un `TasaInteres` a la tasa efectiva del periodo `frecuencia_destino`."""
+    capitalizacion = tasa_obj.capitalizacion or capitalizacion_defecto
+    return convertir_tasa(
+        tasa_obj.valor, tasa_obj.es_nominal, capitalizacion, tasa_obj.periodo,
+        frecuencia_anual(frecuencia_destino)
+    )
+
+
+def tasa_mensual_efectiva(tasa_obj) -> float:
+    return convertir_tasa(tasa_obj.valor, tasa_obj.es_nominal, tasa_obj.capitalizacion, tasa_obj.periodo, 12)
+
+
+@lru_cache(maxsize=MAX_FACTORES_CACHE)
+def factor_descuento(tasa: float, n: float) -> float:
+    """v^n = (1 + i)^(-n). Su inverso es el factor de acumulación."""
+    return math.pow(1 + tasa, -n)
+
+
+def _info(cache) -> dict:
+    info = cache.cache_info()
+    consultas = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "size": info.currsize,
+        "max_size": info.maxsize,
+        "hit_ratio": round(info.hits / consultas, 4) if consultas else 0.0
+    }
+
+
+def stats() -> dict:
+    return {
+        "conversion_tasas": _info(convertir_tasa),
+        "factores_descuento": _info(factor_descuento)
+    }
+
+
+def limpiar_caches() -> None:
+    """Vacía ambos cachés y sus contadores (aislamiento entre pruebas)."""
+    convertir_tasa.cache_clear()
+    factor_descuento.cache_clear()
@@ -0,0 +1,122 @@
+"""
+Búsqueda de raíces con Newton salvaguardado (Newton + bisección dentro de un intervalo
+que encierra la raíz). Si el paso de Newton sale del intervalo o la derivada se anula,
+se bisecta; así la convergencia es cuadrática cerca de la raíz y nunca diverge.
+"""
+from typing import Callable, Tuple
+
+import numpy as np
+
+
+def acotar_en_malla(valores: np.ndarray, malla: np.ndarray, x0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Elige, entre los tramos de `malla` donde f cambia de signo, el más cercano a `x0`.
+    `valores` es f evaluada en la malla: forma (G,) para un problema o (P, G) para varios.
+    Devuelve (lo, hi); NaN donde no hay ningún cambio de signo.
+    Sirve cuando hay varias raíces (flujos con más de un cambio de signo) o cuando los
+    extremos del intervalo tienen el mismo signo aunque exista una raíz interior.
+    """
+    valores = np.atleast_2d(valores)
+    x0 = np.broadcast_to(np.asarray(x0, dtype=float), (valores.shape[0],))
+    cambio = np.signbit(valores[:, :-1]) != np.signbit(valores[:, 1:])
+    cambio &= np.isfinite(valores[:, :-1]) & np.isfinite(valores[:, 1:])
+
+    centros = (malla[:-1] + malla[1:]) / 2
+    distancia = np.where(cambio, np.abs(centros[None, :] - x0[:, None]), np.inf)
+    tramo = np.argmin(distancia, axis=1)
+    hay = cambio.any(axis=1)
+    lo = np.where(hay, malla[tramo], np.nan)
+    hi = np.where(hay, malla[tramo + 1], np.nan)
+    return lo, hi
+
+
+def newton_acotado(
+    f_df: Callable[[float], Tuple[float, float]],
+    lo: float,
+    hi: float,
+    x0: float = None,
+    tol: float = 1e-12,
+    max_iter: int = 100
+) -> Tuple[float, int]:
+    """
+    `f_df(x)` devuelve (f(x), f'(x)). Requiere f(lo) y f(hi) de signo opuesto.
+    Devuelve (raíz, iteraciones). Lanza ValueError si la raíz no está acotada.
+    """
+    f_lo, _ = f_df(lo)
+    f_hi, _ = f_df(hi)
+    if f_lo == 0:
+        return lo, 0
+    if f_hi == 0:
+        return hi, 0
+    if f_lo * f_hi > 0:
+        raise ValueError("No hay cambio de signo en el intervalo: la raíz no está acotada.")
+    # Orientamos el intervalo para que f(lo) < 0 < f(hi)
+    if f_lo > 0:
+        lo, hi = hi, lo
+
+    x = x0 if x0 is not None and min(lo, hi) < x0 < max(lo, hi) else (lo + hi) / 2
+    for iteracion in range(1, max_iter + 1):
+        f, df = f_df(x)
+        if f == 0:
+            return x, iteracion
+        if f < 0:
+            lo = x
+        else:
+            hi = x
+
+        siguiente = x - f / df if df != 0 else np.nan
+        if not (min(lo, hi) < siguiente < max(lo, hi)):
+            siguiente = (lo + hi) / 2
+
+        if abs(siguiente - x) <= tol * (1 + abs(x)):
+            return siguiente, iteracion
+        x = siguiente
+
+    raise ValueError(f"Newton no convergió en {max_iter} iteraciones.")
+
+
+def newton_acotado_vectorizado(
+    f_df: Callable[[np.ndarray], Tuple[np.ndarray, np.ndarray]],
+    lo: np.ndarray,
+    hi: np.ndarray,
+    tol: float = 1e-12,
+    max_iter: int = 100
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Variante vectorizada: resuelve muchas ecuaciones independientes a la vez.
+    `f_df(x)` evalúa todas las ecuaciones en el arreglo `x`.
+    Devuelve (raíces, convergió, iteraciones); donde no hay cambio de signo la raíz es NaN.
+    """
+    lo = np.asarray(lo, dtype=float).copy()
+    hi = np.asarray(hi, dtype=float).copy()
+    f_lo, _ = f_df(lo)
+    f_hi, _ = f_df(hi)
+
+    acotada = np.isfinite(f_lo) & np.isfinite(f_hi) & (f_lo * f_hi <= 0)
+    invertir = f_lo > 0
+    lo[invertir], hi[invertir] = hi[invertir], lo[invertir].copy()
+
+    x = (lo + hi) / 2
+    activo = acotada.copy()
+    iteraciones = np.zeros(len(x), dtype=np.int64)
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        for _ in range(max_iter):
+            if not activo.any():
+                break
+            f, df = f_df(x)
+            negativo = f < 0
+            lo = np.where(activo & negativo, x, lo)
+            hi = np.where(activo & ~negativo, x, hi)
+
+            siguiente = x - f / df
+            fuera = ~((np.minimum(lo, hi) < siguiente) & (siguiente < np.maximum(lo, hi)))
+            siguiente = np.where(fuera | ~np.isfinite(siguiente), (lo + hi) / 2, siguiente)
+
+            terminado = activo & ((np.abs(siguiente - x) <= tol * (1 + np.abs(x))) | (f == 0))
+            iteraciones += activo
+            x = np.where(activo, siguiente, x)
+            activo &= ~terminado
+
+    x[~acotada] = np.nan
+    return x, acotada & ~activo, iteraciones
@@ -0,0 +1,6 @@
+"""
+Benchmarks del sistema: `python -m benchmarks --help`.
+- solvers: latencia por llamada del núcleo matemático según el número de flujos/filas.
+- validation: costo de validar `ExtraccionFinanciera` con Pydantic.
+- api: peticiones por segundo y p50/p95/p99 de /analyze y /solve con el proveedor simulado.
+"""
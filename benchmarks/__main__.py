@@ -0,0 +1,94 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+# El proveedor simulado debe configurarse antes de importar `app`: Config lee el entorno
+# una sola vez. Sin caché de extracciones para medir el pipeline completo en cada petición.
+os.environ["LLM_PROVIDER"] = "mock"
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+os.environ.setdefault("LLM_MOCK_LATENCY_MS", "0")
+
+import numpy as np
+import pydantic
+
+from benchmarks.medicion import comparar
+
+SUITES = ("solvers", "validation", "api")
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def _ejecutar_suite(nombre: str, rapido: bool) -> dict:
+    if nombre == "solvers":
+        from benchmarks import solvers
+        return solvers.ejecutar(solvers.TAMANOS[:4] if rapido else solvers.TAMANOS)
+    if nombre == "validation":
+        from benchmarks import validacion
+        return validacion.ejecutar(validacion.TAMANOS[:3] if rapido else validacion.TAMANOS)
+    from benchmarks import api
+    return api.ejecutar(peticiones=200 if rapido else 2000)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmarks del sistema financiero.")
+    parser.add_argument("--suite", action="append", choices=SUITES, help="Suite a ejecutar (repetible). Por defecto, todas.")
+    parser.add_argument("--quick", action="store_true", help="Tamaños y número de peticiones reducidos.")
+    parser.add_argument("--output", "-o", help="Archivo JSON de resultados (por defecto, salida estándar).")
+    parser.add_argument("--baseline", "-b", help="JSON de una corrida anterior para comparar.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Regresión permitida en p50 (fracción, por defecto 0.2).")
+    args = parser.parse_args()
+
+    resultados = {}
+    for suite in args.suite or SUITES:
+        print(f"⏱️  Ejecutando suite '{suite}'...", file=sys.stderr)
+        resultados.update(_ejecutar_suite(suite, args.quick))
+
+    reporte = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "commit": _commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "pydantic": pydantic.VERSION,
+            "quick": args.quick
+        },
+        "results": resultados
+    }
+
+    texto = json.dumps(reporte, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+    else:
+        print(texto)
+
+    if not args.baseline:
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        base = json.load(f)
+    filas = comparar(reporte, base, args.tolerance)
+    regresiones = [fila for fila in filas if fila["regresion"]]
+
+    print(f"\n{'benchmark':<55} {'base p50 µs':>12} {'p50 µs':>12} {'ratio':>7}", file=sys.stderr)
+    for fila in filas:
+        marca = "  ❌" if fila["regresion"] else ""
+        print(f"{fila['benchmark']:<55} {fila['base_p50_us']:>12.1f} {fila['p50_us']:>12.1f} {fila['ratio']:>7.3f}{marca}", file=sys.stderr)
+    print(f"\n{len(regresiones)} regresión(es) sobre {len(filas)} benchmarks comparados.", file=sys.stderr)
+    return 1 if regresiones else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
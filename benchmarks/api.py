@@ -0,0 +1,81 @@
+"""
+Throughput de extremo a extremo de /analyze contra la app en proceso (httpx + ASGI),
+con el proveedor simulado. Requiere que `LLM_PROVIDER=mock` esté en el entorno antes
+de importar `app` (ver `benchmarks.__main__`).
+"""
+import asyncio
+import time
+from typing import Dict
+
+import httpx
+
+from app.entrypoints.api.main import app
+from benchmarks.medicion import resumir
+from benchmarks.solvers import problema_renegociacion
+
+TEXTOS = (
+    "Solicitamos un préstamo de 50,000 a 2 años, tasa del 16% anual. Determinar el valor final.",
+    "Invierto 10000 al 12% capitalizable trimestral durante 3 años.",
+    "Contamos con deudas de 100000 a 2 meses y 250000 a 6 meses; se van a renegociar al 19% "
+    "capitalizable mensual con un pago único en 12 meses.",
+)
+
+
+def _folio(indice: int) -> str:
+    """Identificador solo con letras: un número extra cambiaría lo que extraen las reglas del mock."""
+    letras = ""
+    while True:
+        indice, resto = divmod(indice, 26)
+        letras = chr(ord("A") + resto) + letras
+        if indice == 0:
+            return letras
+
+
+async def _carga(ruta: str, peticiones: int, concurrencia: int, cuerpo) -> dict:
+    semaforo = asyncio.Semaphore(concurrencia)
+    latencias, errores = [], 0
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark") as cliente:
+        async def una(indice: int):
+            nonlocal errores
+            async with semaforo:
+                t0 = time.perf_counter_ns()
+                respuesta = await cliente.post(ruta, json=cuerpo(indice))
+                latencias.append(time.perf_counter_ns() - t0)
+                if respuesta.status_code != 200:
+                    errores += 1
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(una(k) for k in range(peticiones)))
+        transcurrido = time.perf_counter() - inicio
+
+    return {
+        **resumir(latencias),
+        "rps": round(peticiones / transcurrido, 1),
+        "errors": errores,
+        "concurrency": concurrencia
+    }
+
+
+def ejecutar(peticiones: int = 2000, concurrencias=(1, 16, 64)) -> Dict[str, dict]:
+    resultados = {}
+    for concurrencia in concurrencias:
+        # Texto único por petición: así ni la caché ni el single-flight esconden trabajo
+        resultados[f"api.analyze.c{concurrencia}"] = asyncio.run(_carga(
+            "/analyze", peticiones, concurrencia,
+            lambda k: {"text": f"{TEXTOS[k % len(TEXTOS)]} Folio {_folio(k)}."}
+        ))
+        resultados[f"api.solve.c{concurrencia}"] = asyncio.run(_carga(
+            "/solve", peticiones, concurrencia,
+            lambda k: {"problema": {
+                "tipo": "interes_simple", "capital": 1000 + k, "tasa": {"valor": 0.16}, "tiempo_meses": 24, "incognita": "monto"
+            }}
+        ))
+
+    # Cronograma de 10k flujos: costo de armar y serializar el desglose frente a detail=summary
+    cuerpo = problema_renegociacion(10_000).model_dump(mode="json")
+    for detalle in ("full", "summary"):
+        resultados[f"api.solve_renegociacion_10k.{detalle}"] = asyncio.run(_carga(
+            f"/solve/renegociacion?detail={detalle}", min(peticiones, 50), 1, lambda k: cuerpo
+        ))
+    return resultados
@@ -0,0 +1,62 @@
+"""Cronometraje, percentiles y comparación contra una línea base guardada."""
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+
+def resumir(muestras_ns: List[int]) -> Dict[str, float]:
+    """Estadísticas en microsegundos de una lista de duraciones en nanosegundos."""
+    arr = np.asarray(muestras_ns, dtype=float) / 1000
+    p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+    return {
+        "n": len(arr),
+        "mean_us": round(float(arr.mean()), 3),
+        "min_us": round(float(arr.min()), 3),
+        "p50_us": round(float(p50), 3),
+        "p95_us": round(float(p95), 3),
+        "p99_us": round(float(p99), 3)
+    }
+
+
+def medir(
+    fn: Callable[[], object],
+    min_repeticiones: int = 5,
+    min_segundos: float = 0.2,
+    max_repeticiones: int = 10000
+) -> Dict[str, float]:
+    """
+    Ejecuta `fn` hasta cumplir a la vez `min_repeticiones` y `min_segundos` (o llegar a
+    `max_repeticiones`). La primera llamada se descarta como calentamiento.
+    """
+    fn()
+    muestras = []
+    inicio = time.perf_counter()
+    while len(muestras) < max_repeticiones:
+        t0 = time.perf_counter_ns()
+        fn()
+        muestras.append(time.perf_counter_ns() - t0)
+        if len(muestras) >= min_repeticiones and time.perf_counter() - inicio >= min_segundos:
+            break
+    return resumir(muestras)
+
+
+def comparar(actual: dict, base: dict, tolerancia: float) -> List[dict]:
+    """
+    Compara el p50 de cada benchmark presente en ambos resultados.
+    Una regresión es un p50 más de `tolerancia` (fracción) por encima de la base.
+    """
+    filas = []
+    for nombre, medida in actual["results"].items():
+        previa = base.get("results", {}).get(nombre)
+        if not previa or not previa.get("p50_us"):
+            continue
+        ratio = medida["p50_us"] / previa["p50_us"]
+        filas.append({
+            "benchmark": nombre,
+            "base_p50_us": previa["p50_us"],
+            "p50_us": medida["p50_us"],
+            "ratio": round(ratio, 3),
+            "regresion": ratio > 1 + tolerancia
+        })
+    return filas
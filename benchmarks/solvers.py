@@ -0,0 +1,78 @@
+"""Micro-benchmarks del núcleo matemático (sin LLM ni HTTP)."""
+from typing import Dict, Iterable
+
+import numpy as np
+
+from app.accounting.schemas import ProblemaInteresCompuesto, ProblemaInteresSimple
+from app.accounting.services import accounting_service
+from app.negotiation.schemas import ProblemaRenegociacion
+from app.negotiation.services import negotiation_service
+from benchmarks.medicion import medir
+
+TAMANOS = (1, 10, 100, 1_000, 10_000, 100_000)
+
+
+def problema_renegociacion(flujos: int, semilla: int = 0) -> ProblemaRenegociacion:
+    """Problema con `flujos` deudas y pagos (mitad y mitad) y una sola incógnita."""
+    rng = np.random.default_rng(semilla)
+    n_deudas = max(flujos // 2, 1)
+    n_pagos = max(flujos - n_deudas, 1)
+    pagos = [{"monto": float(m), "mes": float(t)} for m, t in zip(rng.uniform(1e3, 1e5, n_pagos - 1), rng.integers(0, 120, n_pagos - 1))]
+    pagos.append({"monto": None, "mes": 60.0, "proporcion_incognita": 1.0})
+    return ProblemaRenegociacion.model_validate({
+        "tipo": "renegociacion_deuda",
+        "deudas_originales": [
+            {"monto": float(m), "vencimiento_meses": float(t)}
+            for m, t in zip(rng.uniform(1e3, 1e6, n_deudas), rng.integers(-12, 120, n_deudas))
+        ],
+        "pagos_propuestos": pagos,
+        "tasa_referencia": {"valor": 0.19, "es_nominal": True, "capitalizacion": "mensual"},
+        "fecha_focal_mes": 12.0
+    })
+
+
+def lote_interes(filas: int, semilla: int = 0) -> dict:
+    """Columnas para `solve_batch`: mitad interés simple, mitad compuesto, incógnita MONTO."""
+    rng = np.random.default_rng(semilla)
+    return {
+        "tipo": np.where(np.arange(filas) % 2 == 0, "interes_simple", "interes_compuesto"),
+        "capital": rng.uniform(1e3, 1e6, filas),
+        "tasa_valor": rng.uniform(0.01, 0.3, filas),
+        "tasa_periodo": np.full(filas, "anual"),
+        "tiempo_meses": rng.integers(1, 120, filas).astype(float),
+        "capitalizacion": np.full(filas, "mensual"),
+        "incognita": np.full(filas, "monto")
+    }
+
+
+def ejecutar(tamanos: Iterable[int] = TAMANOS) -> Dict[str, dict]:
+    resultados = {}
+
+    simple = ProblemaInteresSimple.model_validate({
+        "tipo": "interes_simple", "capital": 50000, "tasa": {"valor": 0.16}, "tiempo_meses": 24, "incognita": "monto"
+    })
+    resultados["solvers.interes_simple.monto"] = medir(lambda: accounting_service.resolver_interes_simple(simple))
+
+    compuesto = ProblemaInteresCompuesto.model_validate({
+        "tipo": "interes_compuesto", "capital": 10000, "monto_futuro": 14257.61,
+        "tasa": {"valor": 0.12, "es_nominal": True, "capitalizacion": "trimestral"},
+        "capitalizacion": "trimestral", "incognita": "tiempo"
+    })
+    resultados["solvers.interes_compuesto.tiempo"] = medir(lambda: accounting_service.resolver_interes_compuesto(compuesto))
+
+    for n in tamanos:
+        # Los tamaños grandes tardan segundos por llamada: basta con pocas repeticiones
+        repeticiones = 3 if n >= 10_000 else 5
+        problema = problema_renegociacion(n)
+        resultados[f"solvers.ecuacion_valor.flujos_{n}"] = medir(
+            lambda: negotiation_service.resolver_ecuacion_valor(problema), min_repeticiones=repeticiones
+        )
+        resultados[f"solvers.ecuacion_valor_sin_desglose.flujos_{n}"] = medir(
+            lambda: negotiation_service.resolver_ecuacion_valor(problema, incluir_desglose=False), min_repeticiones=repeticiones
+        )
+        datos = lote_interes(n)
+        resultados[f"solvers.solve_batch.filas_{n}"] = medir(
+            lambda: accounting_service.solve_batch(datos), min_repeticiones=repeticiones
+        )
+
+    return resultados
@@ -0,0 +1,36 @@
+"""Costo de validar con Pydantic la salida del LLM (`ExtraccionFinanciera`)."""
+import json
+from typing import Dict, Iterable
+
+from app.llm_schema_registry import ExtraccionFinanciera
+from benchmarks.medicion import medir
+from benchmarks.solvers import problema_renegociacion
+
+TAMANOS = (1, 10, 100, 1_000)
+
+
+def _extraccion(problema: dict) -> dict:
+    return {"razonamiento": "Benchmark de validación.", "problema": problema}
+
+
+def ejecutar(tamanos: Iterable[int] = TAMANOS) -> Dict[str, dict]:
+    resultados = {}
+
+    casos = {
+        "interes_simple": _extraccion({
+            "tipo": "interes_simple", "capital": 50000, "tasa": {"valor": 0.16}, "tiempo_meses": 24, "incognita": "monto"
+        }),
+        "interes_compuesto": _extraccion({
+            "tipo": "interes_compuesto", "capital": 10000, "tasa": {"valor": 0.12, "es_nominal": True, "capitalizacion": "trimestral"},
+            "tiempo_meses": 36, "capitalizacion": "trimestral", "incognita": "monto"
+        })
+    }
+    for n in tamanos:
+        casos[f"renegociacion.flujos_{n}"] = _extraccion(problema_renegociacion(n).model_dump(mode="json"))
+
+    for nombre, payload in casos.items():
+        texto = json.dumps(payload)
+        resultados[f"validation.python.{nombre}"] = medir(lambda: ExtraccionFinanciera.model_validate(payload))
+        resultados[f"validation.json.{nombre}"] = medir(lambda: ExtraccionFinanciera.model_validate_json(texto))
+
+    return resultados
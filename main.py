@@ -1,4 +1,6 @@
-from app.llm_engine import llm_service, Config
+from app.config import Config
+from app.observability import configurar_logging
+from app.llm_engine import get_llm_service
 from app.llm_schema_registry import ExtraccionFinanciera
 from app.accounting.services import accounting_service
 from app.negotiation.services import negotiation_service # <--- IMPORTAR NUEVO
@@ -24,6 +26,8 @@ Analiza el texto y extrae una estructura JSON válida.
 """
 
 def main():
+    configurar_logging(Config.LOG_LEVEL, Config.LOG_FORMAT)
+    Config.validate()
     print(f"🚀 Iniciando Sistema Financiero Avanzado")
     print(f"🧠 Cerebro: {Config.PROVIDER.upper()} | 🧮 Motor: Python Math")
     print("-" * 60)
@@ -31,7 +35,7 @@ def main():
     try:
         # FASE 1: EXTRACCIÓN
         print("1️⃣  Analizando el problema...")
-        extraccion = llm_service.extract_data(
+        extraccion = get_llm_service().extract_data(
             system_prompt=SYSTEM_PROMPT,
             user_text=TEXTO_PRUEBA,
             schema=ExtraccionFinanciera
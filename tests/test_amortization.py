@@ -0,0 +1,45 @@
+"""Tabla de amortización: modo vectorizado contra generador y validación del plazo."""
+import numpy as np
+import pytest
+
+from app.accounting.amortization import COLUMNAS_TABLA, amortization_service
+from app.accounting.schemas import ProblemaAmortizacion
+
+
+def _problema(**kwargs) -> ProblemaAmortizacion:
+    datos = {"capital": 100_000.0, "tasa": {"valor": 0.12, "periodo": "anual"}, "plazo_meses": 36}
+    datos.update(kwargs)
+    return ProblemaAmortizacion(**datos)
+
+
+@pytest.mark.parametrize("sistema", ["frances", "aleman", "americano"])
+@pytest.mark.parametrize("frecuencia, plazo", [("mensual", 36), ("trimestral", 36), ("diario", 12)])
+@pytest.mark.parametrize("tasa", [0.0, 0.12])
+def test_tabla_coincide_con_generador(sistema, frecuencia, plazo, tasa):
+    p = _problema(sistema=sistema, frecuencia_pago=frecuencia, plazo_meses=plazo, tasa={"valor": tasa, "periodo": "anual"})
+    tabla = amortization_service.tabla(p)
+    filas = list(amortization_service.iterar_tabla(p))
+    assert len(filas) == len(tabla["periodo"])
+    for columna in COLUMNAS_TABLA:
+        np.testing.assert_allclose([f[columna] for f in filas], tabla[columna], rtol=1e-9, atol=1e-6)
+    # Las amortizaciones devuelven el capital y el saldo cierra en cero
+    assert tabla["amortizacion"].sum() == pytest.approx(p.capital)
+    assert tabla["saldo"][-1] == 0.0
+    np.testing.assert_allclose(tabla["cuota"], tabla["interes"] + tabla["amortizacion"])
+
+
+def test_cuota_francesa_constante():
+    tabla = amortization_service.tabla(_problema(sistema="frances"))
+    np.testing.assert_allclose(tabla["cuota"], tabla["cuota"][0])
+    # i mensual equivalente al 12% efectivo anual
+    i = 1.12 ** (1 / 12) - 1
+    assert tabla["cuota"][0] == pytest.approx(100_000 * i / (1 - (1 + i) ** -36))
+
+
+@pytest.mark.parametrize("frecuencia", ["diario", "mensual", "semestral"])
+def test_plazo_no_entero_en_cuotas(frecuencia):
+    p = _problema(frecuencia_pago=frecuencia, plazo_meses=7.01)
+    with pytest.raises(ValueError, match=f"cuotas con frecuencia {frecuencia}\\."):
+        amortization_service.iterar_tabla(p)
+    with pytest.raises(ValueError):
+        amortization_service.tabla(p)
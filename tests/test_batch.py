@@ -0,0 +1,191 @@
+"""
+Paridad entre el motor columnar (`batch.resolver_lote`) y los solvers escalares de
+AccountingService: mismas filas con error y mismos valores en las que se resuelven.
+Las filas se sortean con datos faltantes, tasas y plazos en cero e importes negativos.
+"""
+import math
+import random
+
+import numpy as np
+import pytest
+
+from app.accounting import batch
+from app.accounting.schemas import ProblemaDescuentoBancario, ProblemaInteresCompuesto, ProblemaInteresSimple
+from app.accounting.services import accounting_service
+from app.shared.enums import Frequency
+
+FILAS = 3000
+FRECUENCIAS = list(Frequency)
+# Columna de salida que contiene la incógnita de cada tipo
+SALIDA_SIMPLE = {"monto": "M", "capital": "C", "interes": "I", "tasa": "i", "tiempo": "n"}
+SALIDA_COMPUESTO = {"monto": "M", "capital": "C", "interes": "I", "tasa": "i", "tiempo": "n"}
+SALIDA_DESCUENTO = {"descuento": "I", "valor_nominal": "M", "monto": "M", "capital": "C", "tasa": "i", "tiempo": "n"}
+
+
+def _quizas(rng, valor, prob=0.2):
+    return None if rng.random() < prob else valor
+
+
+def _nan(valor):
+    return np.nan if valor is None else valor
+
+
+def _columnas(filas: list) -> dict:
+    return {clave: [f[clave] for f in filas] for clave in filas[0]}
+
+
+def _casos_simple(rng):
+    for _ in range(FILAS):
+        incognita = rng.choice(list(SALIDA_SIMPLE))
+        periodo = rng.choice(FRECUENCIAS)
+        solicitada = _quizas(rng, rng.choice(FRECUENCIAS), 0.5)
+        tasa = _quizas(rng, rng.choice([0.0, rng.uniform(-0.2, 0.4)]))
+        t = _quizas(rng, rng.choice([0.0, rng.uniform(1, 120)]))
+        C, M = _quizas(rng, rng.uniform(-100, 5000)), _quizas(rng, rng.uniform(-100, 9000))
+        I = _quizas(rng, rng.uniform(0, 900), 0.6)
+        problema = ProblemaInteresSimple(
+            tipo="interes_simple", capital=C, monto_futuro=M, interes_ganado=I, tiempo_meses=t,
+            tasa=None if tasa is None else {"valor": tasa, "periodo": periodo},
+            incognita=incognita, periodo_tasa_solicitada=solicitada
+        )
+        fila = {
+            "tipo": "interes_simple", "incognita": incognita, "capital": _nan(C), "monto_futuro": _nan(M),
+            "interes_ganado": _nan(I), "tiempo_meses": _nan(t), "tasa_valor": _nan(tasa),
+            "tasa_periodo": periodo.value, "periodo_tasa_solicitada": solicitada.value if solicitada else None,
+        }
+        yield problema, fila
+
+
+def _casos_compuesto(rng):
+    for _ in range(FILAS):
+        incognita = rng.choice(list(SALIDA_COMPUESTO))
+        nominal = rng.random() < 0.4
+        cap_tasa = rng.choice([None] + FRECUENCIAS) if nominal else None
+        capitalizacion = rng.choice(FRECUENCIAS)
+        tasa = _quizas(rng, rng.choice([0.0, rng.uniform(-0.3, 0.4)]))
+        t = _quizas(rng, rng.choice([0.0, rng.uniform(1, 120)]))
+        C, M = _quizas(rng, rng.uniform(-100, 5000)), _quizas(rng, rng.uniform(-100, 9000))
+        problema = ProblemaInteresCompuesto(
+            tipo="interes_compuesto", capital=C, monto_futuro=M, tiempo_meses=t,
+            tasa=None if tasa is None else {"valor": tasa, "es_nominal": nominal, "capitalizacion": cap_tasa},
+            capitalizacion=capitalizacion, incognita=incognita
+        )
+        fila = {
+            "tipo": "interes_compuesto", "incognita": incognita, "capital": _nan(C), "monto_futuro": _nan(M),
+            "tiempo_meses": _nan(t), "tasa_valor": _nan(tasa), "tasa_es_nominal": nominal,
+            "tasa_capitalizacion": cap_tasa.value if cap_tasa else None, "capitalizacion": capitalizacion.value,
+        }
+        yield problema, fila
+
+
+def _casos_descuento(rng):
+    for _ in range(FILAS):
+        incognita = rng.choice(list(SALIDA_DESCUENTO))
+        periodo = rng.choice(FRECUENCIAS)
+        modalidad = rng.choice(["comercial", "racional"])
+        d = _quizas(rng, rng.choice([0.0, rng.uniform(0, 0.05)]))
+        t = _quizas(rng, rng.choice([0.0, rng.uniform(1, 24)]))
+        Vn, Vr = _quizas(rng, rng.uniform(500, 5000)), _quizas(rng, rng.uniform(100, 5000), 0.5)
+        D = _quizas(rng, rng.uniform(0, 400), 0.6)
+        problema = ProblemaDescuentoBancario(
+            tipo="descuento_bancario", valor_nominal=Vn, valor_recibido=Vr, descuento_importe=D, tiempo_meses=t,
+            tasa_descuento=None if d is None else {"valor": d, "periodo": periodo},
+            incognita=incognita, modalidad=modalidad
+        )
+        fila = {
+            "tipo": "descuento_bancario", "incognita": incognita, "valor_nominal": _nan(Vn),
+            "valor_recibido": _nan(Vr), "descuento_importe": _nan(D), "tiempo_meses": _nan(t),
+            "tasa_valor": _nan(d), "tasa_periodo": periodo.value if d is not None else "anual", "modalidad": modalidad,
+        }
+        yield problema, fila
+
+
+def _valor_simple(resultado: dict, incognita: str):
+    """El solver simple no devuelve `resultado`: la incógnita se lee del resumen."""
+    resumen = resultado["resumen"]
+    if incognita == "tasa":
+        return resultado.get("tasa_calculada", {}).get("valor")
+    if incognita == "tiempo":
+        return resumen["variables_tiempo"]["n"] if "tiempo_calculado" in resultado else None
+    return resumen["variables_monetarias"][SALIDA_SIMPLE[incognita][0]]
+
+
+def _comparar(casos, resolver, salida_por_incognita, leer_valor=None):
+    problemas, filas = zip(*casos)
+    salida = batch.resolver_lote(_columnas(list(filas)))
+    for k, (problema, fila) in enumerate(zip(problemas, filas)):
+        escalar = resolver(problema)
+        ok = bool(salida["ok"][k])
+        if leer_valor is None:
+            esperado = None if "error" in escalar else escalar["resultado"]
+            tolerancia = 0.011  # el escalar redondea a 2, 4 o 6 decimales
+        else:
+            esperado = None if "error" in escalar or "resumen" not in escalar else leer_valor(escalar, fila["incognita"])
+            tolerancia = 1e-9
+        assert ok == (esperado is not None), (fila, escalar, int(salida["codigo_error"][k]))
+        if ok:
+            obtenido = salida[salida_por_incognita[fila["incognita"]]][k]
+            assert math.isclose(obtenido, esperado, rel_tol=1e-6, abs_tol=tolerancia), (fila, escalar, obtenido)
+
+
+def test_simple_coincide_con_escalar():
+    _comparar(_casos_simple(random.Random(5)), accounting_service.resolver_interes_simple, SALIDA_SIMPLE, _valor_simple)
+
+
+def test_compuesto_coincide_con_escalar():
+    _comparar(_casos_compuesto(random.Random(3)), accounting_service.resolver_interes_compuesto, SALIDA_COMPUESTO)
+
+
+def test_descuento_coincide_con_escalar():
+    _comparar(_casos_descuento(random.Random(7)), accounting_service.resolver_descuento_bancario, SALIDA_DESCUENTO)
+
+
+@pytest.mark.parametrize("incognita", ["monto", "capital"])
+def test_compuesto_sin_tasa_falta_dato(incognita):
+    salida = batch.resolver_lote({
+        "tipo": ["interes_compuesto"], "incognita": [incognita], "capital": [1000.0],
+        "monto_futuro": [1500.0], "tiempo_meses": [12.0], "capitalizacion": ["mensual"],
+    })
+    assert salida["codigo_error"][0] == batch.FALTAN_DATOS
+
+
+def test_compuesto_interes_con_ambos_importes_no_requiere_tasa():
+    salida = batch.resolver_lote({
+        "tipo": ["interes_compuesto"] * 2, "incognita": ["interes"] * 2, "capital": [1000.0, 1000.0],
+        "monto_futuro": [1500.0, np.nan], "tiempo_meses": [np.nan, 12.0], "capitalizacion": ["mensual"] * 2,
+    })
+    assert salida["codigo_error"].tolist() == [batch.OK, batch.FALTAN_DATOS]
+    assert salida["I"][0] == pytest.approx(500.0)
+
+
+def test_compuesto_tasa_con_plazo_cero_es_invalida():
+    salida = batch.resolver_lote({
+        "tipo": ["interes_compuesto"], "incognita": ["tasa"], "capital": [1500.0],
+        "monto_futuro": [1000.0], "tiempo_meses": [0.0], "capitalizacion": ["mensual"],
+    })
+    assert salida["codigo_error"][0] == batch.CALCULO_INVALIDO
+
+
+def test_lote_vacio_devuelve_arreglos_vacios():
+    salida = accounting_service.solve_batch({"tipo": [], "incognita": []})
+    assert len(salida["C"]) == 0 and len(salida["ok"]) == 0
+
+
+def test_dataframe_y_enums_equivalen_a_texto():
+    pd = pytest.importorskip("pandas")
+    columnas = {
+        "tipo": ["interes_simple", "interes_compuesto", "interes_simple"],
+        "incognita": ["monto", "monto", "desconocida"],
+        "capital": [1000.0, 1000.0, 1000.0],
+        "tiempo_meses": [12.0, 12.0, 12.0],
+        "tasa_valor": [0.1, 0.01, 0.1],
+        "tasa_periodo": ["anual", None, "anual"],
+        "capitalizacion": [None, Frequency.MENSUAL, None],
+    }
+    desde_listas = batch.resolver_lote(columnas)
+    desde_df = batch.resolver_lote(pd.DataFrame(columnas))
+    for clave in ("C", "M", "i", "n", "codigo_error"):
+        np.testing.assert_array_equal(desde_listas[clave], desde_df[clave])
+    assert desde_df["M"][0] == pytest.approx(1100.0)
+    assert desde_df["M"][1] == pytest.approx(1000.0 * 1.01 ** 12)
+    assert desde_df["codigo_error"][2] == batch.NO_SOPORTADO
@@ -0,0 +1,48 @@
+"""Pools y trozos de SolverExecutor."""
+import asyncio
+import threading
+
+import numpy as np
+
+from app.executor import SolverExecutor
+
+
+def test_lote_vacio_no_envia_trozos():
+    executor = SolverExecutor(modo="thread", workers=2, tamano_trozo=10)
+    salida = executor.resolver_lote_interes({"tipo": np.array([], dtype=str), "incognita": np.array([], dtype=str)})
+    assert executor.trozos == 0
+    assert len(salida["C"]) == 0 and len(salida["codigo_error"]) == 0
+
+
+def test_trozos_se_unen_en_orden():
+    executor = SolverExecutor(modo="thread", workers=2, tamano_trozo=3)
+    datos = {
+        "tipo": ["interes_simple"] * 10, "incognita": ["monto"] * 10,
+        "capital": np.arange(10, dtype=float) + 1, "tiempo_meses": np.full(10, 12.0),
+        "tasa_valor": np.full(10, 0.1),
+    }
+    salida = executor.resolver_lote_interes(datos)
+    executor.shutdown()
+    assert executor.trozos == 4
+    np.testing.assert_allclose(salida["M"], (np.arange(10) + 1) * 1.1)
+
+
+def test_lote_pesado_no_bloquea_calculos_individuales():
+    executor = SolverExecutor(modo="thread", workers=1)
+    liberar = threading.Event()
+
+    async def escenario():
+        pesado = asyncio.ensure_future(executor.ejecutar_lote(liberar.wait, 5))
+        await asyncio.sleep(0.05)
+        # Con un solo worker por pool, el cálculo individual no espera al lote
+        resultado = await asyncio.wait_for(executor.ejecutar(sum, [1, 2, 3]), timeout=1)
+        liberar.set()
+        await pesado
+        return resultado
+
+    try:
+        assert asyncio.run(escenario()) == 6
+    finally:
+        liberar.set()
+        executor.shutdown()
+    assert executor.stats()["tasks"] == 1 and executor.stats()["batch_tasks"] == 1
@@ -0,0 +1,194 @@
+"""
+Ingesta por bloques: el archivo de salida debe coincidir con resolver todo en una pasada
+(motores vectorizados) y con los solvers escalares, aunque los bloques sean diminutos y
+los problemas de renegociación queden partidos entre dos bloques.
+"""
+import math
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.accounting import batch
+from app.accounting.schemas import ProblemaInteresCompuesto
+from app.accounting.services import accounting_service
+from app.ingestion import pipeline
+from app.negotiation import engine
+from app.negotiation.schemas import ProblemaRenegociacion
+from app.negotiation.services import negotiation_service
+
+FRECUENCIAS = ["mensual", "trimestral", "semestral", "anual"]
+INCOGNITAS = ["monto", "capital", "interes", "tasa", "tiempo"]
+SALIDA = {"monto": "M", "capital": "C", "interes": "I", "tasa": "i", "tiempo": "n"}
+BLOQUE = 7
+
+
+def _quizas(rng, valor, prob=0.15):
+    return np.nan if rng.random() < prob else valor
+
+
+def _leer(ruta) -> pd.DataFrame:
+    return pd.read_parquet(ruta) if str(ruta).endswith(".parquet") else pd.read_csv(ruta)
+
+
+def _ingerir(tmp_path, df: pd.DataFrame, tipo: str, formato: str) -> pd.DataFrame:
+    entrada, salida = tmp_path / f"entrada.{formato}", tmp_path / f"salida.{formato}"
+    if formato == "parquet":
+        df.to_parquet(entrada, index=False)
+    else:
+        df.to_csv(entrada, index=False)
+    resumen = pipeline.ingerir(str(entrada), str(salida), tipo, tamano_bloque=BLOQUE)
+    resultado = _leer(salida)
+    assert resumen == {"filas": len(resultado), "errores": int((~resultado["ok"]).sum())}
+    return resultado
+
+
+# --- CARTERA DE INTERÉS ---
+
+def _cartera_interes(semilla: int, filas: int = 300) -> pd.DataFrame:
+    """Interés compuesto y simple con datos faltantes, tasas y plazos en cero e incógnitas inválidas."""
+    rng = random.Random(semilla)
+    registros = []
+    for _ in range(filas):
+        registros.append({
+            "tipo": rng.choice(["interes_compuesto"] * 3 + ["interes_simple"]),
+            "incognita": rng.choice(INCOGNITAS * 4 + ["desconocida", None]),
+            "capital": _quizas(rng, rng.uniform(-100, 5000)),
+            "monto_futuro": _quizas(rng, rng.uniform(-100, 9000)),
+            "tiempo_meses": _quizas(rng, rng.choice([0.0, rng.uniform(1, 120)])),
+            "tasa_valor": _quizas(rng, rng.choice([0.0, rng.uniform(-0.2, 0.4)])),
+            "tasa_es_nominal": rng.random() < 0.4,
+            "tasa_capitalizacion": rng.choice([None] + FRECUENCIAS),
+            "tasa_periodo": rng.choice(FRECUENCIAS),
+            "capitalizacion": rng.choice(FRECUENCIAS),
+        })
+    return pd.DataFrame(registros)
+
+
+def _problema_compuesto(fila) -> ProblemaInteresCompuesto:
+    nulo = lambda v: None if pd.isna(v) else v
+    tasa = None
+    if not pd.isna(fila.tasa_valor):
+        tasa = {"valor": fila.tasa_valor, "es_nominal": bool(fila.tasa_es_nominal),
+                "capitalizacion": nulo(fila.tasa_capitalizacion)}
+    return ProblemaInteresCompuesto(
+        tipo="interes_compuesto", incognita=fila.incognita, capital=nulo(fila.capital),
+        monto_futuro=nulo(fila.monto_futuro), tiempo_meses=nulo(fila.tiempo_meses),
+        tasa=tasa, capitalizacion=fila.capitalizacion
+    )
+
+
+@pytest.mark.parametrize("formato", pipeline.FORMATOS)
+def test_cartera_interes_por_bloques_igual_que_en_una_pasada(tmp_path, formato):
+    df = _cartera_interes(11)
+    resultado = _ingerir(tmp_path, df, "interes", formato)
+    completo = batch.resolver_lote(df)
+    assert len(resultado) == len(df)
+    np.testing.assert_array_equal(resultado["codigo_error"].to_numpy(), completo["codigo_error"])
+    np.testing.assert_array_equal(resultado["ok"].to_numpy(), completo["ok"])
+    for clave in ("C", "M", "I", "i", "n"):
+        np.testing.assert_allclose(resultado[clave].to_numpy(), completo[clave], rtol=1e-12, equal_nan=True)
+    # Solo las filas con error llevan mensaje
+    assert (resultado["error"].fillna("") != "").tolist() == (~completo["ok"]).tolist()
+
+
+def test_cartera_interes_compuesto_coincide_con_escalar(tmp_path):
+    df = _cartera_interes(12)
+    resultado = _ingerir(tmp_path, df, "interes", "csv")
+    comparadas = 0
+    for fila, salida in zip(df.itertuples(), resultado.itertuples()):
+        if fila.tipo != "interes_compuesto" or fila.incognita not in SALIDA:
+            assert fila.incognita in SALIDA or not salida.ok
+            continue
+        escalar = accounting_service.resolver_interes_compuesto(_problema_compuesto(fila))
+        assert salida.ok == ("error" not in escalar), (fila, escalar, salida.codigo_error)
+        if salida.ok:
+            obtenido = getattr(salida, SALIDA[fila.incognita])
+            assert math.isclose(obtenido, escalar["resultado"], rel_tol=1e-6, abs_tol=0.011), (fila, escalar)
+        comparadas += 1
+    assert comparadas > 100
+
+
+def test_cartera_sin_columnas_requeridas():
+    with pytest.raises(ValueError, match="incognita"):
+        list(pipeline.procesar(iter([pd.DataFrame({"tipo": ["interes_simple"]})]), "interes"))
+    with pytest.raises(ValueError, match="desconocido"):
+        list(pipeline.procesar(iter([]), "otra"))
+
+
+# --- CARTERA DE RENEGOCIACIÓN ---
+
+def _problema(rng, con_incognita: bool) -> ProblemaRenegociacion:
+    deudas = [
+        {"monto": rng.uniform(100, 10_000), "vencimiento_meses": rng.uniform(-12, 36)}
+        for _ in range(rng.randint(1, 5))
+    ]
+    pagos = [{"monto": rng.uniform(100, 5_000), "mes": rng.uniform(0, 48)} for _ in range(rng.randint(0, 3))]
+    if con_incognita:
+        pagos += [
+            {"monto": None, "mes": rng.uniform(0, 48), "proporcion_incognita": rng.choice([1.0, 2.0, 0.5])}
+            for _ in range(rng.randint(1, 3))
+        ]
+    if rng.random() < 0.5:
+        tasa = {"valor": rng.uniform(0.0, 0.4), "es_nominal": True, "capitalizacion": rng.choice(FRECUENCIAS)}
+    else:
+        tasa = {"valor": rng.uniform(0.0, 0.4), "periodo": rng.choice(FRECUENCIAS)}
+    return ProblemaRenegociacion(
+        tipo="renegociacion_deuda", deudas_originales=deudas, pagos_propuestos=pagos,
+        tasa_referencia=tasa, fecha_focal_mes=rng.choice([0.0, rng.uniform(-6, 48)])
+    )
+
+
+def _formato_largo(problemas: list) -> pd.DataFrame:
+    """Una fila por flujo; los datos de la tasa se repiten en todas las filas del problema."""
+    filas = []
+    for pid, p in enumerate(problemas):
+        tasa = p.tasa_referencia
+        comunes = {
+            "problema_id": pid, "tasa_valor": tasa.valor, "tasa_es_nominal": tasa.es_nominal,
+            "tasa_capitalizacion": tasa.capitalizacion.value if tasa.capitalizacion else None,
+            "tasa_periodo": tasa.periodo.value if tasa.periodo else None, "fecha_focal_mes": p.fecha_focal_mes,
+        }
+        for d in p.deudas_originales:
+            filas.append({**comunes, "lado": "deuda", "monto": d.monto, "mes": d.vencimiento_meses})
+        for pago in p.pagos_propuestos:
+            filas.append({**comunes, "lado": "pago", "monto": pago.monto, "mes": pago.mes,
+                          "proporcion_incognita": pago.proporcion_incognita})
+    return pd.DataFrame(filas)
+
+
+@pytest.mark.parametrize("formato", pipeline.FORMATOS)
+def test_cartera_renegociacion_coincide_con_escalar(tmp_path, formato):
+    rng = random.Random(21)
+    problemas = [_problema(rng, con_incognita=rng.random() > 0.15) for _ in range(120)]
+    resultado = _ingerir(tmp_path, _formato_largo(problemas), "renegociacion", formato)
+    assert resultado["problema_id"].tolist() == list(range(len(problemas)))
+    for k, problema in enumerate(problemas):
+        escalar = negotiation_service.resolver_ecuacion_valor(problema)
+        if "error" in escalar:
+            assert resultado["codigo_error"][k] == engine.SIN_INCOGNITA
+            assert math.isnan(resultado["valor_x"][k])
+            continue
+        assert resultado["codigo_error"][k] == engine.OK
+        # El escalar redondea a centavos
+        assert resultado["valor_x"][k] == pytest.approx(escalar["valor_x"], abs=0.006)
+        assert resultado["valor_presente_deudas"][k] == pytest.approx(escalar["valor_presente_deudas"], abs=0.006)
+
+
+def test_cartera_renegociacion_proporcion_por_defecto_y_varias_incognitas():
+    df = pd.DataFrame({
+        "problema_id": ["a", "a", "b", "b", "b"],
+        "lado": ["deuda", "pago", "deuda", "pago", "pago"],
+        "monto": [1000.0, np.nan, 1000.0, np.nan, np.nan],
+        "mes": [6.0, 6.0, 6.0, 3.0, 9.0],
+        "incognita": [None, None, None, "x", "y"],
+        "tasa_valor": [0.02] * 5,
+        "tasa_periodo": ["mensual"] * 5,
+    })
+    bloques = [df.iloc[:3].copy(), df.iloc[3:].copy()]
+    resultado = pd.concat(pipeline.procesar(iter(bloques), "renegociacion"), ignore_index=True)
+    assert resultado["problema_id"].tolist() == ["a", "b"]
+    assert resultado["codigo_error"].tolist() == [engine.OK, engine.VARIAS_INCOGNITAS]
+    # Monto vacío sin proporción cuenta como 1x
+    assert resultado["valor_x"][0] == pytest.approx(1000.0)
@@ -0,0 +1,42 @@
+"""Enrutado por palabras clave y texto de los schemas compactos que ve el LLM."""
+import json
+
+import pytest
+
+from app.llm_router import _RUTAS, clasificar, minificar_schema
+from app.shared.enums import ProblemType
+
+
+def _texto_schema(tipo: ProblemType) -> str:
+    schema, _ = _RUTAS[tipo]
+    return json.dumps(schema.model_json_schema(), ensure_ascii=False)
+
+
+def test_minificar_respeta_abreviaturas():
+    compacto = minificar_schema({
+        "title": "X",
+        "description": "Periodo de la tasa (ej. anual, mensual). Se usa para n. Otra oración.",
+        "properties": {"a": {"description": "Valor, p. ej. 0.15. Resto."}},
+    })
+    assert compacto == {
+        "description": "Periodo de la tasa (ej. anual, mensual)",
+        "properties": {"a": {"description": "Valor, p. ej. 0.15"}},
+    }
+
+
+@pytest.mark.parametrize("tipo", list(_RUTAS))
+def test_schema_compacto_sin_titulos_y_con_parentesis_balanceados(tipo):
+    texto = _texto_schema(tipo)
+    assert '"title"' not in texto
+    assert texto.count("(") == texto.count(")")
+
+
+def test_schema_compacto_conserva_la_guia_de_tasa():
+    texto = _texto_schema(ProblemType.INTERES_COMPUESTO)
+    assert "El valor decimal de la tasa (ej. 0.15 para 15%)" in texto
+    assert "Periodo de la tasa (ej. anual, mensual)" in texto
+
+
+def test_clasificar_ambiguo_usa_union_completa():
+    assert clasificar("Calcula el interés compuesto de 1000 al 5% mensual por 12 meses") == ProblemType.INTERES_COMPUESTO
+    assert clasificar("Hola") is None
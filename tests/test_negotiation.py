@@ -0,0 +1,256 @@
+"""
+Ecuación de valor: el motor vectorizado contra una referencia escalar flujo por flujo
+(la formulación original con math.pow), con problemas sorteados que incluyen fechas
+focales distintas de cero, deudas vencidas y problemas sin incógnita.
+"""
+import math
+import random
+
+import numpy as np
+import pytest
+
+from app.executor import SolverExecutor
+from app.negotiation import engine
+from app.negotiation.schemas import Pago, ProblemaRenegociacion
+from app.negotiation.services import negotiation_service
+from app.shared.rates import tasa_mensual_efectiva
+
+FRECUENCIAS = ["mensual", "trimestral", "semestral", "anual"]
+
+
+def _tasa(rng) -> dict:
+    if rng.random() < 0.5:
+        return {"valor": rng.uniform(0.0, 0.4), "es_nominal": True, "capitalizacion": rng.choice(FRECUENCIAS)}
+    return {"valor": rng.uniform(0.0, 0.05), "periodo": "mensual"}
+
+
+def _problema(rng, con_incognita: bool = True) -> ProblemaRenegociacion:
+    deudas = [
+        {"monto": rng.uniform(100, 10_000), "vencimiento_meses": rng.uniform(-12, 36)}
+        for _ in range(rng.randint(1, 6))
+    ]
+    pagos = [{"monto": rng.uniform(100, 5_000), "mes": rng.uniform(0, 48)} for _ in range(rng.randint(0, 4))]
+    if con_incognita:
+        pagos += [
+            {"monto": None, "mes": rng.uniform(0, 48), "proporcion_incognita": rng.choice([1.0, 2.0, 0.5])}
+            for _ in range(rng.randint(1, 3))
+        ]
+    rng.shuffle(pagos)
+    return ProblemaRenegociacion(
+        tipo="renegociacion_deuda", deudas_originales=deudas, pagos_propuestos=pagos,
+        tasa_referencia=_tasa(rng), fecha_focal_mes=rng.choice([0.0, rng.uniform(-6, 48)])
+    )
+
+
+def _problemas(semilla: int, cantidad: int = 200) -> list:
+    rng = random.Random(semilla)
+    return [_problema(rng, con_incognita=rng.random() > 0.1) for _ in range(cantidad)]
+
+
+def _referencia(problema: ProblemaRenegociacion) -> dict:
+    """Ecuación de valor flujo por flujo, sin NumPy."""
+    i = tasa_mensual_efectiva(problema.tasa_referencia)
+    ff = problema.fecha_focal_mes
+    vp = sum(d.monto / math.pow(1 + i, d.vencimiento_meses) for d in problema.deudas_originales)
+    deudas_ff = sum(d.monto * math.pow(1 + i, ff - d.vencimiento_meses) for d in problema.deudas_originales)
+    pagos_ff, factor_x = 0.0, 0.0
+    for p in problema.pagos_propuestos:
+        if p.monto is not None:
+            pagos_ff += p.monto * math.pow(1 + i, ff - p.mes)
+        elif p.proporcion_incognita is not None:
+            factor_x += p.proporcion_incognita * math.pow(1 + i, ff - p.mes)
+    if factor_x == 0:
+        return {"error": "No hay incógnita X que despejar."}
+    return {
+        "valor_x": (deudas_ff - pagos_ff) / factor_x,
+        "valor_presente_deudas": vp,
+        "total_deudas_ff": deudas_ff,
+        "total_pagos_conocidos_ff": pagos_ff,
+        "factor_total_x": factor_x,
+    }
+
+
+# --- MOTOR VECTORIZADO (un problema) ---
+
+def test_ecuacion_valor_coincide_con_referencia():
+    for problema in _problemas(1):
+        esperado = _referencia(problema)
+        res = negotiation_service.resolver_ecuacion_valor(problema)
+        if "error" in esperado:
+            assert res == esperado
+            continue
+        assert res["valor_x"] == pytest.approx(esperado["valor_x"], abs=0.006)
+        assert res["valor_presente_deudas"] == pytest.approx(esperado["valor_presente_deudas"], abs=0.006)
+        assert res["balance_ecuacion"]["total_deudas_ff"] == pytest.approx(esperado["total_deudas_ff"], abs=0.006)
+        assert abs(res["balance_ecuacion"]["diferencia"]) < 1e-4
+
+
+def test_desglose_por_flujo():
+    problema = _problemas(2, cantidad=1)[0]
+    i = tasa_mensual_efectiva(problema.tasa_referencia)
+    ff = problema.fecha_focal_mes
+    analisis = negotiation_service.resolver_ecuacion_valor(problema)["analisis_tecnico"]
+    assert len(analisis["desglose_deudas"]) == len(problema.deudas_originales)
+    for deuda, detalle in zip(problema.deudas_originales, analisis["desglose_deudas"]):
+        assert detalle["monto_en_ff"] == pytest.approx(deuda.monto * (1 + i) ** (ff - deuda.vencimiento_meses), abs=0.006)
+    assert len(analisis["desglose_pagos"]) == len(problema.pagos_propuestos)
+    assert "desglose_deudas" not in negotiation_service.resolver_ecuacion_valor(problema, incluir_desglose=False)["analisis_tecnico"]
+
+
+def test_pago_sin_monto_ni_proporcion_no_aporta():
+    problema = ProblemaRenegociacion(
+        tipo="renegociacion_deuda",
+        deudas_originales=[{"monto": 1000.0, "vencimiento_meses": 6}],
+        pagos_propuestos=[{"monto": None, "mes": 3}, {"monto": None, "mes": 6, "proporcion_incognita": 1.0}],
+        tasa_referencia={"valor": 0.02, "periodo": "mensual"},
+    )
+    assert negotiation_service.resolver_ecuacion_valor(problema)["valor_x"] == pytest.approx(1000.0)
+
+
+# --- LOTES (PORTAFOLIO) ---
+
+def test_lote_coincide_con_referencia_por_problema():
+    problemas = _problemas(3)
+    res = negotiation_service.resolver_lote(problemas)
+    for k, problema in enumerate(problemas):
+        esperado = _referencia(problema)
+        if "error" in esperado:
+            assert res["codigo_error"][k] == engine.SIN_INCOGNITA
+            assert math.isnan(res["valor_x"][k])
+            continue
+        assert res["codigo_error"][k] == engine.OK
+        for clave, valor in esperado.items():
+            assert res[clave][k] == pytest.approx(valor, rel=1e-10, abs=1e-8), clave
+
+
+def test_lote_en_trozos_igual_que_en_una_pasada():
+    problemas = _problemas(4, cantidad=50)
+    lote = engine.LoteFlujos.from_problemas(problemas, [tasa_mensual_efectiva(p.tasa_referencia) for p in problemas])
+    completo = engine.resolver_lote_flujos(lote)
+    en_trozos = SolverExecutor(modo="inline", tamano_trozo=7).resolver_lote_flujos(lote)
+    for clave in completo:
+        np.testing.assert_array_equal(completo[clave], en_trozos[clave])
+
+
+def test_lote_marca_varias_incognitas_y_acepta_vacios():
+    varias = ProblemaRenegociacion(
+        tipo="renegociacion_deuda",
+        deudas_originales=[{"monto": 1000.0, "vencimiento_meses": 6}],
+        pagos_propuestos=[
+            {"monto": None, "mes": 3, "proporcion_incognita": 1.0, "incognita": "x"},
+            {"monto": None, "mes": 9, "proporcion_incognita": 1.0, "incognita": "y"},
+        ],
+        tasa_referencia={"valor": 0.02, "periodo": "mensual"},
+    )
+    sin_deudas = ProblemaRenegociacion(
+        tipo="renegociacion_deuda", deudas_originales=[],
+        pagos_propuestos=[{"monto": None, "mes": 3, "proporcion_incognita": 1.0}],
+        tasa_referencia={"valor": 0.02, "periodo": "mensual"},
+    )
+    res = negotiation_service.resolver_lote([varias, sin_deudas])
+    assert res["codigo_error"].tolist() == [engine.VARIAS_INCOGNITAS, engine.OK]
+    assert res["valor_x"][1] == 0.0
+    assert len(negotiation_service.resolver_lote([])["valor_x"]) == 0
+
+
+# --- VARIAS INCÓGNITAS ---
+
+def _con_incognitas(pagos: list, restricciones: list) -> ProblemaRenegociacion:
+    return ProblemaRenegociacion(
+        tipo="renegociacion_deuda",
+        deudas_originales=[{"monto": 5000.0, "vencimiento_meses": 3}, {"monto": 8000.0, "vencimiento_meses": 15}],
+        pagos_propuestos=pagos, tasa_referencia={"valor": 0.24, "es_nominal": True, "capitalizacion": "mensual"},
+        fecha_focal_mes=12, restricciones=restricciones
+    )
+
+
+def test_sistema_equivale_a_sustituir_la_restriccion():
+    # y = 2x  <=>  un solo pago X con proporción 2 en el mes de y
+    sistema = _con_incognitas(
+        [{"monto": 2000.0, "mes": 1}, {"monto": None, "mes": 6, "proporcion_incognita": 1.0, "incognita": "X"},
+         {"monto": None, "mes": 18, "proporcion_incognita": 1.0, "incognita": "y"}],
+        [{"terminos": [{"incognita": "y", "coeficiente": 1.0}, {"incognita": "x", "coeficiente": -2.0}]}]
+    )
+    sustituido = _con_incognitas(
+        [{"monto": 2000.0, "mes": 1}, {"monto": None, "mes": 6, "proporcion_incognita": 1.0},
+         {"monto": None, "mes": 18, "proporcion_incognita": 2.0}], []
+    )
+    res = negotiation_service.resolver_ecuacion_valor(sistema)
+    esperado = _referencia(sustituido)["valor_x"]
+    assert res["valores_incognitas"]["x"] == pytest.approx(esperado, abs=0.006)
+    assert res["valores_incognitas"]["y"] == pytest.approx(2 * esperado, abs=0.011)
+    assert res["valor_x"] == res["valores_incognitas"]["x"]
+    assert abs(res["balance_ecuacion"]["diferencia"]) < 1e-4
+
+
+@pytest.mark.parametrize("restricciones, mensaje", [
+    ([], "se necesitan exactamente 1"),
+    ([{"terminos": [{"incognita": "z", "coeficiente": 1.0}]}], "no aparece en ningún pago"),
+    ([{"terminos": [{"incognita": "x", "coeficiente": 1.0}, {"incognita": "y", "coeficiente": 1.0}]},
+      {"terminos": [{"incognita": "x", "coeficiente": 2.0}, {"incognita": "y", "coeficiente": 2.0}], "constante": 1.0}],
+     "se necesitan exactamente 1"),
+])
+def test_sistema_mal_planteado(restricciones, mensaje):
+    problema = _con_incognitas(
+        [{"monto": None, "mes": 6, "proporcion_incognita": 1.0, "incognita": "x"},
+         {"monto": None, "mes": 18, "proporcion_incognita": 1.0, "incognita": "y"}],
+        restricciones
+    )
+    assert mensaje in negotiation_service.resolver_ecuacion_valor(problema)["error"]
+
+
+def test_sistema_singular():
+    # Con ambos pagos en la fecha focal, la ecuación de valor es x + y = c: la restricción x + y = 1 es paralela
+    problema = _con_incognitas(
+        [{"monto": None, "mes": 12, "proporcion_incognita": 1.0, "incognita": "x"},
+         {"monto": None, "mes": 12, "proporcion_incognita": 1.0, "incognita": "y"}],
+        [{"terminos": [{"incognita": "x", "coeficiente": 1.0}, {"incognita": "y", "coeficiente": 1.0}], "constante": 1.0}]
+    )
+    assert "singular" in negotiation_service.resolver_ecuacion_valor(problema)["error"]
+
+
+# --- TASA IMPLÍCITA ---
+
+def _con_tasa_conocida(rng, tasa_mensual: float) -> ProblemaRenegociacion:
+    """
+    Problema cuyos pagos (todos conocidos) igualan las deudas exactamente a `tasa_mensual`.
+    Los pagos van después de las deudas: un solo cambio de signo, una sola TIR.
+    """
+    deudas = [{"monto": rng.uniform(1000, 5000), "vencimiento_meses": rng.uniform(0, 12)} for _ in range(3)]
+    meses = sorted(rng.uniform(13, 36) for _ in range(3))
+    vp = sum(d["monto"] * (1 + tasa_mensual) ** -d["vencimiento_meses"] for d in deudas)
+    # Pagos iguales: monto * sum(v^t) = VP de las deudas
+    monto = vp / sum((1 + tasa_mensual) ** -m for m in meses)
+    return ProblemaRenegociacion(
+        tipo="renegociacion_deuda", deudas_originales=deudas,
+        pagos_propuestos=[{"monto": monto, "mes": m} for m in meses],
+        tasa_referencia={"valor": 0.01, "periodo": "mensual"}, incognita="tasa_implicita"
+    )
+
+
+def test_tasa_implicita_recupera_la_tasa_y_el_lote_coincide():
+    rng = random.Random(8)
+    tasas = [rng.choice([0.0, rng.uniform(-0.02, 0.08)]) for _ in range(40)]
+    problemas = [_con_tasa_conocida(rng, t) for t in tasas]
+    lote = negotiation_service.resolver_tasas_lote(problemas)
+    for k, (problema, tasa) in enumerate(zip(problemas, tasas)):
+        escalar = negotiation_service.resolver_tasa_implicita(problema)
+        assert escalar["tasa_mensual_efectiva"] == pytest.approx(tasa, abs=1e-8)
+        assert lote["codigo_error"][k] == engine.OK
+        assert lote["tasa_mensual"][k] == pytest.approx(tasa, abs=1e-10)
+        assert lote["tasa_efectiva_anual"][k] == pytest.approx((1 + lote["tasa_mensual"][k]) ** 12 - 1)
+
+
+def test_tasa_implicita_errores():
+    base = _con_tasa_conocida(random.Random(9), 0.02)
+    con_x = base.model_copy(update={"pagos_propuestos": [
+        *base.pagos_propuestos[:-1], Pago(monto=None, mes=30, proporcion_incognita=1.0)
+    ]})
+    sin_raiz = base.model_copy(update={"pagos_propuestos": [Pago(monto=1.0, mes=1)]})
+    lote = negotiation_service.resolver_tasas_lote([con_x, sin_raiz, base])
+    assert lote["codigo_error"].tolist() == [engine.PAGOS_DESCONOCIDOS, engine.SIN_RAIZ, engine.OK]
+    assert "pagos X sin monto" in engine.ERRORES_LOTE[engine.PAGOS_DESCONOCIDOS]
+    assert np.isnan(lote["tasa_mensual"][:2]).all()
+    # El escalar rechaza los mismos casos con un dict de error
+    assert "error" in negotiation_service.resolver_tasa_implicita(con_x)
+    assert "error" in negotiation_service.resolver_tasa_implicita(sin_raiz)
@@ -0,0 +1,49 @@
+"""Tablas de frecuencias y conversiones memorizadas de app.shared.rates."""
+import math
+
+import pytest
+
+from app.shared import rates
+from app.shared.enums import Frequency
+from app.shared.schemas import TasaInteres
+
+
+@pytest.fixture(autouse=True)
+def caches_limpios():
+    rates.limpiar_caches()
+    yield
+    rates.limpiar_caches()
+
+
+def test_tablas_inmutables_y_consistentes():
+    assert rates.frecuencia_anual(Frequency.MENSUAL) == 12
+    assert rates.frecuencia_anual(None) == 1
+    assert rates.meses_por_periodo(Frequency.TRIMESTRAL) == 3
+    with pytest.raises(TypeError):
+        rates.FRECUENCIA_ANUAL[Frequency.MENSUAL] = 1
+
+
+@pytest.mark.parametrize("tasa, esperado", [
+    (TasaInteres(valor=0.12, es_nominal=True, capitalizacion=Frequency.MENSUAL), 0.01),
+    (TasaInteres(valor=0.12, periodo=Frequency.ANUAL), 1.12 ** (1 / 12) - 1),
+    (TasaInteres(valor=0.03, periodo=Frequency.TRIMESTRAL), 1.03 ** (1 / 3) - 1),
+])
+def test_tasa_mensual_efectiva(tasa, esperado):
+    assert rates.tasa_mensual_efectiva(tasa) == pytest.approx(esperado, rel=1e-12)
+
+
+def test_nominal_sin_capitalizacion_usa_la_por_defecto():
+    tasa = TasaInteres(valor=0.12, es_nominal=True)
+    trimestral = rates.tasa_efectiva_periodica(tasa, Frequency.TRIMESTRAL, capitalizacion_defecto=Frequency.MENSUAL)
+    assert trimestral == pytest.approx(1.01 ** 3 - 1, rel=1e-12)
+
+
+def test_cache_cuenta_aciertos():
+    tasa = TasaInteres(valor=0.05, periodo=Frequency.SEMESTRAL)
+    for _ in range(3):
+        rates.tasa_mensual_efectiva(tasa)
+    assert rates.factor_descuento(0.01, 12) == pytest.approx(math.pow(1.01, -12))
+    estadisticas = rates.stats()
+    assert estadisticas["conversion_tasas"]["misses"] == 1
+    assert estadisticas["conversion_tasas"]["hits"] == 2
+    assert estadisticas["factores_descuento"]["size"] == 1
@@ -0,0 +1,211 @@
+"""
+Barridos de sensibilidad: cada celda de la malla debe coincidir con el solver escalar
+del problema modificado, y las derivadas analíticas con diferencias finitas centradas.
+"""
+import math
+import random
+
+import numpy as np
+import pytest
+
+from app.accounting.schemas import ProblemaInteresCompuesto
+from app.accounting.services import accounting_service
+from app.negotiation.engine import FlujosRenegociacion
+from app.negotiation.schemas import ProblemaRenegociacion
+from app.negotiation.services import negotiation_service
+from app.sensitivity import engine
+from app.sensitivity.schemas import BarridoInteresCompuesto, BarridoRenegociacion
+from app.sensitivity.services import sensitivity_service
+
+TASAS = np.array([0.0, 0.03, 0.12, 0.25])
+DESPLAZAMIENTOS = np.array([-3.0, 0.0, 6.5])
+FECHAS_FOCALES = np.array([0.0, 10.0, 30.0])
+TASAS_REFERENCIA = [
+    {"valor": 0.18, "es_nominal": True, "capitalizacion": "trimestral"},
+    {"valor": 0.2, "periodo": "anual"},
+    {"valor": 0.015, "periodo": "mensual"},
+]
+
+
+def _problema(rng, tasa: dict, **cambios) -> ProblemaRenegociacion:
+    datos = {
+        "tipo": "renegociacion_deuda",
+        "deudas_originales": [
+            {"monto": rng.uniform(500, 8000), "vencimiento_meses": rng.uniform(-6, 24)} for _ in range(3)
+        ],
+        "pagos_propuestos": [
+            {"monto": rng.uniform(200, 2000), "mes": rng.uniform(0, 30)},
+            {"monto": None, "mes": rng.uniform(6, 30), "proporcion_incognita": 1.0},
+            {"monto": None, "mes": rng.uniform(12, 36), "proporcion_incognita": 2.0},
+        ],
+        "tasa_referencia": tasa,
+        "fecha_focal_mes": 12.0,
+    }
+    return ProblemaRenegociacion(**{**datos, **cambios})
+
+
+def _modificado(problema: ProblemaRenegociacion, valor: float, desplazamiento: float = 0.0, ff: float = None):
+    """El mismo problema con otra tasa cotizada, los pagos corridos y otra fecha focal."""
+    datos = problema.model_dump()
+    datos["tasa_referencia"]["valor"] = valor
+    for pago in datos["pagos_propuestos"]:
+        pago["mes"] += desplazamiento
+    if ff is not None:
+        datos["fecha_focal_mes"] = ff
+    return ProblemaRenegociacion(**datos)
+
+
+def _barrido(problema, tasas, fechas_focales=FECHAS_FOCALES, desplazamientos=DESPLAZAMIENTOS) -> dict:
+    return engine.barrido_ecuacion_valor(
+        FlujosRenegociacion.from_problema(problema), np.asarray(tasas, dtype=float),
+        problema.tasa_referencia, fechas_focales, desplazamientos
+    )
+
+
+def _centradas(f, x: float, h: float) -> tuple:
+    """Primera y segunda derivada por diferencias centradas."""
+    bajo, medio, alto = f(x - h), f(x), f(x + h)
+    return (alto - bajo) / (2 * h), (alto - 2 * medio + bajo) / h ** 2
+
+
+# --- ECUACIÓN DE VALOR ---
+
+@pytest.mark.parametrize("tasa", TASAS_REFERENCIA)
+def test_malla_de_renegociacion_coincide_con_escalar(tasa):
+    problema = _problema(random.Random(1), tasa)
+    res = _barrido(problema, TASAS)
+    for a, valor in enumerate(TASAS):
+        for c, desplazamiento in enumerate(DESPLAZAMIENTOS):
+            escalar = negotiation_service.resolver_ecuacion_valor(_modificado(problema, valor, desplazamiento))
+            assert res["valor_x"][a, c] == pytest.approx(escalar["valor_x"], abs=0.006)
+        for c, ff in enumerate(FECHAS_FOCALES):
+            escalar = negotiation_service.resolver_ecuacion_valor(_modificado(problema, valor, ff=ff))
+            assert res["total_deudas_ff"][a, c] == pytest.approx(escalar["balance_ecuacion"]["total_deudas_ff"], abs=0.006)
+        assert res["valor_presente_deudas"][a] == pytest.approx(escalar["valor_presente_deudas"], abs=0.006)
+
+
+@pytest.mark.parametrize("tasa", TASAS_REFERENCIA)
+def test_derivadas_de_renegociacion_contra_diferencias_finitas(tasa):
+    problema = _problema(random.Random(2), tasa)
+    v = tasa["valor"]
+    res = _barrido(problema, [v])
+
+    def en_tasa(clave):
+        return lambda x: _barrido(problema, [x])[clave][0]
+
+    d1, d2 = _centradas(en_tasa("valor_x"), v, 1e-4)
+    np.testing.assert_allclose(res["dx_dtasa"][0], d1, rtol=1e-5)
+    np.testing.assert_allclose(res["d2x_dtasa2"][0], d2, rtol=1e-3)
+
+    d1, _ = _centradas(en_tasa("total_deudas_ff"), v, 1e-4)
+    np.testing.assert_allclose(res["dtotal_ff_dtasa"][0], d1, rtol=1e-5)
+
+    h = 1e-4
+    en_desplazamiento = lambda d: _barrido(problema, [v], desplazamientos=d)["valor_x"][0]
+    np.testing.assert_allclose(
+        res["dx_ddesplazamiento"][0],
+        (en_desplazamiento(DESPLAZAMIENTOS + h) - en_desplazamiento(DESPLAZAMIENTOS - h)) / (2 * h), rtol=1e-5
+    )
+    en_ff = lambda f: _barrido(problema, [v], fechas_focales=f)["total_deudas_ff"][0]
+    np.testing.assert_allclose(
+        res["dtotal_ff_dfecha_focal"][0], (en_ff(FECHAS_FOCALES + h) - en_ff(FECHAS_FOCALES - h)) / (2 * h), rtol=1e-5
+    )
+
+
+@pytest.mark.parametrize("tasa", TASAS_REFERENCIA)
+def test_duracion_y_convexidad_de_las_deudas(tasa):
+    problema = _problema(random.Random(3), tasa)
+    v = tasa["valor"]
+    res = _barrido(problema, [v])
+    vp = lambda x: _barrido(problema, [x])["valor_presente_deudas"][0]
+    d1, d2 = _centradas(vp, v, 1e-4)
+    assert res["duracion_modificada"][0] == pytest.approx(-d1 / vp(v), rel=1e-5)
+    assert res["convexidad"][0] == pytest.approx(d2 / vp(v), rel=1e-3)
+
+    # Macaulay: plazo medio de las deudas ponderado por su valor presente
+    r = 1 + res["tasa_mensual"][0]
+    pesos = [d.monto * r ** -d.vencimiento_meses for d in problema.deudas_originales]
+    media = sum(p * d.vencimiento_meses for p, d in zip(pesos, problema.deudas_originales)) / sum(pesos)
+    assert res["duracion_macaulay_meses"][0] == pytest.approx(media, rel=1e-10)
+
+
+def test_barrido_renegociacion_rechaza_problemas_no_soportados():
+    rng = random.Random(4)
+    base = _problema(rng, TASAS_REFERENCIA[0])
+    datos = base.model_dump()
+    datos["pagos_propuestos"][2]["incognita"] = "y"
+    casos = [
+        (_problema(rng, TASAS_REFERENCIA[0], incognita="tasa_implicita"), "tasa_implicita"),
+        (ProblemaRenegociacion(**datos), "única incógnita"),
+        (_problema(rng, TASAS_REFERENCIA[0], pagos_propuestos=[{"monto": 100.0, "mes": 1}]), "única incógnita"),
+    ]
+    for problema, mensaje in casos:
+        res = sensitivity_service.barrer_renegociacion(BarridoRenegociacion(problema=problema, tasas=[0.1]))
+        assert mensaje in res["error"]
+    grande = BarridoRenegociacion(problema=base, tasas=[0.1] * 10_000, desplazamientos_meses=[0.0] * 101)
+    assert "máximo" in sensitivity_service.barrer_renegociacion(grande)["error"]
+
+
+# --- INTERÉS COMPUESTO ---
+
+PLAZOS = [0.0, 1.0, 18.0, 60.0]
+
+
+def _compuesto(incognita: str, tasa: dict, **importes) -> ProblemaInteresCompuesto:
+    return ProblemaInteresCompuesto(
+        tipo="interes_compuesto", incognita=incognita, tasa=tasa, capitalizacion="trimestral",
+        tiempo_meses=12.0, **importes
+    )
+
+
+@pytest.mark.parametrize("incognita,importes", [("monto", {"capital": 2500.0}), ("capital", {"monto_futuro": 4000.0})])
+@pytest.mark.parametrize("tasa", [{"valor": 0.18, "es_nominal": True}, {"valor": 0.04}])
+def test_malla_compuesto_coincide_con_escalar(incognita, importes, tasa):
+    problema = _compuesto(incognita, tasa, **importes)
+    req = BarridoInteresCompuesto(problema=problema, tasas=TASAS.tolist(), plazos_meses=PLAZOS)
+    matriz = sensitivity_service.barrer_interes_compuesto(req)["matrices"]["valor"]
+    for a, valor in enumerate(TASAS):
+        for c, plazo in enumerate(PLAZOS):
+            escalar = accounting_service.resolver_interes_compuesto(
+                problema.model_copy(update={"tasa": problema.tasa.model_copy(update={"valor": valor}), "tiempo_meses": plazo})
+            )
+            assert matriz[a][c] == pytest.approx(escalar["resultado"], abs=0.006)
+
+
+@pytest.mark.parametrize("hacia_futuro", [True, False])
+def test_derivadas_compuesto_contra_diferencias_finitas(hacia_futuro):
+    plazos = np.array(PLAZOS)
+    m_tasa, m_cap, v = 4.0, 4.0, 0.18
+    res = engine.barrido_compuesto(3000.0, hacia_futuro, np.array([v]), m_tasa, m_cap, plazos)
+    valor = lambda x: engine.barrido_compuesto(3000.0, hacia_futuro, np.array([x]), m_tasa, m_cap, plazos)["valor"][0]
+    d1, d2 = _centradas(valor, v, 1e-4)
+    np.testing.assert_allclose(res["d_dtasa"][0], d1, rtol=1e-6, atol=1e-9)
+    np.testing.assert_allclose(res["d2_dtasa2"][0], d2, rtol=1e-3, atol=1e-6)
+    # Convexidad = V''/V; duración modificada = ∓V'/V según el sentido
+    np.testing.assert_allclose(res["convexidad"][0], d2 / res["valor"][0], rtol=1e-3, atol=1e-9)
+    signo = 1 if hacia_futuro else -1
+    np.testing.assert_allclose(res["duracion_modificada"][0], signo * d1 / res["valor"][0], rtol=1e-6, atol=1e-12)
+
+    h = 1e-4
+    en_plazo = lambda t: engine.barrido_compuesto(3000.0, hacia_futuro, np.array([v]), m_tasa, m_cap, t)["valor"][0]
+    np.testing.assert_allclose(res["d_dplazo_mes"][0], (en_plazo(plazos + h) - en_plazo(plazos - h)) / (2 * h), rtol=1e-6)
+
+
+def test_barrido_compuesto_errores():
+    tasa = {"valor": 0.04}
+    casos = [
+        (_compuesto("tasa", tasa, capital=1000.0, monto_futuro=1500.0), "monto y capital"),
+        (_compuesto("monto", tasa, monto_futuro=1500.0), "Faltan datos para calcular Monto"),
+        (_compuesto("capital", tasa, capital=1000.0), "Faltan datos para calcular Capital"),
+        (_compuesto("monto", tasa, capital=1000.0).model_copy(update={"tiempo_meses": None}), "plazos_meses"),
+    ]
+    for problema, mensaje in casos:
+        res = sensitivity_service.barrer_interes_compuesto(BarridoInteresCompuesto(problema=problema, tasas=[0.1]))
+        assert mensaje in res["error"]
+    # Sin plazos explícitos se usa tiempo_meses del problema
+    res = sensitivity_service.barrer_interes_compuesto(
+        BarridoInteresCompuesto(problema=_compuesto("monto", tasa, capital=1000.0), tasas=[0.04])
+    )
+    assert res["ejes"]["plazos_meses"] == [12.0]
+    assert res["matrices"]["valor"][0][0] == pytest.approx(1000.0 * 1.04 ** 4, abs=0.006)
+    assert math.isfinite(res["matrices"]["convexidad"][0][0])
@@ -0,0 +1,190 @@
+"""
+Sesiones de renegociación: tras cualquier secuencia de ediciones incrementales, el estado
+debe coincidir con resolver desde cero (`resolver_ecuacion_valor`) el problema que
+resulta de aplicar las mismas ediciones a una copia en listas. También LRU y TTL del almacén.
+"""
+import random
+
+import pytest
+
+from app.negotiation import session as modulo_sesion
+from app.negotiation.schemas import (
+    Deuda, EdicionDeuda, EdicionPago, EdicionSesion, Pago, ProblemaRenegociacion, TasaInteres
+)
+from app.negotiation.services import negotiation_service
+from app.negotiation.session import AlmacenSesiones, SesionRenegociacion
+
+TASAS = [
+    {"valor": 0.24, "es_nominal": True, "capitalizacion": "mensual"},
+    {"valor": 0.3, "periodo": "anual"},
+    {"valor": 0.0, "periodo": "mensual"},
+    {"valor": 0.05, "periodo": "trimestral"},
+]
+
+
+def _problema(deudas: dict, pagos: dict, tasa, ff: float) -> ProblemaRenegociacion:
+    return ProblemaRenegociacion(
+        tipo="renegociacion_deuda", deudas_originales=list(deudas.values()),
+        pagos_propuestos=list(pagos.values()), tasa_referencia=tasa, fecha_focal_mes=ff
+    )
+
+
+def _comparar(sesion: SesionRenegociacion, esperado: ProblemaRenegociacion) -> None:
+    estado = sesion.estado()
+    completo = negotiation_service.resolver_ecuacion_valor(esperado)
+    if "error" in completo:
+        assert estado["valor_x"] is None and estado["error"] == completo["error"]
+        return
+    # Ambos redondean a centavos por separado
+    assert estado["valor_x"] == pytest.approx(completo["valor_x"], abs=0.011)
+    assert estado["valor_presente_deudas"] == pytest.approx(completo["valor_presente_deudas"], abs=0.011)
+    for clave in ("total_deudas_ff", "total_propuesta_ff"):
+        assert estado["balance_ecuacion"][clave] == pytest.approx(completo["balance_ecuacion"][clave], abs=0.011)
+
+
+def _pago_aleatorio(rng) -> Pago:
+    if rng.random() < 0.4:
+        return Pago(monto=None, mes=rng.uniform(0, 36), proporcion_incognita=rng.choice([0.5, 1.0, 2.0]))
+    return Pago(monto=rng.uniform(100, 3000), mes=rng.uniform(0, 36))
+
+
+def _editar_al_azar(rng, sesion: SesionRenegociacion, deudas: dict, pagos: dict, estado: dict) -> None:
+    """Aplica una edición a la sesión y la misma a las listas de referencia."""
+    operacion = rng.choice(["+deuda", "-deuda", "~deuda", "+pago", "-pago", "~pago", "~pago", "tasa", "ff"])
+    if operacion == "+deuda":
+        deuda = Deuda(monto=rng.uniform(100, 8000), vencimiento_meses=rng.uniform(-12, 36))
+        deudas[sesion.agregar_deuda(deuda)] = deuda
+    elif operacion == "-deuda" and deudas:
+        flujo_id = rng.choice(list(deudas))
+        sesion.quitar_deuda(flujo_id)
+        del deudas[flujo_id]
+    elif operacion == "~deuda" and deudas:
+        flujo_id = rng.choice(list(deudas))
+        cambios = rng.choice([{"monto": rng.uniform(100, 8000)}, {"vencimiento_meses": rng.uniform(-12, 36)},
+                              {"monto": rng.uniform(100, 8000), "vencimiento_meses": rng.uniform(-12, 36)}])
+        sesion.editar_deuda(flujo_id, EdicionDeuda(**cambios))
+        deudas[flujo_id] = deudas[flujo_id].model_copy(update=cambios)
+    elif operacion == "+pago":
+        pago = _pago_aleatorio(rng)
+        pagos[sesion.agregar_pago(pago)] = pago
+    elif operacion == "-pago" and pagos:
+        flujo_id = rng.choice(list(pagos))
+        sesion.quitar_pago(flujo_id)
+        del pagos[flujo_id]
+    elif operacion == "~pago" and pagos:
+        flujo_id = rng.choice(list(pagos))
+        actual = pagos[flujo_id]
+        cambios = rng.choice([
+            {"mes": rng.uniform(0, 36)},
+            {"monto": rng.uniform(100, 3000)},
+            {"proporcion_incognita": rng.choice([0.5, 1.0, 3.0])},
+        ])
+        sesion.editar_pago(flujo_id, EdicionPago(**cambios))
+        if "monto" in cambios:
+            pagos[flujo_id] = Pago(monto=cambios["monto"], mes=actual.mes)
+        elif "proporcion_incognita" in cambios:
+            pagos[flujo_id] = Pago(monto=None, mes=actual.mes, proporcion_incognita=cambios["proporcion_incognita"])
+        else:
+            pagos[flujo_id] = actual.model_copy(update=cambios)
+    elif operacion == "tasa":
+        estado["tasa"] = TasaInteres(**rng.choice(TASAS))
+        sesion.editar(EdicionSesion(tasa_referencia=estado["tasa"]))
+    elif operacion == "ff":
+        estado["ff"] = rng.choice([0.0, rng.uniform(-6, 40)])
+        sesion.editar(EdicionSesion(fecha_focal_mes=estado["ff"]))
+
+
+@pytest.mark.parametrize("semilla", [1, 2, 3])
+def test_ediciones_incrementales_igual_que_resolver_de_cero(semilla):
+    rng = random.Random(semilla)
+    inicial = _problema(
+        {None: Deuda(monto=5000.0, vencimiento_meses=6.0)},
+        {None: Pago(monto=None, mes=12.0, proporcion_incognita=1.0)},
+        TASAS[0], 0.0
+    )
+    sesion = SesionRenegociacion(inicial)
+    deudas, pagos = dict(zip((0,), inicial.deudas_originales)), dict(zip((1,), inicial.pagos_propuestos))
+    estado = {"tasa": inicial.tasa_referencia, "ff": 0.0}
+    for _ in range(300):
+        _editar_al_azar(rng, sesion, deudas, pagos, estado)
+        _comparar(sesion, _problema(deudas, pagos, estado["tasa"], estado["ff"]))
+    flujos = sesion.flujos()
+    assert [d["id"] for d in flujos["deudas"]] == list(deudas)
+    assert [p["id"] for p in flujos["pagos"]] == list(pagos)
+
+
+def test_recalculo_periodico_de_sumas(monkeypatch):
+    monkeypatch.setattr(modulo_sesion, "RECALCULO_SUMAS_CADA", 5)
+    rng = random.Random(7)
+    sesion = SesionRenegociacion(_problema({}, {0: Pago(monto=None, mes=3.0, proporcion_incognita=1.0)}, TASAS[1], 0.0))
+    deudas, pagos = {}, {0: Pago(monto=None, mes=3.0, proporcion_incognita=1.0)}
+    estado = {"tasa": sesion.tasa_referencia, "ff": 0.0}
+    for _ in range(60):
+        _editar_al_azar(rng, sesion, deudas, pagos, estado)
+    assert sesion._ediciones < 5
+    _comparar(sesion, _problema(deudas, pagos, estado["tasa"], estado["ff"]))
+
+
+def test_misma_tasa_mensual_equivalente_no_recalcula_factores():
+    sesion = SesionRenegociacion(_problema(
+        {0: Deuda(monto=1000.0, vencimiento_meses=6)}, {0: Pago(monto=None, mes=12, proporcion_incognita=1.0)},
+        {"valor": 0.24, "es_nominal": True, "capitalizacion": "mensual"}, 0.0
+    ))
+    assert not sesion.editar(EdicionSesion(tasa_referencia={"valor": 0.02, "periodo": "mensual"}))
+    assert sesion.editar(EdicionSesion(tasa_referencia={"valor": 0.03, "periodo": "mensual"}))
+    assert sesion.estado()["sesion"]["recalculos_factores"] == 2
+
+
+def test_errores_de_sesion():
+    base = _problema(
+        {0: Deuda(monto=1000.0, vencimiento_meses=6)}, {0: Pago(monto=None, mes=12, proporcion_incognita=1.0)},
+        TASAS[0], 0.0
+    )
+    with pytest.raises(ValueError, match="tasa_implicita"):
+        SesionRenegociacion(base.model_copy(update={"incognita": "tasa_implicita"}))
+    varias = base.model_copy(update={"pagos_propuestos": [
+        *base.pagos_propuestos, Pago(monto=None, mes=18, proporcion_incognita=1.0, incognita="y")
+    ]})
+    with pytest.raises(ValueError, match="única incógnita"):
+        SesionRenegociacion(varias)
+
+    sesion = SesionRenegociacion(base)
+    with pytest.raises(ValueError, match="monto o proporcion_incognita"):
+        sesion.agregar_pago(Pago(monto=None, mes=3))
+    with pytest.raises(ValueError, match="'x'"):
+        sesion.agregar_pago(Pago(monto=None, mes=3, proporcion_incognita=1.0, incognita="y"))
+    with pytest.raises(KeyError):
+        sesion.quitar_deuda(99)
+    with pytest.raises(KeyError):
+        sesion.editar_pago(0, EdicionPago(mes=3))  # el id 0 es una deuda
+    assert sesion.version == 0
+
+
+# --- ALMACÉN ---
+
+def test_almacen_desaloja_la_menos_usada():
+    almacen = AlmacenSesiones(max_sesiones=2, ttl_seconds=60)
+    problema = _problema({}, {0: Pago(monto=None, mes=1, proporcion_incognita=1.0)}, TASAS[0], 0.0)
+    a, _ = almacen.crear(problema)
+    b, _ = almacen.crear(problema)
+    assert almacen.obtener(a) is not None  # `a` pasa a ser la más reciente
+    c, _ = almacen.crear(problema)
+    assert almacen.obtener(b) is None
+    assert almacen.obtener(a) is not None and almacen.obtener(c) is not None
+    assert almacen.stats()["evictions"] == 1
+    assert almacen.eliminar(a) and not almacen.eliminar(a)
+
+
+def test_almacen_vence_por_inactividad(monkeypatch):
+    reloj = [1000.0]
+    monkeypatch.setattr(modulo_sesion.time, "time", lambda: reloj[0])
+    almacen = AlmacenSesiones(max_sesiones=10, ttl_seconds=60)
+    problema = _problema({}, {0: Pago(monto=None, mes=1, proporcion_incognita=1.0)}, TASAS[0], 0.0)
+    sesion_id, _ = almacen.crear(problema)
+    reloj[0] += 50
+    assert almacen.obtener(sesion_id) is not None  # renueva el plazo
+    reloj[0] += 50
+    assert almacen.obtener(sesion_id) is not None
+    reloj[0] += 61
+    assert almacen.obtener(sesion_id) is None
+    assert almacen.stats()["expirations"] == 1 and almacen.stats()["active"] == 0